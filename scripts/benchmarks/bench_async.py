@@ -0,0 +1,92 @@
+"""
+Benchmark: serial vs concurrent collection fan-out
+
+Runs the search_all plan (eight collection batches) for the sample
+queries with:
+
+- serial        HybridRetriever.execute_plan, batches one after the other
+- async-N       AsyncHybridRetriever.execute_plan_async with N batches in flight
+
+Query vectors are computed once up front, so only the Qdrant round
+trips are timed. Requires the embedding model and indexed collections
+(non-unified mode; in unified mode there is a single batch).
+
+用法:
+  python scripts/benchmarks/bench_async.py
+  python scripts/benchmarks/bench_async.py --queries 100 --concurrency 2 4 8 --output async.json
+"""
+import time
+import asyncio
+import argparse
+
+from common import load_sample_texts, percentile, write_results
+
+
+def main():
+    from src.config import QDRANT_HOST, QDRANT_PORT, EMBEDDING_MODEL
+    from src.rag.async_retriever import AsyncHybridRetriever
+
+    parser = argparse.ArgumentParser(description="Serial vs async collection fan-out latency")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=5, help="Results per collection")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-collection timeout (s)")
+    parser.add_argument("--output", help="Write JSON results to this path")
+    args = parser.parse_args()
+
+    retriever = AsyncHybridRetriever(QDRANT_HOST, QDRANT_PORT, EMBEDDING_MODEL, unified=False, timeout=args.timeout)
+    ok, message = retriever.check_health()
+    if not ok:
+        print(message)
+        return
+
+    queries = [text[:80] for text in load_sample_texts(args.queries)]
+    vectors = retriever.embed_queries(queries)
+    # 预先计算查询向量，只计检索耗时
+    retriever.embed_queries = lambda texts: {t: vectors[t] for t in dict.fromkeys(texts)}
+    plans = [retriever.plan_search_all([query], args.top_k) for query in queries]
+
+    def run_serial():
+        latencies = []
+        for plan in plans:
+            t0 = time.perf_counter()
+            retriever.execute_plan(plan)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        return latencies, 0
+
+    async def run_async():
+        latencies, partial = [], 0
+        for plan in plans:
+            t0 = time.perf_counter()
+            _, missing = await retriever.execute_plan_async(plan)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            partial += bool(missing)
+        await retriever.aclose()
+        return latencies, partial
+
+    modes = [("serial", run_serial)]
+    for n in args.concurrency:
+        def run(n=n):
+            retriever.max_concurrency = n
+            return asyncio.run(run_async())
+        modes.append((f"async-{n}", run))
+
+    results = []
+    print(f"\n  {len(queries)} queries x {len(retriever.SEARCH_ALL_KEYS)} collections (top-{args.top_k})")
+    for mode, fn in modes:
+        fn()  # 预热 (连接、HNSW 页面)
+        latencies, partial = fn()
+        row = {
+            "mode": mode,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "partial_queries": partial,
+        }
+        results.append(row)
+        print(f"  {mode:<10} p50={row['p50_ms']:7.2f}ms p95={row['p95_ms']:7.2f}ms partial={partial}")
+
+    write_results(args.output, "async", results)
+
+
+if __name__ == "__main__":
+    main()
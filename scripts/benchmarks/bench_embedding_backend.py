@@ -0,0 +1,104 @@
+"""
+Benchmark: query embedding latency / memory, PyTorch vs ONNX int8
+
+用法:
+  python scripts/benchmarks/bench_embedding_backend.py
+  python scripts/benchmarks/bench_embedding_backend.py --backends torch onnx --queries 200
+  python scripts/benchmarks/bench_embedding_backend.py --output backend.json
+
+Each backend runs in a fresh process so peak RSS is not shared between
+them. Reports model load time, single-query latency (p50/p95, as seen
+by HybridRetriever.search_collection) and batch throughput. Vector
+agreement is checked separately with:
+  python -m src.data_processing.onnx_backend --check
+"""
+import time
+import resource
+import argparse
+import multiprocessing
+
+from common import load_sample_texts, percentile, write_results
+
+
+def _peak_rss_mb() -> float:
+    # Linux 单位为 KB, macOS 为 bytes
+    import sys
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 ** 2 if sys.platform == "darwin" else rss / 1024
+
+
+def _run_backend(model_name: str, backend: str, queries, docs, threads: int, results):
+    from src.data_processing.indexer import EmbeddingModel
+
+    embedder = EmbeddingModel(model_name, backend=backend, num_threads=threads or None)
+    if backend == "torch" and threads:
+        import torch
+        torch.set_num_threads(threads)
+
+    t0 = time.perf_counter()
+    embedder.encode_single("warm-up")
+    load_seconds = time.perf_counter() - t0
+
+    latencies = []
+    for query in queries:
+        t0 = time.perf_counter()
+        embedder.encode_single(query)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    embedder.encode(docs)
+    batch_seconds = time.perf_counter() - t0
+
+    results.put({
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "query_p50_ms": percentile(latencies, 50),
+        "query_p95_ms": percentile(latencies, 95),
+        "docs_per_sec": len(docs) / batch_seconds,
+        "peak_rss_mb": _peak_rss_mb(),
+    })
+
+
+def main():
+    from src.config import EMBEDDING_MODEL
+
+    parser = argparse.ArgumentParser(description="Embedding backend latency/memory benchmark")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"], choices=["torch", "onnx"])
+    parser.add_argument("--queries", type=int, default=100, help="Single-query encodes to time")
+    parser.add_argument("--docs", type=int, default=500, help="Texts for the batch throughput run")
+    parser.add_argument("--threads", type=int, default=0, help="Compute threads (0 = library default)")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--output", help="Write JSON results to this path")
+    args = parser.parse_args()
+
+    texts = load_sample_texts(args.queries + args.docs)
+    # 用较短文本模拟用户问题
+    queries = [text[:80] for text in texts[:args.queries]]
+    docs = texts[args.queries:]
+    print(f"Model {args.model}: {len(queries)} queries, {len(docs)} docs")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for backend in args.backends:
+        queue = ctx.Queue()
+        process = ctx.Process(
+            target=_run_backend, args=(args.model, backend, queries, docs, args.threads, queue)
+        )
+        process.start()
+        result = queue.get()
+        process.join()
+        results.append(result)
+        print(f"  {backend:<6} load {result['load_seconds']:.1f}s  "
+              f"p50 {result['query_p50_ms']:.1f}ms  p95 {result['query_p95_ms']:.1f}ms  "
+              f"{result['docs_per_sec']:.1f} docs/s  peak RSS {result['peak_rss_mb']:.0f} MB")
+
+    print(f"\n{'backend':<8} {'p50 ms':>8} {'p95 ms':>8} {'docs/s':>8} {'RSS MB':>8}")
+    for r in results:
+        print(f"{r['backend']:<8} {r['query_p50_ms']:>8.1f} {r['query_p95_ms']:>8.1f} "
+              f"{r['docs_per_sec']:>8.1f} {r['peak_rss_mb']:>8.0f}")
+
+    write_results(args.output, "embedding_backend", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: embedding throughput (docs/sec) vs number of worker processes
+
+用法:
+  python scripts/benchmarks/bench_embedding_workers.py
+  python scripts/benchmarks/bench_embedding_workers.py --workers 0 1 2 4 8 16 --docs 4000
+  python scripts/benchmarks/bench_embedding_workers.py --output workers.json
+
+workers=0 is the in-process baseline (single SentenceTransformer).
+Model loading is excluded from the timings (a warm-up call is made first).
+"""
+import os
+import time
+import argparse
+
+from common import load_sample_texts, write_results
+
+
+def bench(texts, model_name: str, workers: int, threads: int, batch_size: int) -> dict:
+    from src.data_processing.indexer import EmbeddingModel
+
+    embedder = EmbeddingModel(
+        model_name, num_workers=workers, threads_per_worker=threads or None
+    )
+    try:
+        # Warm-up: 加载模型 (每个 worker 进程各一次)
+        embedder.encode(texts[:max(64, workers * 32)], batch_size=batch_size)
+
+        t0 = time.perf_counter()
+        vectors = embedder.encode(texts, batch_size=batch_size)
+        elapsed = time.perf_counter() - t0
+    finally:
+        embedder.close()
+
+    assert len(vectors) == len(texts)
+    return {
+        "workers": workers,
+        "threads_per_worker": embedder._pool.threads_per_worker if embedder._pool else None,
+        "docs": len(texts),
+        "seconds": elapsed,
+        "docs_per_sec": len(texts) / elapsed,
+    }
+
+
+def main():
+    from src.config import EMBEDDING_MODEL
+
+    parser = argparse.ArgumentParser(description="Embedding worker scaling benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4, 8])
+    parser.add_argument("--threads", type=int, default=0, help="torch threads per worker (0 = auto)")
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--output", help="Write JSON results to this path")
+    args = parser.parse_args()
+
+    texts = load_sample_texts(args.docs)
+    print(f"Corpus: {len(texts)} texts, {os.cpu_count()} CPU cores, model {args.model}")
+
+    results = []
+    for workers in args.workers:
+        result = bench(texts, args.model, workers, args.threads, args.batch_size)
+        results.append(result)
+        print(f"  workers={workers:<3} {result['docs_per_sec']:8.1f} docs/s ({result['seconds']:.1f}s)")
+
+    baseline = results[0]["docs_per_sec"]
+    print(f"\n{'workers':>8} {'docs/s':>10} {'speedup':>8}")
+    for r in results:
+        print(f"{r['workers']:>8} {r['docs_per_sec']:>10.1f} {r['docs_per_sec'] / baseline:>7.2f}x")
+
+    write_results(args.output, "embedding_workers", results)
+
+
+if __name__ == "__main__":
+    main()
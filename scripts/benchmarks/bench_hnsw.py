@@ -0,0 +1,144 @@
+"""
+Benchmark: HNSW recall / latency trade-off per collection
+
+For each collection the stored vectors are copied into one temporary
+collection per HNSW profile (collections.HNSW_PROFILES, index-time
+m / ef_construct / full_scan_threshold) and queried with a sample of
+stored vectors at several search-time hnsw_ef values. Ground truth is
+an exact (brute-force) search on the live collection.
+
+Note: segments smaller than full_scan_threshold (and Qdrant's optimizer
+indexing_threshold) are always scanned exhaustively, so small
+collections report recall 1.0 for every setting — which is the point of
+the "small" profile.
+
+Reports per profile / hnsw_ef:
+- p50 / p95 query latency
+- recall@10 against the exact top-10
+- which profile HNSW_PROFILE="auto" picks for the collection
+
+用法:
+  python scripts/benchmarks/bench_hnsw.py
+  python scripts/benchmarks/bench_hnsw.py --collections c3_terms c3_ace --ef 16 32 64 128 256
+  python scripts/benchmarks/bench_hnsw.py --profiles default medium large --output hnsw.json
+"""
+import time
+import argparse
+
+from common import (
+    qdrant_client, scroll_all, wait_until_indexed, sample_queries, percentile, write_results,
+)
+
+
+def create_copy(client, name: str, profile: dict, dim: int, ids, vectors):
+    from qdrant_client.http import models
+    from src.data_processing.indexer import hnsw_config
+
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE),
+        hnsw_config=hnsw_config(profile),
+    )
+    client.upload_collection(collection_name=name, vectors=vectors, ids=ids, batch_size=256, parallel=2)
+    wait_until_indexed(client, name)
+
+
+def run_queries(client, name: str, queries, params, top_k: int = 10):
+    latencies, results = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        points = client.query_points(
+            collection_name=name, query=q, limit=top_k, search_params=params
+        ).points
+        latencies.append((time.perf_counter() - t0) * 1000)
+        results.append([p.id for p in points])
+    return latencies, results
+
+
+def recall_at_k(results, truth, k: int = 10) -> float:
+    hits = sum(len(set(r[:k]) & set(t[:k])) for r, t in zip(results, truth))
+    total = sum(min(k, len(t)) for t in truth)
+    return hits / total if total else 0.0
+
+
+def bench_collection(client, collection: str, num_queries: int, profiles, ef_values) -> list:
+    from qdrant_client.http import models
+    from src.collections import HNSW_PROFILES
+    from src.data_processing.indexer import collection_hnsw_profile
+
+    ids, vectors, _ = scroll_all(client, collection)
+    if not vectors:
+        print(f"  {collection}: empty, skipped")
+        return []
+    dim = len(vectors[0])
+    queries = sample_queries(vectors, num_queries)
+    auto = collection_hnsw_profile(collection, len(ids))["name"]
+    print(f"\n  {collection}: {len(ids)} points, auto profile = {auto}")
+
+    _, truth = run_queries(client, collection, queries, models.SearchParams(exact=True))
+    rows = []
+
+    for profile_name in profiles:
+        profile = HNSW_PROFILES[profile_name]
+        name = f"{collection}__bench_hnsw_{profile_name}"
+        try:
+            create_copy(client, name, profile, dim, ids, vectors)
+            # profile 自身的检索设置 + 扫描的 hnsw_ef
+            settings = [(profile["hnsw_ef"], profile["exact"])]
+            settings += [(ef, False) for ef in ef_values if (ef, False) not in settings]
+            for hnsw_ef, exact in settings:
+                params = models.SearchParams(hnsw_ef=hnsw_ef, exact=exact)
+                latencies, results = run_queries(client, name, queries, params)
+                row = {
+                    "collection": collection,
+                    "points": len(ids),
+                    "profile": profile_name,
+                    "auto": profile_name == auto,
+                    "m": profile["m"],
+                    "ef_construct": profile["ef_construct"],
+                    "hnsw_ef": hnsw_ef,
+                    "exact": exact,
+                    "p50_ms": percentile(latencies, 50),
+                    "p95_ms": percentile(latencies, 95),
+                    "recall_at_10": recall_at_k(results, truth),
+                }
+                rows.append(row)
+                print(f"  {collection:<14} {profile_name + ('*' if row['auto'] else ''):<8} "
+                      f"m={profile['m']:<3} efc={profile['ef_construct']:<4} "
+                      f"ef={'exact' if exact else str(hnsw_ef):<5} "
+                      f"p50={row['p50_ms']:6.2f}ms p95={row['p95_ms']:6.2f}ms "
+                      f"recall@10={row['recall_at_10']:.3f}")
+        finally:
+            if client.collection_exists(name):
+                client.delete_collection(name)
+
+    return rows
+
+
+def main():
+    from src.collections import ALL_COLLECTIONS, HNSW_PROFILES
+
+    parser = argparse.ArgumentParser(description="HNSW recall/latency sweep")
+    parser.add_argument("--collections", nargs="+", default=ALL_COLLECTIONS)
+    parser.add_argument("--profiles", nargs="+", default=list(HNSW_PROFILES), choices=list(HNSW_PROFILES))
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128, 256],
+                        help="Search-time hnsw_ef values to sweep")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--output", help="Write JSON results to this path")
+    args = parser.parse_args()
+
+    client = qdrant_client()
+    results = []
+    for collection in args.collections:
+        if not client.collection_exists(collection):
+            print(f"  {collection}: not found, skipped")
+            continue
+        results.extend(bench_collection(client, collection, args.queries, args.profiles, args.ef))
+
+    write_results(args.output, "hnsw", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark: Qdrant resident memory vs query latency per storage profile
+
+For each storage profile (collections.STORAGE_PROFILES) the selected
+collections are copied, vectors and payloads included, into temporary
+collections created through Indexer.create_collection, so HNSW profile,
+quantization and payload indexes match a real index. Then it measures:
+
+- resident memory delta of the Qdrant server (`memory_resident_bytes`
+  from /metrics: heap only, memory-mapped files served from the page
+  cache are not counted)
+- p50 / p95 latency of the first pass over the queries (cold-ish: pages
+  may still be cached from the upload) and of a second, warm pass,
+  with payloads returned as the retriever does
+
+The numbers are only meaningful against a dedicated Qdrant instance.
+Combine with quantization via the environment, e.g.
+VECTOR_QUANTIZATION=int8.
+
+用法:
+  python scripts/benchmarks/bench_memory.py
+  python scripts/benchmarks/bench_memory.py --collections c3_plugins c3_ace --queries 200
+  VECTOR_QUANTIZATION=int8 python scripts/benchmarks/bench_memory.py --output memory-int8.json
+"""
+import time
+import argparse
+import urllib.request
+from typing import Optional
+
+from common import (
+    qdrant_client, scroll_all, wait_until_indexed, sample_queries, percentile, write_results,
+)
+
+
+def resident_bytes() -> Optional[int]:
+    """Qdrant `memory_resident_bytes` metric (None if unavailable)"""
+    from src.config import QDRANT_HOST, QDRANT_PORT
+
+    try:
+        with urllib.request.urlopen(f"http://{QDRANT_HOST}:{QDRANT_PORT}/metrics", timeout=10) as response:
+            text = response.read().decode("utf-8")
+    except OSError:
+        return None
+    for line in text.splitlines():
+        if line.startswith("memory_resident_bytes"):
+            return int(float(line.split()[-1]))
+    return None
+
+
+def run_queries(client, name: str, queries, top_k: int = 10):
+    latencies = []
+    for q in queries:
+        t0 = time.perf_counter()
+        client.query_points(collection_name=name, query=q, limit=top_k, with_payload=True)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies
+
+
+def bench_profile(client, profile: str, collections, num_queries: int) -> list:
+    from src.config import QDRANT_HOST, QDRANT_PORT
+    from src.data_processing.indexer import Indexer
+
+    indexer = Indexer(qdrant_host=QDRANT_HOST, qdrant_port=QDRANT_PORT, storage=profile)
+    copies = {}
+    rows = []
+    before = resident_bytes()
+
+    try:
+        for collection in collections:
+            ids, vectors, payloads = scroll_all(client, collection, with_payload=True)
+            if not vectors:
+                continue
+            name = f"{collection}__bench_mem_{profile.replace('-', '_')}"
+            indexer.create_collection(name, recreate=True, dimension=len(vectors[0]), points=len(ids))
+            client.upload_collection(
+                collection_name=name, vectors=vectors, payload=payloads, ids=ids, batch_size=256, parallel=2
+            )
+            copies[collection] = (name, sample_queries(vectors, num_queries), len(ids))
+
+        for name, _, _ in copies.values():
+            wait_until_indexed(client, name)
+        after = resident_bytes()
+        resident_mb = (after - before) / 1024 ** 2 if before is not None and after is not None else None
+        print(f"\n  {profile}: resident memory "
+              + (f"+{resident_mb:.0f} MB" if resident_mb is not None else "n/a (no /metrics)"))
+
+        for collection, (name, queries, points) in copies.items():
+            cold = run_queries(client, name, queries)
+            warm = run_queries(client, name, queries)
+            row = {
+                "profile": profile,
+                "collection": collection,
+                "points": points,
+                "resident_mb_total": resident_mb,
+                "cold_p50_ms": percentile(cold, 50),
+                "cold_p95_ms": percentile(cold, 95),
+                "warm_p50_ms": percentile(warm, 50),
+                "warm_p95_ms": percentile(warm, 95),
+            }
+            rows.append(row)
+            print(f"  {collection:<14} {points:>6} pts  cold p50={row['cold_p50_ms']:6.2f}ms "
+                  f"p95={row['cold_p95_ms']:6.2f}ms  warm p50={row['warm_p50_ms']:6.2f}ms "
+                  f"p95={row['warm_p95_ms']:6.2f}ms")
+    finally:
+        for name, _, _ in copies.values():
+            if client.collection_exists(name):
+                client.delete_collection(name)
+
+    return rows
+
+
+def main():
+    from src.collections import ALL_COLLECTIONS, STORAGE_PROFILES
+
+    parser = argparse.ArgumentParser(description="Storage profile memory/latency benchmark")
+    parser.add_argument("--collections", nargs="+", default=ALL_COLLECTIONS)
+    parser.add_argument("--profiles", nargs="+", default=list(STORAGE_PROFILES), choices=list(STORAGE_PROFILES))
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--output", help="Write JSON results to this path")
+    args = parser.parse_args()
+
+    client = qdrant_client()
+    collections = []
+    for collection in args.collections:
+        if client.collection_exists(collection):
+            collections.append(collection)
+        else:
+            print(f"  {collection}: not found, skipped")
+
+    results = []
+    for profile in args.profiles:
+        results.extend(bench_profile(client, profile, collections, args.queries))
+
+    write_results(args.output, "memory", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark: float32 vs int8 vs binary quantization on the real collections
+
+For each collection the stored vectors are copied into temporary
+collections (one per variant) and queried with a sample of stored
+vectors. Ground truth is an exact (brute-force) float32 search.
+
+Reports per variant:
+- RAM for vectors (estimated: vectors kept in RAM by that configuration)
+- p50 / p99 query latency
+- recall@10 against the exact float32 top-10
+
+用法:
+  python scripts/benchmarks/bench_quantization.py
+  python scripts/benchmarks/bench_quantization.py --collections c3_plugins c3_ace --queries 200
+  python scripts/benchmarks/bench_quantization.py --oversampling 1 2 4 --output quant.json
+"""
+import time
+import argparse
+
+from common import (
+    qdrant_client, scroll_all, wait_until_indexed, sample_queries, percentile, write_results,
+)
+
+
+VARIANTS = [None, "int8", "binary"]
+
+
+def ram_bytes(kind, count: int, dim: int) -> int:
+    """Vector bytes resident in RAM for a configuration (HNSW graph excluded)"""
+    if kind == "int8":
+        return count * dim
+    if kind == "binary":
+        return count * dim // 8
+    return count * dim * 4
+
+
+def create_variant(client, name: str, kind, dim: int, ids, vectors):
+    from qdrant_client.http import models
+    from src.data_processing.indexer import quantization_config
+
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    quantization = quantization_config(kind)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=models.VectorParams(
+            size=dim, distance=models.Distance.COSINE, on_disk=quantization is not None
+        ),
+        quantization_config=quantization,
+    )
+    client.upload_collection(collection_name=name, vectors=vectors, ids=ids, batch_size=256, parallel=2)
+    wait_until_indexed(client, name)
+
+
+def run_queries(client, name: str, queries, params, top_k: int = 10):
+    latencies, results = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        points = client.query_points(
+            collection_name=name, query=q, limit=top_k, search_params=params
+        ).points
+        latencies.append((time.perf_counter() - t0) * 1000)
+        results.append([p.id for p in points])
+    return latencies, results
+
+
+def recall_at_k(results, truth, k: int = 10) -> float:
+    hits = sum(len(set(r[:k]) & set(t[:k])) for r, t in zip(results, truth))
+    total = sum(min(k, len(t)) for t in truth)
+    return hits / total if total else 0.0
+
+
+def bench_collection(client, collection: str, num_queries: int, oversamplings) -> list:
+    from qdrant_client.http import models
+
+    ids, vectors, _ = scroll_all(client, collection)
+    if not vectors:
+        print(f"  {collection}: empty, skipped")
+        return []
+    dim = len(vectors[0])
+    queries = sample_queries(vectors, num_queries)
+    rows = []
+
+    try:
+        for kind in VARIANTS:
+            create_variant(client, f"{collection}__bench_{kind or 'float32'}", kind, dim, ids, vectors)
+
+        float32_name = f"{collection}__bench_float32"
+        _, truth = run_queries(client, float32_name, queries, models.SearchParams(exact=True))
+
+        for kind in VARIANTS:
+            name = f"{collection}__bench_{kind or 'float32'}"
+            settings = [(None, None)] if kind is None else [(o, True) for o in oversamplings] + [(1.0, False)]
+            for oversampling, rescore in settings:
+                params = None
+                if kind is not None:
+                    params = models.SearchParams(quantization=models.QuantizationSearchParams(
+                        ignore=False, rescore=rescore, oversampling=oversampling
+                    ))
+                latencies, results = run_queries(client, name, queries, params)
+                row = {
+                    "collection": collection,
+                    "points": len(ids),
+                    "quantization": kind or "float32",
+                    "oversampling": oversampling,
+                    "rescore": rescore,
+                    "vector_ram_mb": ram_bytes(kind, len(ids), dim) / 1024 / 1024,
+                    "p50_ms": percentile(latencies, 50),
+                    "p99_ms": percentile(latencies, 99),
+                    "recall_at_10": recall_at_k(results, truth),
+                }
+                rows.append(row)
+                print(f"  {collection:<14} {row['quantization']:<8} os={str(oversampling):<4} "
+                      f"rescore={str(rescore):<5} ram={row['vector_ram_mb']:7.1f}MB "
+                      f"p50={row['p50_ms']:6.2f}ms p99={row['p99_ms']:6.2f}ms "
+                      f"recall@10={row['recall_at_10']:.3f}")
+    finally:
+        for kind in VARIANTS:
+            name = f"{collection}__bench_{kind or 'float32'}"
+            if client.collection_exists(name):
+                client.delete_collection(name)
+
+    return rows
+
+
+def main():
+    from src.collections import ALL_COLLECTIONS
+
+    parser = argparse.ArgumentParser(description="Quantization memory/latency/recall benchmark")
+    parser.add_argument("--collections", nargs="+", default=ALL_COLLECTIONS)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--oversampling", type=float, nargs="+", default=[2.0])
+    parser.add_argument("--output", help="Write JSON results to this path")
+    args = parser.parse_args()
+
+    client = qdrant_client()
+    results = []
+    for collection in args.collections:
+        if not client.collection_exists(collection):
+            print(f"  {collection}: not found, skipped")
+            continue
+        results.extend(bench_collection(client, collection, args.queries, args.oversampling))
+
+    write_results(args.output, "quantization", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: per-collection searches vs the embed-once query plan
+
+Both modes run the searches of `search_all` (eight collections, same
+limits and thresholds) for the sample queries:
+
+- per-collection   search_collection per collection: one encode + one
+                   query_points each (the previous search_all path)
+- plan             execute_plan: one encode of the query, one
+                   query_batch_points per collection
+
+Requires the embedding model and indexed collections. Reports p50 / p95
+end-to-end latency and the number of encoder calls per query.
+
+用法:
+  python scripts/benchmarks/bench_query_plan.py
+  python scripts/benchmarks/bench_query_plan.py --queries 50 --top-k 5 --output plan.json
+"""
+import time
+import argparse
+
+from common import load_sample_texts, percentile, write_results
+
+
+def main():
+    from src.config import QDRANT_HOST, QDRANT_PORT, EMBEDDING_MODEL
+    from src.rag.retriever import HybridRetriever
+
+    parser = argparse.ArgumentParser(description="Per-collection search vs query plan latency")
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--top-k", type=int, default=5, help="Results per collection")
+    parser.add_argument("--output", help="Write JSON results to this path")
+    args = parser.parse_args()
+
+    retriever = HybridRetriever(QDRANT_HOST, QDRANT_PORT, EMBEDDING_MODEL, unified=False)
+    ok, message = retriever.check_health()
+    if not ok:
+        print(message)
+        return
+
+    # 短文本作为查询 (截断到查询的常见长度)
+    queries = [text[:80] for text in load_sample_texts(args.queries)]
+
+    # 统计编码器调用次数
+    model = retriever.embedder.model
+    encode = model.encode
+    calls = {"count": 0}
+
+    def counting_encode(*a, **kw):
+        calls["count"] += 1
+        return encode(*a, **kw)
+
+    model.encode = counting_encode
+    encode(["warm up"], show_progress_bar=False)
+
+    def per_collection(query):
+        return [
+            retriever.search_collection(
+                request.collection, query, request.top_k, score_threshold=request.score_threshold
+            )
+            for request in retriever.plan_search_all([query], args.top_k)
+        ]
+
+    def plan(query):
+        return retriever.execute_plan(retriever.plan_search_all([query], args.top_k))
+
+    results = []
+    print(f"\n  {len(queries)} queries x {len(retriever.SEARCH_ALL_KEYS)} collections (top-{args.top_k})")
+    for mode, fn in [("per-collection", per_collection), ("plan", plan)]:
+        latencies = []
+        calls["count"] = 0
+        for query in queries:
+            t0 = time.perf_counter()
+            fn(query)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        row = {
+            "mode": mode,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "encodes_per_query": calls["count"] / max(1, len(queries)),
+        }
+        results.append(row)
+        print(f"  {mode:<15} p50={row['p50_ms']:8.2f}ms p95={row['p95_ms']:8.2f}ms "
+              f"encodes/query={row['encodes_per_query']:.1f}")
+
+    write_results(args.output, "query_plan", results)
+
+
+if __name__ == "__main__":
+    main()
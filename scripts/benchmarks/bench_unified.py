@@ -0,0 +1,106 @@
+"""
+Benchmark: per-collection fan-out vs one query on the unified collection
+
+Queries are stored vectors sampled from UNIFIED_COLLECTION (no embedding
+model needed), so only retrieval is timed. Requires the unified
+collection (`python -m src.data_processing.indexer --unified`).
+
+Modes:
+- fanout     one query_points per collection, sequential (search_all_with_rerank)
+- grouped    one query_points_groups on the unified collection, top-k per collection
+- flat       one query_points on the unified collection, global top-k
+
+Reports p50 / p95 latency per mode and the overlap of the global top-10
+of fan-out (merged by raw score) with the flat unified top-10.
+
+用法:
+  python scripts/benchmarks/bench_unified.py
+  python scripts/benchmarks/bench_unified.py --queries 200 --top-k 5 --output unified.json
+"""
+import time
+import random
+import argparse
+
+from common import qdrant_client, percentile, write_results
+
+
+SEARCH_COLLECTIONS = ["guide", "interface", "project", "plugins", "behaviors", "scripting", "terms", "examples"]
+
+
+def sample_vectors(client, collection: str, count: int, seed: int = 7):
+    """Sample stored vectors of a collection to use as queries"""
+    points, _ = client.scroll(collection_name=collection, limit=max(count * 5, 500), with_vectors=True)
+    vectors = [p.vector[""] if isinstance(p.vector, dict) else p.vector for p in points]
+    return random.Random(seed).sample(vectors, min(count, len(vectors)))
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - t0) * 1000, result
+
+
+def main():
+    from qdrant_client.http import models
+    from src.collections import COLLECTIONS, UNIFIED_COLLECTION
+
+    parser = argparse.ArgumentParser(description="Fan-out vs unified collection latency")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5, help="Results per collection")
+    parser.add_argument("--final-top-k", type=int, default=10)
+    parser.add_argument("--output", help="Write JSON results to this path")
+    args = parser.parse_args()
+
+    client = qdrant_client()
+    if not client.collection_exists(UNIFIED_COLLECTION):
+        print(f"{UNIFIED_COLLECTION} not found. Build it with: python -m src.data_processing.indexer --unified")
+        return
+
+    collections = [COLLECTIONS[key] for key in SEARCH_COLLECTIONS if client.collection_exists(COLLECTIONS[key])]
+    queries = sample_vectors(client, UNIFIED_COLLECTION, args.queries)
+    in_collections = models.Filter(must=[
+        models.FieldCondition(key="collection", match=models.MatchAny(any=collections))
+    ])
+
+    latencies = {"fanout": [], "grouped": [], "flat": []}
+    overlaps = []
+    for q in queries:
+        ms, fanout = timed(lambda: [
+            hit
+            for c in collections
+            for hit in client.query_points(collection_name=c, query=q, limit=args.top_k, with_payload=True).points
+        ])
+        latencies["fanout"].append(ms)
+
+        ms, _ = timed(lambda: client.query_points_groups(
+            collection_name=UNIFIED_COLLECTION, query=q, group_by="collection",
+            limit=len(collections), group_size=args.top_k, query_filter=in_collections, with_payload=True
+        ))
+        latencies["grouped"].append(ms)
+
+        ms, flat = timed(lambda: client.query_points(
+            collection_name=UNIFIED_COLLECTION, query=q, limit=args.final_top_k,
+            query_filter=in_collections, with_payload=True
+        ).points)
+        latencies["flat"].append(ms)
+
+        # 点 ID 不同，按文本比较
+        top_fanout = {h.payload.get("text") for h in sorted(fanout, key=lambda h: h.score, reverse=True)[:args.final_top_k]}
+        top_flat = {h.payload.get("text") for h in flat}
+        overlaps.append(len(top_fanout & top_flat) / max(1, len(top_flat)))
+
+    results = []
+    print(f"\n  {len(queries)} queries over {len(collections)} collections (top-{args.top_k} each)")
+    for mode, values in latencies.items():
+        row = {"mode": mode, "p50_ms": percentile(values, 50), "p95_ms": percentile(values, 95)}
+        results.append(row)
+        print(f"  {mode:<8} p50={row['p50_ms']:7.2f}ms p95={row['p95_ms']:7.2f}ms")
+    overlap = sum(overlaps) / len(overlaps) if overlaps else 0.0
+    print(f"  top-{args.final_top_k} overlap fan-out vs unified: {overlap:.3f}")
+    results.append({"mode": "overlap", "top_k": args.final_top_k, "overlap": overlap})
+
+    write_results(args.output, "unified", results)
+
+
+if __name__ == "__main__":
+    main()
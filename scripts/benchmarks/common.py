@@ -0,0 +1,109 @@
+"""
+Shared helpers for benchmark scripts
+
+Sample corpus = markdown chunks (if Construct3-Manual is checked out)
++ ACE schema entries + translation terms, i.e. the same mix of long and
+short texts that index_all_data embeds.
+"""
+import sys
+import json
+import random
+import platform
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+def load_sample_texts(limit: int = 2000, seed: int = 42) -> List[str]:
+    """Load a shuffled sample of texts from the indexed data sources"""
+    from src.config import SOURCE_DIR, TRANSLATION_CSV
+    from src.data_processing.csv_parser import CSVParser
+    from src.data_processing.markdown_parser import MarkdownParser
+    from src.data_processing.schema_parser import SchemaParser
+
+    texts: List[str] = []
+
+    md_parser = MarkdownParser()
+    if md_parser.base_dir.exists():
+        texts.extend(chunk.text for chunk in md_parser.parse_directory())
+
+    schema_parser = SchemaParser()
+    texts.extend(doc["text"] for doc in schema_parser.export_ace_for_vectordb())
+
+    csv_path = SOURCE_DIR / TRANSLATION_CSV
+    if csv_path.exists():
+        texts.extend(entry.full_text for entry in CSVParser().parse_file(csv_path))
+
+    random.Random(seed).shuffle(texts)
+    return texts[:limit]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def write_results(path: Optional[str], name: str, results: Any):
+    """Write benchmark results as JSON (with host info) if a path is given"""
+    if not path:
+        return
+    data = {
+        "benchmark": name,
+        "host": {"platform": platform.platform(), "python": platform.python_version()},
+        "results": results,
+    }
+    Path(path).write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\nResults written to {path}")
+
+
+def qdrant_client():
+    """Qdrant client from config"""
+    from qdrant_client import QdrantClient
+    from src.config import QDRANT_HOST, QDRANT_PORT
+    return QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT, timeout=120)
+
+
+def scroll_all(client, collection: str, with_payload: bool = False, batch: int = 1000):
+    """Read every point of a collection: (ids, vectors, payloads)"""
+    ids, vectors, payloads = [], [], []
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection,
+            limit=batch,
+            offset=offset,
+            with_vectors=True,
+            with_payload=with_payload,
+        )
+        for p in points:
+            ids.append(p.id)
+            vectors.append(p.vector)
+            payloads.append(p.payload if with_payload else None)
+        if offset is None:
+            break
+    return ids, vectors, payloads
+
+
+def wait_until_indexed(client, collection: str, timeout: float = 600):
+    """Wait for the optimizer to finish (status green)"""
+    import time
+    from qdrant_client.http import models
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if client.get_collection(collection).status == models.CollectionStatus.GREEN:
+            return
+        time.sleep(0.5)
+    print(f"  Warning: {collection} still optimizing after {timeout}s")
+
+
+def sample_queries(vectors: List[List[float]], count: int, seed: int = 7) -> List[List[float]]:
+    """Sample stored vectors to use as queries"""
+    rng = random.Random(seed)
+    return rng.sample(vectors, min(count, len(vectors)))
@@ -9,6 +9,7 @@ __all__ = [
     "COLLECTIONS",
     "DOC_COLLECTIONS",
     "ALL_COLLECTIONS",
+    "UNIFIED_COLLECTION",
     "DIR_TO_COLLECTION",
     "SUBCATEGORY_MAPPING",
     "COLLECTION_DESCRIPTIONS",
@@ -16,11 +17,18 @@ __all__ = [
     "BEHAVIOR_CATEGORIES",
     "ACE_TYPES",
     "ACE_PARAM_TYPES",
+    "COLLECTION_QUANTIZATION",
+    "HNSW_PROFILES",
+    "HNSW_AUTO_PROFILES",
+    "COLLECTION_HNSW",
+    "STORAGE_PROFILES",
+    "PAYLOAD_INDEXES",
 ]
 
 # ============================================================
 # 集合定义
 # ============================================================
+# 注: --rebuild 后这些名称是 Qdrant alias，指向 c3_xxx__vN 版本化集合
 
 COLLECTIONS = {
     # === 文档集合 ===
@@ -52,6 +60,106 @@ DOC_COLLECTIONS = [
 # 所有集合
 ALL_COLLECTIONS = list(COLLECTIONS.values())
 
+# 统一集合 (config.UNIFIED_COLLECTION_MODE): 由以上集合合并而来，payload "collection" 标记来源
+UNIFIED_COLLECTION = "c3_all"
+
+
+# ============================================================
+# 向量量化 (按集合覆盖 config.VECTOR_QUANTIZATION)
+# ============================================================
+# "int8": 标量量化，内存约 1/4，召回几乎无损
+# "binary": 二值量化，内存约 1/32，需配合 oversampling + rescore
+# None: 不量化 (float32)
+
+COLLECTION_QUANTIZATION = {
+    # 例: COLLECTIONS["terms"]: "int8",
+}
+
+
+# ============================================================
+# HNSW 参数 (按集合覆盖 config.HNSW_PROFILE)
+# ============================================================
+# m: 每个节点的连边数，越大召回越高、图越占内存
+# ef_construct: 建图时的候选数，越大建图越慢、图质量越高
+# full_scan_threshold: 向量数据小于该值 (KB) 时不走 HNSW，直接全量扫描
+# hnsw_ef: 检索时的候选数 (None = Qdrant 默认，即 ef_construct)
+# exact: 检索时强制精确 (brute-force) 搜索
+# m / ef_construct / full_scan_threshold 需 --rebuild 生效，hnsw_ef / exact 检索时立即生效
+
+HNSW_PROFILES = {
+    # Qdrant 默认值
+    "default": {"m": 16, "ef_construct": 100, "full_scan_threshold": 10000, "hnsw_ef": None, "exact": False},
+    # 几百条长文档 (如 c3_guide): 全量扫描只需几毫秒且召回 100%，不必建图
+    "small": {"m": 16, "ef_construct": 100, "full_scan_threshold": 10000, "hnsw_ef": None, "exact": True},
+    # 数千条短文本 (如 c3_terms / c3_ace): 默认图 + 更大的检索 ef
+    "medium": {"m": 16, "ef_construct": 128, "full_scan_threshold": 10000, "hnsw_ef": 64, "exact": False},
+    # 数万条以上: 更密的图才能维持召回
+    "large": {"m": 32, "ef_construct": 256, "full_scan_threshold": 10000, "hnsw_ef": 128, "exact": False},
+}
+
+# "auto" 时按集合点数选择: (点数上限, profile)，None 为无上限
+HNSW_AUTO_PROFILES = [
+    (2000, "small"),
+    (50000, "medium"),
+    (None, "large"),
+]
+
+COLLECTION_HNSW = {
+    # 例: COLLECTIONS["guide"]: "small",
+    # 例: COLLECTIONS["ace"]: {"m": 16, "ef_construct": 200, "hnsw_ef": 96},  # 在 default 基础上覆盖
+}
+
+
+# ============================================================
+# 存储 profile (config.STORAGE_PROFILE，对所有集合生效，需 --rebuild)
+# ============================================================
+# vectors_on_disk: 原始向量 memmap 到磁盘 (量化向量仍常驻内存，见 COLLECTION_QUANTIZATION)
+# payload_on_disk: payload (分块全文) 存磁盘，仅在返回结果时读取
+# payload_index_on_disk / sparse_index_on_disk: payload 索引 / 稀疏向量索引存磁盘
+# memmap_threshold: 段大小超过该值 (KB) 时转为 memmap 存储
+# None = 沿用 Qdrant 服务端默认配置
+# HNSW 图始终在内存中 (磁盘上的图随机读太慢)
+
+STORAGE_PROFILES = {
+    # Qdrant 默认: 向量、索引在内存中，延迟最低
+    "default": {
+        "vectors_on_disk": False,
+        "payload_on_disk": None,
+        "payload_index_on_disk": False,
+        "sparse_index_on_disk": None,
+        "memmap_threshold": None,
+    },
+    # 小内存主机: 常驻内存只剩 HNSW 图 (+ 量化向量)，依赖 page cache 缓存热数据
+    "low-memory": {
+        "vectors_on_disk": True,
+        "payload_on_disk": True,
+        "payload_index_on_disk": True,
+        "sparse_index_on_disk": True,
+        "memmap_threshold": 20000,  # ~5000 条 1024 维 float32，写入中的小段仍在内存
+    },
+}
+
+
+# ============================================================
+# Payload 索引 (检索时按 metadata 在服务端预过滤)
+# ============================================================
+# 字段 → Qdrant payload schema 类型；缺少该字段的集合建索引不受影响
+
+PAYLOAD_INDEXES = {
+    # 文档集合 (MarkdownParser)
+    "collection": "keyword",
+    "subcategory": "keyword",
+    "section_type": "keyword",
+    "source": "keyword",
+    "parent_section_id": "keyword",  # 超长段落分片 → 重组
+    # ACE 集合 (SchemaParser)
+    "plugin_name": "keyword",
+    "plugin_type": "keyword",
+    "ace_type": "keyword",
+    # 示例集合 (ProjectParser)
+    "project": "keyword",
+}
+
 
 # ============================================================
 # 目录 → 集合映射
@@ -12,6 +12,7 @@ BASE_DIR = Path(__file__).parent.parent
 SOURCE_DIR = BASE_DIR / "source"  # 外部资料 (CSV 翻译文件等)
 DATA_DIR = BASE_DIR / "data"  # 生成的数据 (Schema 等)
 SCHEMA_DIR = DATA_DIR / "schemas"  # 生成的数据 (Generated Data)
+INDEX_STATE_DIR = DATA_DIR / "index"  # 索引状态 (manifest 等，不入库)
 
 # =============================================================================
 # 外部资料 (External Sources)
@@ -24,6 +25,7 @@ TRANSLATION_CSV = "zh-CN_R466.csv"
 # 外部仓库 (位于父目录的兄弟仓库)
 MANUAL_REPO = "Construct3-Manual"  # https://github.com/XHXIAIEIN/Construct3-Manual
 EXAMPLE_REPO = "Construct-Example-Projects"  # https://github.com/Scirra/Construct-Example-Projects
+EXAMPLE_PROJECTS_DIR = BASE_DIR.parent / EXAMPLE_REPO / "example-projects"
 
 # =============================================================================
 # Vector Database
@@ -31,6 +33,46 @@ EXAMPLE_REPO = "Construct-Example-Projects"  # https://github.com/Scirra/Constru
 QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
 QDRANT_PORT = int(os.getenv("QDRANT_PORT", "6333"))
 
+# --rebuild 时先构建 c3_xxx__vN 再原子切换 alias，保留最近 N 个版本
+COLLECTION_RETENTION = int(os.getenv("COLLECTION_RETENTION", "2"))
+
+# 向量量化: "" (float32) / "int8" / "binary"，可在 collections.COLLECTION_QUANTIZATION 中按集合覆盖
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "")
+# 量化集合检索: 先取 top_k * oversampling 个候选，再用原始向量重排
+SEARCH_OVERSAMPLING = float(os.getenv("SEARCH_OVERSAMPLING", "2.0"))
+SEARCH_RESCORE = os.getenv("SEARCH_RESCORE", "true").lower() == "true"
+
+# HNSW 参数 profile: "auto" (按集合点数选择) / "default" / "small" / "medium" / "large"
+# 见 collections.HNSW_PROFILES，可在 collections.COLLECTION_HNSW 中按集合覆盖
+HNSW_PROFILE = os.getenv("HNSW_PROFILE", "auto")
+
+# 统一集合: 索引后把所有 c3_* 集合合并到 collections.UNIFIED_COLLECTION (payload "collection" 区分来源)，
+# 检索时 search_all 的各集合查询合为一次批量请求 (阈值、BM25 融合不变)，各 search_* 方法自动改为按 collection 过滤
+UNIFIED_COLLECTION_MODE = os.getenv("UNIFIED_COLLECTION_MODE", "false").lower() == "true"
+
+# 存储 profile: "default" (全部在内存) / "low-memory" (原始向量 + payload memmap 到磁盘)
+# 见 collections.STORAGE_PROFILES，可用 scripts/benchmarks/bench_memory.py 比较内存与延迟
+STORAGE_PROFILE = os.getenv("STORAGE_PROFILE", "default")
+
+# bge-m3 稀疏 (lexical) 向量: 索引时与 dense 向量一起写入 (需 --rebuild)，
+# 检索时服务端融合 dense + sparse (HybridRetriever.search_hybrid)。
+# 两种向量来自同一次 bge-m3 前向 (FlagEmbedding，仅 torch 后端)，稀疏权重随 EmbeddingCache 缓存
+SPARSE_VECTORS = os.getenv("SPARSE_VECTORS", "false").lower() == "true"
+HYBRID_FUSION = os.getenv("HYBRID_FUSION", "rrf")  # "rrf" / "dbsf"
+HYBRID_PREFETCH = int(os.getenv("HYBRID_PREFETCH", "4"))  # 每路预取 top_k * N 个候选
+
+# BM25 关键词索引: 索引时为每个集合构建到 BM25_DIR (中文二元组 + 英文词/标识符)，
+# 检索时 search_all / search_all_with_rerank 按 RRF 融合向量与 BM25 结果 (精确 ACE / 表达式名)；
+# BM25 命中与向量检索使用同一余弦阈值和过滤条件，分数仍为余弦相似度
+BM25_DIR = INDEX_STATE_DIR / "bm25"
+BM25_FUSION = os.getenv("BM25_FUSION", "false").lower() == "true"
+
+# 异步检索 (AsyncHybridRetriever): RAGChain 并发检索各集合，同时进行的请求数，及单个集合的超时 (秒)
+# 超时的集合返回空结果，其余集合的结果照常重排 (部分结果)
+ASYNC_RETRIEVAL = os.getenv("ASYNC_RETRIEVAL", "false").lower() == "true"
+SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", "8"))
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "2.0"))
+
 # =============================================================================
 # Embedding Model
 # =============================================================================
@@ -38,6 +80,38 @@ QDRANT_PORT = int(os.getenv("QDRANT_PORT", "6333"))
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "BAAI/bge-m3")
 EMBEDDING_DIMENSION = 1024
 
+# 推理后端: "torch" (SentenceTransformer) / "onnx" (ONNX Runtime + int8 动态量化，省内存、CPU 更快)
+# 首次使用 onnx 时自动导出到 ONNX_MODEL_DIR，可用 python -m src.data_processing.onnx_backend --check 校验一致性
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = Path(os.getenv("ONNX_MODEL_DIR", str(DATA_DIR / "onnx")))
+
+# 磁盘向量缓存 (重建索引时复用已计算的向量)
+EMBEDDING_CACHE_DIR = Path(os.getenv("EMBEDDING_CACHE_DIR", str(DATA_DIR / "embedding_cache")))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+# 查询向量内存缓存 (检索时重复的问题、RAGChain 重试路径不再重复前向计算)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "2048"))  # 最多缓存的查询数; 0 = 关闭
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "0"))  # 过期秒数; 0 = 不过期
+
+# 检索结果内存缓存 (search_all_with_rerank)，按索引 generation 自动失效; 0 = 关闭
+RESULT_CACHE_MB = int(os.getenv("RESULT_CACHE_MB", "64"))
+# 结果缓存过期秒数; 0 = 不过期。generation 记录在 INDEX_STATE_DIR，检索端与索引器不共享该目录时
+# (其他主机 / 未挂载该卷的容器) 看不到索引更新，过期时间是缓存结果陈旧程度的上限
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "300"))
+
+# 按 token 预算动态分批 (批次内最长文本 token 数 x 条数 <= 预算; 0 = 固定 batch_size)
+EMBEDDING_TOKEN_BUDGET = int(os.getenv("EMBEDDING_TOKEN_BUDGET", "16384"))
+
+# 多进程 Embedding (索引时使用; 0 = 单进程)
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "0"))
+EMBEDDING_THREADS_PER_WORKER = int(os.getenv("EMBEDDING_THREADS_PER_WORKER", "0"))  # 0 = CPU 核数 / workers
+
+# 分布式重建 (coordinator + 多个 worker 进程/主机写入同一个 Qdrant)
+# 租约表 (SQLite) 与分片文件所在目录；多台机器时放在共享存储上
+DISTRIBUTED_DIR = Path(os.getenv("DISTRIBUTED_DIR", str(INDEX_STATE_DIR / "distributed")))
+DISTRIBUTED_SHARDS = int(os.getenv("DISTRIBUTED_SHARDS", "8"))  # 每个集合的分片数
+DISTRIBUTED_LEASE_SECONDS = int(os.getenv("DISTRIBUTED_LEASE_SECONDS", "300"))  # 超时未续约的分片可被其他 worker 接管
+
 # =============================================================================
 # LLM Configuration (Ollama)
 # =============================================================================
@@ -48,5 +122,9 @@ LLM_BASE_URL = os.getenv("LLM_BASE_URL", "http://localhost:11434")
 # =============================================================================
 # RAG Settings
 # =============================================================================
-MAX_CHUNK_SIZE = 2000  # 超长 H2 段落的分割阈值
+MAX_CHUNK_SIZE = 2000  # 超长 H2 段落的分割阈值 (字符数，无 tokenizer 时使用)
+MAX_CHUNK_TOKENS = int(os.getenv("MAX_CHUNK_TOKENS", "512"))  # 超长 H2 段落的分割阈值 (Embedding tokenizer 的 token 数)
+# 嵌入前合并重复分块 (MinHash 估计的 Jaccard 相似度阈值; 1.0 = 仅完全重复, 0 = 关闭)
+# 近似重复 (< 1.0, 如 0.9) 会丢弃仅有几行不同的分块文本，需显式开启
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "1.0"))
 TOP_K = 5  # 检索返回的文档数量
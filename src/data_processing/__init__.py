@@ -1,4 +1,3 @@
 # Data processing modules for Construct 3 RAG
 from .markdown_parser import MarkdownParser, MarkdownChunk
 from .csv_parser import CSVParser
-from .sitemap_parser import SitemapParser
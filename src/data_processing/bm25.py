@@ -0,0 +1,308 @@
+"""
+BM25 Keyword Index for Construct 3 RAG
+Compact inverted index over chunk texts for exact-term (lexical) retrieval
+
+Tokenization:
+- CJK runs become character bigrams (a single character stays a unigram)
+- Latin text becomes lowercase words; identifiers such as
+  `set-instvar-value` or `Sprite.AnimationFrame` are kept whole and
+  also split into their parts
+
+Layout (one directory per collection, arrays loaded with mmap):
+    meta.json        vocabulary (term -> id), BM25 parameters, document count
+    offsets.npy      int64 [n_terms + 1], start of each term's postings
+    docs.npy         int32 postings: document index, impact-ordered per term
+    impacts.npy      float32 postings: precomputed BM25 score of the term in the document
+    doc_docs.npy     int32 the same postings, document-ordered per term (same offsets)
+    doc_impacts.npy  float32 impacts in document order
+    point_ids.npy    int64 [n_docs], Qdrant point ID of each document
+
+Postings are sorted by impact, so a query reads the best postings of
+every term first and stops once no unread posting can change the top-k.
+The final top-k scores are then completed exactly by binary search in
+the document-ordered copy (k lookups per term instead of a tail scan).
+
+用法:
+    index = BM25Index.build(texts, point_ids)
+    index.save(BM25_DIR / "c3_ace")
+    index = BM25Index.load(BM25_DIR / "c3_ace")
+    index.search("Sprite 设置动画帧 set-animation-frame", top_k=10)   # [(point_id, score)]
+"""
+import re
+import json
+import shutil
+import unicodedata
+from pathlib import Path
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+
+# CJK 统一表意文字 (含扩展 A、兼容) | 英文单词 / 标识符 (连字符、点号连接)
+TOKEN_PATTERN = re.compile(
+    r"([\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+)|([a-z0-9_]+(?:[-.][a-z0-9_]+)*)"
+)
+IDENTIFIER_SEPARATORS = re.compile(r"[-._]+")
+
+# 查询词数上限 (已读标记用 int64 位掩码)
+MAX_QUERY_TERMS = 62
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokenize mixed Chinese / English text (CJK bigrams + words + identifier parts)"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    tokens: List[str] = []
+    for cjk, word in TOKEN_PATTERN.findall(text):
+        if cjk:
+            if len(cjk) == 1:
+                tokens.append(cjk)
+            else:
+                tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+        else:
+            tokens.append(word)
+            parts = [p for p in IDENTIFIER_SEPARATORS.split(word) if p]
+            if len(parts) > 1:
+                tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """
+    Impact-ordered BM25 inverted index.
+
+    Example:
+        >>> index = BM25Index.build(["Sprite 碰撞检测", "Set animation frame"], [101, 102])
+        >>> index.search("碰撞", top_k=1)
+        [(101, 0.69...)]
+    """
+
+    VERSION = 2
+    META_FILENAME = "meta.json"
+
+    def __init__(
+        self,
+        vocab: Dict[str, int],
+        offsets: np.ndarray,
+        docs: np.ndarray,
+        impacts: np.ndarray,
+        doc_docs: np.ndarray,
+        doc_impacts: np.ndarray,
+        point_ids: np.ndarray,
+        params: Optional[Dict[str, Any]] = None
+    ):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.docs = docs
+        self.impacts = impacts
+        self.doc_docs = doc_docs
+        self.doc_impacts = doc_impacts
+        self.point_ids = point_ids
+        self.params = params or {}
+
+    def __len__(self) -> int:
+        return len(self.point_ids)
+
+    @classmethod
+    def build(cls, texts: List[str], point_ids: List[int], k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        """
+        Build an index from chunk texts.
+
+        Args:
+            texts: Chunk texts
+            point_ids: Qdrant point ID of each text (returned by `search`)
+            k1: Term frequency saturation
+            b: Document length normalization
+        """
+        vocab: Dict[str, int] = {}
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        freqs: List[int] = []
+        lengths = np.zeros(len(texts), dtype=np.float32)
+
+        for d, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths[d] = sum(counts.values())
+            for term, tf in counts.items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_ids.append(d)
+                freqs.append(tf)
+
+        terms = np.asarray(term_ids, dtype=np.int64)
+        docs = np.asarray(doc_ids, dtype=np.int32)
+        tf = np.asarray(freqs, dtype=np.float32)
+
+        n_docs = len(texts)
+        avgdl = float(lengths.mean()) if n_docs and lengths.mean() > 0 else 1.0
+        df = np.bincount(terms, minlength=len(vocab)).astype(np.float32)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        norm = k1 * (1 - b + b * lengths[docs] / avgdl)
+        impacts = idf[terms] * tf * (k1 + 1) / (tf + norm)
+
+        # 按词分组，组内按 impact 降序; 第二份组内按文档序 (补全分数时二分查找)
+        order = np.lexsort((-impacts, terms))
+        doc_order = np.lexsort((docs, terms))
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(df.astype(np.int64))
+
+        return cls(
+            vocab, offsets, docs[order], impacts[order].astype(np.float32),
+            docs[doc_order], impacts[doc_order].astype(np.float32),
+            np.asarray(point_ids, dtype=np.int64),
+            {"k1": k1, "b": b, "avgdl": avgdl, "documents": n_docs, "postings": int(len(docs))}
+        )
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path: Path):
+        """Write the index directory, swapped in by directory rename"""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        if tmp_path.exists():
+            shutil.rmtree(tmp_path)
+        tmp_path.mkdir(parents=True)
+
+        np.save(tmp_path / "offsets.npy", self.offsets)
+        np.save(tmp_path / "docs.npy", self.docs)
+        np.save(tmp_path / "impacts.npy", self.impacts)
+        np.save(tmp_path / "doc_docs.npy", self.doc_docs)
+        np.save(tmp_path / "doc_impacts.npy", self.doc_impacts)
+        np.save(tmp_path / "point_ids.npy", self.point_ids)
+        meta = {"version": self.VERSION, "params": self.params, "vocab": self.vocab}
+        (tmp_path / self.META_FILENAME).write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+        # 已打开的 mmap 在 Linux/macOS 上仍指向旧文件
+        old_path = path.with_name(path.name + ".old")
+        if old_path.exists():
+            shutil.rmtree(old_path)
+        if path.exists():
+            path.rename(old_path)
+        tmp_path.rename(path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        """Load an index, memory-mapping the posting arrays"""
+        path = Path(path)
+        meta = json.loads((path / cls.META_FILENAME).read_text(encoding="utf-8"))
+        if meta.get("version") != cls.VERSION:
+            raise ValueError(f"Unsupported BM25 index version in {path}: {meta.get('version')}")
+        return cls(
+            meta["vocab"],
+            np.load(path / "offsets.npy", mmap_mode="r"),
+            np.load(path / "docs.npy", mmap_mode="r"),
+            np.load(path / "impacts.npy", mmap_mode="r"),
+            np.load(path / "doc_docs.npy", mmap_mode="r"),
+            np.load(path / "doc_impacts.npy", mmap_mode="r"),
+            np.load(path / "point_ids.npy", mmap_mode="r"),
+            meta.get("params", {})
+        )
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def search(self, query: str, top_k: int = 10, block: int = 64) -> List[Tuple[int, float]]:
+        """
+        Top-k documents by BM25 score.
+
+        Reads the postings block by block, always from the term whose next
+        posting has the highest impact. Stops when the k-th best partial
+        score is at least the upper bound of every other document (unseen
+        documents: sum of the next impacts; seen ones: partial score plus
+        the next impacts of terms not seen yet), then completes the scores
+        of the final top-k by binary search in each term's document-ordered
+        postings.
+
+        Returns:
+            [(point_id, score)] sorted by score
+        """
+        counts = Counter(t for t in tokenize(query) if t in self.vocab)
+        if not counts or top_k <= 0:
+            return []
+        terms = [self.vocab[t] for t, _ in counts.most_common(MAX_QUERY_TERMS)]
+        weights = np.array([counts[t] for t, _ in counts.most_common(MAX_QUERY_TERMS)], dtype=np.float32)
+        pos = np.array([self.offsets[t] for t in terms], dtype=np.int64)
+        ends = np.array([self.offsets[t + 1] for t in terms], dtype=np.int64)
+
+        scores = np.zeros(len(self), dtype=np.float32)
+        seen = np.zeros(len(self), dtype=np.int64)
+
+        def next_impacts() -> np.ndarray:
+            return np.array([
+                self.impacts[p] * w if p < e else 0.0 for p, e, w in zip(pos, ends, weights)
+            ], dtype=np.float32)
+
+        while True:
+            upcoming = next_impacts()
+            if not upcoming.any():
+                break  # 全部读完，分数精确
+            i = int(np.argmax(upcoming))
+            stop = min(pos[i] + block, ends[i])
+            ids = self.docs[pos[i]:stop]
+            scores[ids] += self.impacts[pos[i]:stop] * weights[i]
+            seen[ids] |= 1 << i
+            pos[i] = stop
+            block = min(block * 2, 4096)
+            if self._can_stop(scores, seen, next_impacts(), top_k):
+                break
+
+        candidates = np.flatnonzero(seen)
+        top = candidates[np.argsort(-scores[candidates], kind="stable")[:top_k]]
+
+        # 补全 top-k 在未读 posting 中的分数: 每个词对未读到的候选做 k 次二分查找
+        for i, term in enumerate(terms):
+            if pos[i] >= ends[i]:
+                continue
+            missing = top[(seen[top] >> i) & 1 == 0]
+            if not len(missing):
+                continue
+            start, end = self.offsets[term], self.offsets[term + 1]
+            postings = self.doc_docs[start:end]
+            found = np.minimum(np.searchsorted(postings, missing), len(postings) - 1)
+            hit = postings[found] == missing
+            if hit.any():
+                scores[missing[hit]] += np.asarray(self.doc_impacts[start + found[hit]]) * weights[i]
+
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(self.point_ids[d]), float(scores[d])) for d in top]
+
+    @staticmethod
+    def _can_stop(scores: np.ndarray, seen: np.ndarray, upcoming: np.ndarray, top_k: int) -> bool:
+        """Whether the unread postings can no longer change the top-k membership"""
+        candidates = np.flatnonzero(seen)
+        if len(candidates) < top_k:
+            return False
+        partial = scores[candidates]
+        top = np.argpartition(-partial, top_k - 1)[:top_k]
+        kth = partial[top].min()
+        if kth < upcoming.sum():
+            return False
+
+        upper = partial.copy()
+        candidate_seen = seen[candidates]
+        for i, impact in enumerate(upcoming):
+            if impact > 0:
+                upper += impact * ((candidate_seen >> i) & 1 == 0)
+        others = np.ones(len(candidates), dtype=bool)
+        others[top] = False
+        return not others.any() or upper[others].max() <= kth
+
+
+def build_collection_index(
+    collection: str,
+    texts: List[str],
+    point_ids: List[int],
+    base_dir: Optional[Path] = None
+) -> BM25Index:
+    """Build and save the BM25 index of a collection (BM25_DIR/<collection>)"""
+    if base_dir is None:
+        from src.config import BM25_DIR
+        base_dir = BM25_DIR
+    index = BM25Index.build(texts, point_ids)
+    index.save(Path(base_dir) / collection)
+    print(f"  BM25 index: {len(index)} documents, {len(index.vocab)} terms, "
+          f"{index.params['postings']} postings")
+    return index
@@ -0,0 +1,194 @@
+"""
+Near-Duplicate Elimination for Construct 3 RAG
+Collapses identical / near-identical chunks before embedding
+
+Two passes:
+1. Exact: hash of whitespace/case-normalized text
+2. Near (opt-in, threshold < 1.0): MinHash over character shingles, LSH
+   banding for candidate pairs, verified with the estimated Jaccard similarity
+
+Each cluster is kept as its first document (stable chunk key); the
+payload lists every source the text appeared in. Near-duplicates can
+differ in a few lines (parameter tables, version notes) whose text is
+lost when collapsed, so only exact duplicates are collapsed by default.
+Pieces of split sections (`parent_section_id`) are never dropped, so
+every section can still be reassembled from its parts.
+"""
+import re
+import zlib
+import hashlib
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Sequence, Set
+
+import numpy as np
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_PRIME = np.uint64(4294967311)  # > 2^32, 保证 a * x + b 不溢出 uint64
+
+
+def normalize_for_dedup(text: str) -> str:
+    """Lowercase and collapse whitespace"""
+    return _WHITESPACE_RE.sub(" ", text.lower()).strip()
+
+
+def shingles(text: str, k: int = 5) -> Set[int]:
+    """Character k-gram shingles as 32-bit hashes (works for CJK and English)"""
+    text = normalize_for_dedup(text)
+    if len(text) <= k:
+        return {zlib.crc32(text.encode("utf-8"))}
+    return {zlib.crc32(text[i:i + k].encode("utf-8")) for i in range(len(text) - k + 1)}
+
+
+class MinHasher:
+    """MinHash signatures with `num_perm` universal hash functions"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self._a = rng.randint(1, 2 ** 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.randint(0, 2 ** 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    def signature(self, shingle_set: Set[int]) -> np.ndarray:
+        x = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))
+        hashed = (self._a[:, None] * x[None, :] + self._b[:, None]) % _PRIME
+        return hashed.min(axis=1)
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            # 较小下标作为根，簇代表保持为最先出现的文档
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def find_duplicate_clusters(
+    texts: List[str],
+    threshold: float = 0.9,
+    num_perm: int = 64,
+    bands: int = 8,
+    shingle_size: int = 5
+) -> List[List[int]]:
+    """
+    Group texts into clusters of (near-)duplicates.
+
+    Args:
+        texts: Texts to compare
+        threshold: Min estimated Jaccard similarity of shingle sets
+            (1.0 = exact duplicates only)
+        num_perm: MinHash permutations
+        bands: LSH bands (num_perm must be divisible by bands)
+        shingle_size: Characters per shingle
+
+    Returns:
+        Clusters as lists of indices, each sorted, ordered by first index
+    """
+    uf = _UnionFind(len(texts))
+
+    # 1. 完全重复
+    first_by_hash: Dict[str, int] = {}
+    unique: List[int] = []
+    for i, text in enumerate(texts):
+        key = hashlib.sha1(normalize_for_dedup(text).encode("utf-8")).hexdigest()
+        if key in first_by_hash:
+            uf.union(first_by_hash[key], i)
+        else:
+            first_by_hash[key] = i
+            unique.append(i)
+
+    # 2. 近似重复 (MinHash + LSH)
+    if threshold < 1.0 and len(unique) > 1:
+        rows = num_perm // bands
+        hasher = MinHasher(num_perm)
+        signatures = {i: hasher.signature(shingles(texts[i], shingle_size)) for i in unique}
+
+        buckets: Dict[tuple, List[int]] = defaultdict(list)
+        for i in unique:
+            sig = signatures[i]
+            for band in range(bands):
+                buckets[(band, sig[band * rows:(band + 1) * rows].tobytes())].append(i)
+
+        checked = set()
+        for members in buckets.values():
+            for pos, i in enumerate(members):
+                for j in members[pos + 1:]:
+                    if (i, j) in checked:
+                        continue
+                    checked.add((i, j))
+                    if np.mean(signatures[i] == signatures[j]) >= threshold:
+                        uf.union(i, j)
+
+    clusters: Dict[int, List[int]] = defaultdict(list)
+    for i in range(len(texts)):
+        clusters[uf.find(i)].append(i)
+    return sorted(clusters.values(), key=lambda c: c[0])
+
+
+def _source_label(doc: Dict[str, Any], source_fields: Sequence[str]) -> str:
+    metadata = doc.get("metadata", {})
+    parts = [str(metadata[f]) for f in source_fields if metadata.get(f)]
+    return "/".join(parts) if parts else doc["id"]
+
+
+def deduplicate_documents(
+    docs: List[Dict[str, Any]],
+    source_fields: Sequence[str] = ("source",),
+    threshold: float = 1.0,
+    label: Optional[str] = None,
+    keep_fields: Sequence[str] = ("parent_section_id",)
+) -> List[Dict[str, Any]]:
+    """
+    Collapse duplicate documents into one, listing all sources in the payload.
+
+    The kept document gets `metadata["sources"]` (every distinct source
+    label in the cluster) and `metadata["duplicate_count"]`.
+
+    Args:
+        docs: Documents ({"id", "text", "metadata"})
+        source_fields: Metadata fields forming a source label, e.g.
+            ("project", "event_sheet") -> "Platformer/Event sheet 1"
+        threshold: Near-duplicate similarity threshold (1.0 = exact only)
+        label: Name used in the printed summary
+        keep_fields: Documents with any of these metadata fields are never
+            dropped (split section pieces, needed to reassemble the section)
+
+    Returns:
+        Deduplicated documents, in original order
+    """
+    if len(docs) < 2:
+        return docs
+
+    clusters = find_duplicate_clusters([doc["text"] for doc in docs], threshold=threshold)
+
+    def protected(i: int) -> bool:
+        metadata = docs[i].get("metadata", {})
+        return any(field in metadata for field in keep_fields)
+
+    kept_indexes = []
+    for cluster in clusters:
+        # 代表文档 + 受保护的文档 (分割段落的各部分) 保留，其余折叠到代表文档
+        members = [i for i in cluster[1:] if protected(i)]
+        for i in [cluster[0]] + members:
+            doc = docs[i]
+            if i == cluster[0] and len(cluster) > len(members) + 1:
+                sources = list(dict.fromkeys(_source_label(docs[j], source_fields) for j in cluster))
+                doc = {**doc, "metadata": {**doc.get("metadata", {}), "sources": sources,
+                                           "duplicate_count": len(cluster)}}
+            kept_indexes.append((i, doc))
+
+    kept = [doc for _, doc in sorted(kept_indexes, key=lambda item: item[0])]
+    removed = len(docs) - len(kept)
+    if removed:
+        print(f"  Dedup{f' {label}' if label else ''}: {len(docs)} -> {len(kept)} "
+              f"({removed} duplicates collapsed)")
+    return kept
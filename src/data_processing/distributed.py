@@ -0,0 +1,456 @@
+"""
+Distributed Indexing for Construct 3 RAG
+Coordinator / worker mode for full rebuilds across processes or hosts
+
+Coordinator:
+    1. Parses every collection once (same documents as index_all_data)
+    2. Splits each collection into shards by a stable hash of the chunk
+       key and writes them as JSONL next to a SQLite lease table
+    3. Creates the versioned shadow collections and waits for workers
+    4. Verifies every point count against the plan, then switches the
+       aliases and updates the manifest (like `indexer --rebuild`)
+
+Workers claim one shard at a time with a lease and report their offset
+after every upserted batch, which also renews the lease. If a worker
+dies, its lease expires and another worker continues the shard from the
+last reported offset. Point IDs derive from chunk keys, so a batch that
+is written twice just overwrites itself.
+
+Workers only need this repo, the embedding model and access to
+DISTRIBUTED_DIR and Qdrant; they do not parse any sources. They embed
+without the on-disk EmbeddingCache, which is single-process only.
+
+用法:
+  # 单机: coordinator + 4 个 worker 进程
+  python -m src.data_processing.distributed local --workers 4
+  # 多机: DISTRIBUTED_DIR 放在共享存储上
+  python -m src.data_processing.distributed coordinator --shards 16
+  python -m src.data_processing.distributed worker       # 每台机器运行一个或多个
+"""
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import hashlib
+import subprocess
+from pathlib import Path
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+
+
+LEASE_DB_FILENAME = "leases.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS run (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shards (
+    collection TEXT NOT NULL,
+    shard INTEGER NOT NULL,
+    target TEXT NOT NULL,
+    path TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending / leased / done
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL,
+    PRIMARY KEY (collection, shard)
+);
+"""
+
+
+class LeaseLost(Exception):
+    """The worker's lease on a shard expired and was taken over"""
+
+
+def shard_of(chunk_key: str, num_shards: int) -> int:
+    """Stable shard of a document (identical on every host and Python run)"""
+    return int(hashlib.sha1(chunk_key.encode("utf-8")).hexdigest()[:8], 16) % num_shards
+
+
+class LeaseTable:
+    """
+    SQLite table of shards and their leases, shared by coordinator and workers.
+
+    Every operation is a short `BEGIN IMMEDIATE` transaction, so concurrent
+    processes serialize on the database lock.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    @contextmanager
+    def transaction(self):
+        conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def create(self, run: Dict[str, Any], shards: List[Dict[str, Any]]):
+        """Start a new plan, replacing any previous one"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            self.path.unlink()
+        conn = sqlite3.connect(str(self.path))
+        conn.executescript(SCHEMA)
+        conn.close()
+        with self.transaction() as conn:
+            conn.executemany("INSERT INTO run (key, value) VALUES (?, ?)",
+                             [(k, json.dumps(v)) for k, v in run.items()])
+            conn.executemany(
+                "INSERT INTO shards (collection, shard, target, path, total) VALUES (?, ?, ?, ?, ?)",
+                [(s["collection"], s["shard"], s["target"], s["path"], s["total"]) for s in shards]
+            )
+
+    def run_info(self) -> Dict[str, Any]:
+        with self.transaction() as conn:
+            return {row["key"]: json.loads(row["value"]) for row in conn.execute("SELECT key, value FROM run")}
+
+    def claim(self, worker: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """Lease the largest pending (or expired) shard, None if there is none"""
+        now = time.time()
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM shards WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY total - progress DESC LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE shards SET status = 'leased', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE collection = ? AND shard = ?",
+                (worker, now + lease_seconds, now, row["collection"], row["shard"])
+            )
+            return dict(row)
+
+    def heartbeat(self, collection: str, shard: int, worker: str, progress: int, lease_seconds: float) -> bool:
+        """Report progress and renew the lease; False if the lease was lost"""
+        now = time.time()
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE shards SET progress = MAX(progress, ?), lease_expires = ?, updated_at = ? "
+                "WHERE collection = ? AND shard = ? AND worker = ? AND status = 'leased'",
+                (progress, now + lease_seconds, now, collection, shard, worker)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, collection: str, shard: int, worker: str) -> bool:
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE shards SET status = 'done', progress = total, lease_expires = NULL, updated_at = ? "
+                "WHERE collection = ? AND shard = ? AND worker = ? AND status = 'leased'",
+                (time.time(), collection, shard, worker)
+            )
+            return cursor.rowcount == 1
+
+    def release(self, collection: str, shard: int, worker: str):
+        """Give a shard back after an error (keeps its progress)"""
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE shards SET status = 'pending', worker = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE collection = ? AND shard = ? AND worker = ? AND status = 'leased'",
+                (time.time(), collection, shard, worker)
+            )
+
+    def shards(self) -> List[Dict[str, Any]]:
+        with self.transaction() as conn:
+            return [dict(row) for row in conn.execute("SELECT * FROM shards ORDER BY collection, shard")]
+
+    def summary(self) -> Dict[str, Any]:
+        """Progress over all shards: counts per status, documents done, active workers"""
+        shards = self.shards()
+        return {
+            "shards": len(shards),
+            "pending": sum(s["status"] == "pending" for s in shards),
+            "leased": sum(s["status"] == "leased" for s in shards),
+            "done": sum(s["status"] == "done" for s in shards),
+            "documents": sum(s["total"] for s in shards),
+            "documents_done": sum(s["progress"] for s in shards),
+            "workers": sorted({s["worker"] for s in shards if s["status"] == "leased"}),
+        }
+
+
+def _create_indexer(sparse_vectors: bool):
+    from src.config import (
+        QDRANT_HOST, QDRANT_PORT, EMBEDDING_MODEL, EMBEDDING_BACKEND, EMBEDDING_TOKEN_BUDGET,
+    )
+    from src.data_processing.indexer import Indexer
+
+    # 不使用 EmbeddingCache: 缓存没有跨进程锁，多个 worker 共用目录会分配到相同的槽位
+    return Indexer(
+        qdrant_host=QDRANT_HOST,
+        qdrant_port=QDRANT_PORT,
+        embedding_model=EMBEDDING_MODEL,
+        embedding_cache=None,
+        token_budget=EMBEDDING_TOKEN_BUDGET or None,
+        embedding_backend=EMBEDDING_BACKEND,
+        sparse_vectors=sparse_vectors
+    )
+
+
+def _spawn_workers(count: int, workdir: Path) -> List[subprocess.Popen]:
+    """Start local worker processes, splitting the CPU cores between them"""
+    from src.config import BASE_DIR
+
+    env = dict(os.environ)
+    threads = str(max(1, (os.cpu_count() or 1) // count))
+    env.setdefault("OMP_NUM_THREADS", threads)
+    env.setdefault("MKL_NUM_THREADS", threads)
+    host = socket.gethostname()
+    return [
+        subprocess.Popen(
+            [sys.executable, "-m", "src.data_processing.distributed", "worker",
+             "--workdir", str(workdir), "--id", f"{host}-local{i}"],
+            cwd=str(BASE_DIR), env=env
+        )
+        for i in range(count)
+    ]
+
+
+def coordinate(
+    num_shards: Optional[int] = None,
+    workdir: Optional[Path] = None,
+    resume: bool = False,
+    spawn_workers: int = 0,
+    poll_interval: float = 5.0
+):
+    """
+    Plan a sharded rebuild, wait for the workers, verify and publish.
+
+    Args:
+        num_shards: Shards per collection (default: DISTRIBUTED_SHARDS)
+        workdir: Lease table + shard files (default: DISTRIBUTED_DIR)
+        resume: Keep the existing plan (coordinator restarted), only wait/verify
+        spawn_workers: Also start this many local worker processes
+        poll_interval: Seconds between progress reports
+
+    Raises:
+        RuntimeError: If workers stopped before all shards were done, or the
+            point counts do not match the plan (aliases are left untouched)
+    """
+    from src.config import (
+        EMBEDDING_MODEL, EMBEDDING_BACKEND, SPARSE_VECTORS, COLLECTION_RETENTION,
+        DISTRIBUTED_DIR, DISTRIBUTED_SHARDS, UNIFIED_COLLECTION_MODE,
+    )
+    from src.data_processing.indexer import iter_collection_documents, embedding_model_id
+    from src.data_processing.index_state import IndexManifest
+    from src.data_processing.bm25 import build_collection_index
+    from src.collections import ALL_COLLECTIONS
+
+    workdir = Path(workdir or DISTRIBUTED_DIR)
+    num_shards = num_shards or DISTRIBUTED_SHARDS
+    model_id = embedding_model_id(EMBEDDING_MODEL, EMBEDDING_BACKEND)
+    table = LeaseTable(workdir / LEASE_DB_FILENAME)
+    indexer = _create_indexer(SPARSE_VECTORS)
+
+    # 即使 resume 也重新解析: 校验计数和更新 manifest 需要完整文档
+    documents = dict(iter_collection_documents())
+
+    run = table.run_info() if resume and table.exists() else {}
+    if run and run.get("model") != model_id:
+        raise ValueError(f"Plan in {workdir} was made for {run.get('model')}, not {model_id}")
+
+    if run:
+        version = run["index_version"]
+        print(f"\nResuming distributed build v{version} ({table.summary()['done']} shards done)")
+    else:
+        version = indexer.next_version(ALL_COLLECTIONS)
+        shard_dir = workdir / "shards"
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        for old in shard_dir.glob("*.jsonl"):
+            old.unlink()
+
+        shards = []
+        for collection, docs in documents.items():
+            target = indexer.versioned_name(collection, version)
+            indexer.create_collection(target, recreate=True, points=len(docs))
+            buckets: List[List[Dict[str, Any]]] = [[] for _ in range(num_shards)]
+            for doc in docs:
+                buckets[shard_of(doc["id"], num_shards)].append(doc)
+            for i, bucket in enumerate(buckets):
+                if not bucket:
+                    continue
+                path = shard_dir / f"{collection}-{i:03d}.jsonl"
+                with open(path, "w", encoding="utf-8") as f:
+                    for doc in bucket:
+                        f.write(json.dumps(doc, ensure_ascii=False, default=str) + "\n")
+                shards.append({
+                    "collection": collection, "shard": i, "target": target,
+                    "path": path.relative_to(workdir).as_posix(), "total": len(bucket),
+                })
+
+        table.create({"index_version": version, "model": model_id, "sparse": SPARSE_VECTORS,
+                      "num_shards": num_shards}, shards)
+        print(f"\nPlanned v{version}: {len(shards)} shards, "
+              f"{sum(s['total'] for s in shards)} documents in {workdir}")
+
+    processes = _spawn_workers(spawn_workers, workdir) if spawn_workers else []
+    if not processes:
+        print("Waiting for workers: python -m src.data_processing.distributed worker")
+
+    t0 = time.perf_counter()
+    while True:
+        summary = table.summary()
+        if summary["done"] == summary["shards"]:
+            break
+        if processes and all(p.poll() is not None for p in processes):
+            raise RuntimeError(f"All local workers exited with {summary['shards'] - summary['done']} shards left")
+        print(f"  [{time.perf_counter() - t0:6.0f}s] {summary['done']}/{summary['shards']} shards, "
+              f"{summary['documents_done']}/{summary['documents']} documents, "
+              f"workers: {', '.join(summary['workers']) or '-'}")
+        time.sleep(poll_interval)
+    for p in processes:
+        p.wait()
+
+    # 先校验所有集合，任何一个不一致都不切换 alias
+    print("\n=== Verifying point counts ===")
+    planned: Dict[str, int] = {}
+    for s in table.shards():
+        planned[s["collection"]] = planned.get(s["collection"], 0) + s["total"]
+    mismatches = []
+    for collection, docs in documents.items():
+        target = indexer.versioned_name(collection, version)
+        count = indexer.client.count(collection_name=target, exact=True).count
+        ok = count == len(docs) == planned.get(collection, 0)
+        print(f"  {collection}: {count} points, {len(docs)} documents {'OK' if ok else 'MISMATCH'}")
+        if not ok:
+            mismatches.append(collection)
+    if mismatches:
+        raise RuntimeError(f"Point count mismatch in {', '.join(mismatches)}; aliases not switched")
+
+    manifest = IndexManifest.load()
+    for collection, docs in documents.items():
+        build_collection_index(collection, [d["text"] for d in docs], [indexer._point_id(d["id"]) for d in docs])
+        indexer.publish_version(collection, indexer.versioned_name(collection, version), len(docs),
+                                COLLECTION_RETENTION)
+        manifest.update(collection, docs, model_id)
+    manifest.save()
+
+    if UNIFIED_COLLECTION_MODE:
+        indexer.build_unified_collection(retention=COLLECTION_RETENTION)
+    print(f"\nDistributed build v{version} published in {time.perf_counter() - t0:.0f}s")
+
+
+def work(
+    workdir: Optional[Path] = None,
+    worker_id: Optional[str] = None,
+    lease_seconds: Optional[float] = None,
+    batch_size: int = 100,
+    idle_interval: float = 5.0
+) -> int:
+    """
+    Claim and index shards until none are left.
+
+    Args:
+        workdir: Lease table + shard files (default: DISTRIBUTED_DIR)
+        worker_id: Name recorded in the lease table (default: host-pid)
+        lease_seconds: Lease duration, renewed after every batch
+        batch_size: Documents per embed/upsert batch
+        idle_interval: Wait between claims while other workers hold the last shards
+
+    Returns:
+        Number of shards this worker completed
+    """
+    from src.config import EMBEDDING_MODEL, EMBEDDING_BACKEND, DISTRIBUTED_DIR, DISTRIBUTED_LEASE_SECONDS
+    from src.data_processing.indexer import embedding_model_id
+
+    workdir = Path(workdir or DISTRIBUTED_DIR)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    lease_seconds = lease_seconds or DISTRIBUTED_LEASE_SECONDS
+    table = LeaseTable(workdir / LEASE_DB_FILENAME)
+    if not table.exists():
+        raise FileNotFoundError(f"No plan in {workdir}, start the coordinator first")
+
+    run = table.run_info()
+    model_id = embedding_model_id(EMBEDDING_MODEL, EMBEDDING_BACKEND)
+    if run["model"] != model_id:
+        raise ValueError(f"Plan uses {run['model']}, this worker is configured for {model_id}")
+
+    indexer = _create_indexer(run.get("sparse", False))
+    completed = 0
+    print(f"Worker {worker_id} started (plan v{run['index_version']})")
+
+    try:
+        while True:
+            lease = table.claim(worker_id, lease_seconds)
+            if lease is None:
+                if table.summary()["done"] == table.summary()["shards"]:
+                    break
+                # 剩余分片都被其他 worker 持有，等待完成或租约过期
+                time.sleep(idle_interval)
+                continue
+
+            collection, shard, start = lease["collection"], lease["shard"], lease["progress"]
+            with open(workdir / lease["path"], encoding="utf-8") as f:
+                docs = [json.loads(line) for line in f]
+            print(f"[{worker_id}] {collection} shard {shard}: {len(docs)} documents"
+                  + (f", resuming at {start}" if start else ""))
+
+            def on_commit(applied: int, c=collection, s=shard, o=start):
+                if not table.heartbeat(c, s, worker_id, o + applied, lease_seconds):
+                    raise LeaseLost(f"{c} shard {s}")
+
+            try:
+                indexer.index_documents(lease["target"], docs[start:], batch_size=batch_size, on_commit=on_commit)
+            except LeaseLost as e:
+                print(f"[{worker_id}] Lease lost on {e}, moving on")
+                continue
+            except BaseException:
+                table.release(collection, shard, worker_id)
+                raise
+            if table.complete(collection, shard, worker_id):
+                completed += 1
+    finally:
+        indexer.embedder.close()
+
+    print(f"Worker {worker_id} finished: {completed} shards")
+    return completed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+    parser = argparse.ArgumentParser(description="Sharded rebuild across worker processes / hosts")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    coord_parser = sub.add_parser("coordinator", help="Plan shards, wait for workers, verify and publish")
+    coord_parser.add_argument("--shards", type=int, default=None, help="Shards per collection")
+    coord_parser.add_argument("--workdir", type=Path, default=None)
+    coord_parser.add_argument("--resume", action="store_true", help="Keep the existing plan")
+
+    local_parser = sub.add_parser("local", help="Coordinator plus local worker processes")
+    local_parser.add_argument("--workers", type=int, default=2)
+    local_parser.add_argument("--shards", type=int, default=None)
+    local_parser.add_argument("--workdir", type=Path, default=None)
+
+    worker_parser = sub.add_parser("worker", help="Claim and index shards")
+    worker_parser.add_argument("--workdir", type=Path, default=None)
+    worker_parser.add_argument("--id", default=None, help="Worker name (default: host-pid)")
+    worker_parser.add_argument("--lease", type=float, default=None, help="Lease seconds")
+
+    args = parser.parse_args()
+    if args.command == "coordinator":
+        coordinate(args.shards, args.workdir, resume=args.resume)
+    elif args.command == "local":
+        coordinate(args.shards, args.workdir, spawn_workers=args.workers)
+    else:
+        work(args.workdir, args.id, args.lease)
@@ -0,0 +1,404 @@
+"""
+Embedding Cache for Construct 3 RAG
+Persistent on-disk vector cache so rebuilds reuse already computed embeddings,
+plus a small in-memory LRU cache for query vectors at retrieval time
+
+Layout (one directory per embedding model):
+    <cache_dir>/<model>/vectors.f16   float16 matrix, memory-mapped
+    <cache_dir>/<model>/index.json    text hash -> (slot, last access tick)
+    <cache_dir>/<model>/sparse.sqlite text hash -> bge-m3 lexical weights
+                                      (only for texts that also have a dense slot)
+
+A cache directory must only be written by one process at a time (slot
+allocation and index.json are not locked across processes).
+"""
+import json
+import time
+import sqlite3
+import heapq
+import hashlib
+import threading
+import unicodedata
+from pathlib import Path
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text before hashing (Unicode NFC, surrounding whitespace)"""
+    return unicodedata.normalize("NFC", text).strip()
+
+
+def text_hash(text: str) -> str:
+    """Stable hash of normalized text"""
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Disk-backed embedding cache keyed by (model name, normalized text hash).
+
+    Vectors are stored as float16 in a memory-mapped array file that grows
+    on demand up to `max_entries` slots. When full, least recently used
+    entries are evicted and their slots reused.
+
+    Example:
+        >>> cache = EmbeddingCache(Path("data/embedding_cache"), "BAAI/bge-m3")
+        >>> vectors = cache.get_many(texts)   # None for misses
+        >>> cache.put_many(missing_texts, missing_vectors)
+        >>> cache.put_sparse_many(missing_texts, [(indices, values), ...])   # optional
+        >>> cache.flush()
+        >>> print(cache.stats())
+    """
+
+    VERSION = 1
+    INDEX_FILENAME = "index.json"
+    VECTORS_FILENAME = "vectors.f16"
+    SPARSE_FILENAME = "sparse.sqlite"
+    INITIAL_CAPACITY = 1024
+    FLUSH_EVERY = 5000  # 每写入多少条自动保存一次 index
+
+    def __init__(self, cache_dir: Path, model_name: str, max_entries: int = 200_000):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.dir = Path(cache_dir) / model_name.replace("/", "__")
+        self.index_path = self.dir / self.INDEX_FILENAME
+        self.vectors_path = self.dir / self.VECTORS_FILENAME
+        self.sparse_path = self.dir / self.SPARSE_FILENAME
+
+        self.dimension: Optional[int] = None
+        self.capacity = 0
+        self._entries: Dict[str, List[int]] = {}  # text hash -> [slot, tick]
+        self._free_slots: List[int] = []
+        self._next_slot = 0
+        self._tick = 0
+        self._vectors: Optional[np.memmap] = None
+        self._sparse: Optional[sqlite3.Connection] = None
+        self._unsaved = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        """Load index and map vector file, starting empty on any mismatch"""
+        if not self.index_path.exists() or not self.vectors_path.exists():
+            return
+
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            print(f"  Warning: Failed to read embedding cache index: {e}")
+            return
+
+        if data.get("version") != self.VERSION or data.get("model") != self.model_name:
+            print(f"  Warning: Embedding cache at {self.dir} is incompatible, starting empty")
+            return
+
+        self.dimension = data["dimension"]
+        self.capacity = data["capacity"]
+        self._tick = data.get("tick", 0)
+        self._entries = {k: list(v) for k, v in data.get("entries", {}).items()}
+
+        used = {slot for slot, _ in self._entries.values()}
+        self._next_slot = max(used) + 1 if used else 0
+        self._free_slots = [s for s in range(self._next_slot) if s not in used]
+
+        self._vectors = np.memmap(
+            self.vectors_path, dtype=np.float16, mode="r+",
+            shape=(self.capacity, self.dimension)
+        )
+
+    def flush(self):
+        """Flush vectors and write index atomically"""
+        if self.dimension is None:
+            return
+        if self._vectors is not None:
+            self._vectors.flush()
+        if self._sparse is not None:
+            self._sparse.commit()
+
+        self.dir.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": self.VERSION,
+            "model": self.model_name,
+            "dimension": self.dimension,
+            "capacity": self.capacity,
+            "tick": self._tick,
+            "entries": self._entries,
+        }
+        tmp_path = self.index_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        tmp_path.replace(self.index_path)
+        self._unsaved = 0
+
+    def _ensure_capacity(self, needed: int):
+        """Grow the memory-mapped vector file to hold at least `needed` slots"""
+        if needed <= self.capacity:
+            return
+
+        new_capacity = max(self.capacity, self.INITIAL_CAPACITY)
+        while new_capacity < needed:
+            new_capacity *= 2
+        new_capacity = min(new_capacity, self.max_entries)
+
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(new_capacity * self.dimension * 2)
+
+        self.capacity = new_capacity
+        self._vectors = np.memmap(
+            self.vectors_path, dtype=np.float16, mode="r+",
+            shape=(self.capacity, self.dimension)
+        )
+
+    # ------------------------------------------------------------------
+    # Lookup / insert
+    # ------------------------------------------------------------------
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up vectors for texts.
+
+        Returns:
+            List aligned with `texts`: float32 vector for hits, None for misses
+        """
+        results: List[Optional[np.ndarray]] = []
+        for text in texts:
+            entry = self._entries.get(text_hash(text))
+            if entry is None:
+                self.misses += 1
+                results.append(None)
+                continue
+
+            self._tick += 1
+            entry[1] = self._tick
+            self.hits += 1
+            results.append(np.asarray(self._vectors[entry[0]], dtype=np.float32))
+        return results
+
+    def put_many(self, texts: List[str], vectors):
+        """Store vectors for texts, evicting least recently used entries if full"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(texts) == 0:
+            return
+
+        if self.dimension is None:
+            self.dimension = int(vectors.shape[1])
+        elif vectors.shape[1] != self.dimension:
+            raise ValueError(
+                f"Vector dimension {vectors.shape[1]} does not match cache dimension {self.dimension}"
+            )
+
+        key_to_row: Dict[str, int] = {}
+        for i, text in enumerate(texts):
+            key = text_hash(text)
+            if key not in self._entries and key not in key_to_row:
+                key_to_row[key] = i
+        if not key_to_row:
+            return
+
+        slots = self._allocate_slots(len(key_to_row))
+        # 超过 max_entries 时只缓存能放下的部分
+        keys = list(key_to_row)[:len(slots)]
+
+        for key, slot in zip(keys, slots):
+            self._vectors[slot] = vectors[key_to_row[key]].astype(np.float16)
+            self._tick += 1
+            self._entries[key] = [slot, self._tick]
+
+        self._unsaved += len(keys)
+        if self._unsaved >= self.FLUSH_EVERY:
+            self.flush()
+
+    def _allocate_slots(self, count: int) -> List[int]:
+        """Allocate slots from free list, new space, then LRU eviction"""
+        slots = self._free_slots[:count]
+        self._free_slots = self._free_slots[count:]
+
+        remaining = count - len(slots)
+        if remaining > 0 and self._next_slot < self.max_entries:
+            grow = min(remaining, self.max_entries - self._next_slot)
+            self._ensure_capacity(self._next_slot + grow)
+            slots.extend(range(self._next_slot, self._next_slot + grow))
+            self._next_slot += grow
+            remaining -= grow
+
+        if remaining > 0 and self._entries:
+            victims = heapq.nsmallest(remaining, self._entries.items(), key=lambda kv: kv[1][1])
+            for key, (slot, _) in victims:
+                del self._entries[key]
+                slots.append(slot)
+            self.evictions += len(victims)
+            if self._sparse is not None or self.sparse_path.exists():
+                self.sparse_db.executemany("DELETE FROM sparse WHERE key = ?", [(key,) for key, _ in victims])
+            # 先持久化淘汰结果，避免崩溃后旧 key 指向被覆盖的槽位
+            self.flush()
+
+        return slots
+
+    # ------------------------------------------------------------------
+    # Sparse (lexical) weights
+    # ------------------------------------------------------------------
+
+    @property
+    def sparse_db(self) -> sqlite3.Connection:
+        if self._sparse is None:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            # 流水线索引在后台线程中写缓存
+            self._sparse = sqlite3.connect(self.sparse_path, check_same_thread=False)
+            self._sparse.execute(
+                "CREATE TABLE IF NOT EXISTS sparse (key TEXT PRIMARY KEY, indices BLOB, vals BLOB)"
+            )
+        return self._sparse
+
+    def get_sparse_many(self, texts: List[str]) -> List[Optional[Tuple[np.ndarray, np.ndarray]]]:
+        """
+        Look up sparse weights for texts.
+
+        Returns:
+            List aligned with `texts`: (token ids int32, weights float32) for
+            hits, None for misses or texts without a dense entry
+        """
+        keys = [text_hash(text) for text in texts]
+        wanted = list({key for key in keys if key in self._entries})
+        found: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        # SQLite 默认单条语句最多 999 个参数
+        for start in range(0, len(wanted), 900):
+            chunk = wanted[start:start + 900]
+            rows = self.sparse_db.execute(
+                f"SELECT key, indices, vals FROM sparse WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            )
+            for key, indices, values in rows:
+                found[key] = (np.frombuffer(indices, dtype=np.int32), np.frombuffer(values, dtype=np.float32))
+        return [found.get(key) for key in keys]
+
+    def put_sparse_many(self, texts: List[str], weights: List[Tuple[Any, Any]]):
+        """
+        Store sparse weights (token ids, weights) for texts.
+
+        Call after `put_many`: only texts holding a dense slot are stored,
+        so the sparse table follows the dense LRU bound and eviction.
+        """
+        rows = []
+        for text, (indices, values) in zip(texts, weights):
+            key = text_hash(text)
+            if key in self._entries:
+                rows.append((
+                    key,
+                    np.asarray(indices, dtype=np.int32).tobytes(),
+                    np.asarray(values, dtype=np.float32).tobytes(),
+                ))
+        if rows:
+            self.sparse_db.executemany("INSERT OR REPLACE INTO sparse VALUES (?, ?, ?)", rows)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "size_bytes": self.capacity * (self.dimension or 0) * 2,
+        }
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded in-process LRU cache of query vectors.
+
+    Keyed by (model id, normalized text); vectors are kept as read-only
+    float32 arrays (4 KB for bge-m3). Entries older than `ttl` seconds are
+    treated as misses. Thread-safe (the async retriever embeds in worker
+    threads).
+
+    Example:
+        >>> cache = QueryEmbeddingCache(max_entries=2048, ttl=3600)
+        >>> vector = cache.get("BAAI/bge-m3", "Sprite 碰撞检测")   # None on miss
+        >>> cache.put("BAAI/bge-m3", "Sprite 碰撞检测", vector)
+        >>> print(cache.stats())
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl or None
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        """Cached vector for a query, None on miss or expiry"""
+        key = (model, normalize_text(text))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, model: str, text: str, vector):
+        """Store a query vector, evicting the least recently used entries if full"""
+        if self.max_entries <= 0:
+            return
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        key = (model, normalize_text(text))
+        with self._lock:
+            self._entries[key] = (vector, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        with self._lock:
+            size_bytes = sum(vector.nbytes for vector, _ in self._entries.values())
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size_bytes": size_bytes,
+        }
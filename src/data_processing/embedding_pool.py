@@ -0,0 +1,165 @@
+"""
+Embedding Worker Pool for Construct 3 RAG
+Shards large encode() calls across CPU worker processes
+
+Each worker process loads the embedding model once (in the pool
+initializer) and pins its torch thread count, so N workers x T threads
+do not oversubscribe the machine. Shards are mapped in order, so vectors
+come back aligned with the input texts.
+"""
+import os
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+
+# 每个 worker 进程内的模型实例 (由 initializer 创建)
+_worker_embedder = None
+
+
+def _init_worker(
+    model_name: str,
+    device: str,
+    num_threads: int,
+    token_budget: Optional[int],
+    max_batch_size: int,
+    backend: str,
+    sparse: bool
+):
+    """Pool initializer: pin compute threads and load the model once per process"""
+    global _worker_embedder
+
+    if backend == "torch":
+        import torch
+        torch.set_num_threads(num_threads)
+
+    from src.data_processing.indexer import EmbeddingModel
+    _worker_embedder = EmbeddingModel(
+        model_name, device=device, token_budget=token_budget, max_batch_size=max_batch_size,
+        backend=backend, num_threads=num_threads, sparse=sparse
+    )
+    _worker_embedder.model  # 预加载，避免首个分片计入加载时间
+
+
+def _encode_shard(texts: List[str], batch_size: int, sparse: bool = False):
+    """Encode one shard inside a worker process"""
+    return _worker_embedder._encode_local(texts, batch_size, show_progress_bar=False, sparse=sparse)
+
+
+def _worker_dimension() -> int:
+    return _worker_embedder.dimension
+
+
+class EmbeddingWorkerPool:
+    """
+    Process pool that splits encode() calls across N worker processes.
+
+    Example:
+        >>> pool = EmbeddingWorkerPool("BAAI/bge-m3", num_workers=8)
+        >>> vectors = pool.encode(texts)   # np.ndarray, same order as texts
+        >>> pool.close()
+    """
+
+    SHARDS_PER_WORKER = 4  # 每个 worker 多个分片，平衡长短文本的负载
+
+    def __init__(
+        self,
+        model_name: str,
+        num_workers: int,
+        threads_per_worker: Optional[int] = None,
+        device: str = "cpu",
+        min_shard_size: int = 16,
+        token_budget: Optional[int] = None,
+        max_batch_size: int = 128,
+        backend: str = "torch",
+        sparse: bool = False
+    ):
+        """
+        Args:
+            model_name: Embedding model name
+            num_workers: Number of worker processes
+            threads_per_worker: torch / onnxruntime threads per worker (default: cores / workers)
+            device: Device for the workers
+            min_shard_size: Smallest shard sent to a worker; smaller calls
+                are not worth the inter-process overhead
+            token_budget: Token-budget batching inside each worker (see EmbeddingModel)
+            max_batch_size: Max items per token-budget batch
+            backend: Embedding backend loaded in each worker ("torch" / "onnx")
+            sparse: Workers load BGEM3Encoder (dense + sparse lexical vectors)
+        """
+        self.model_name = model_name
+        self.num_workers = num_workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // num_workers)
+        self.device = device
+        self.min_shard_size = min_shard_size
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+        self.backend = backend
+        self.sparse = sparse
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._dimension: Optional[int] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            print(f"Starting {self.num_workers} embedding workers "
+                  f"({self.threads_per_worker} threads each): {self.model_name}")
+            # spawn: fork 后的 torch 线程池可能死锁
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(
+                    self.model_name, self.device, self.threads_per_worker,
+                    self.token_budget, self.max_batch_size, self.backend, self.sparse,
+                ),
+            )
+        return self._executor
+
+    def should_parallelize(self, count: int) -> bool:
+        """Whether a call with `count` texts is large enough to shard"""
+        return count >= 2 * self.min_shard_size
+
+    def encode(self, texts: List[str], batch_size: int = 8, sparse: bool = False):
+        """
+        Encode texts across workers, preserving input order.
+
+        Returns:
+            np.ndarray, or (np.ndarray, [SparseVector]) with `sparse=True`
+        """
+        if not texts:
+            empty = np.zeros((0, self.dimension), dtype=np.float32)
+            return (empty, []) if sparse else empty
+
+        num_shards = min(
+            self.num_workers * self.SHARDS_PER_WORKER,
+            max(1, len(texts) // self.min_shard_size)
+        )
+        shard_size = math.ceil(len(texts) / num_shards)
+        shards = [texts[i:i + shard_size] for i in range(0, len(texts), shard_size)]
+
+        # executor.map 按提交顺序返回结果
+        results = list(self.executor.map(
+            _encode_shard, shards, [batch_size] * len(shards), [sparse] * len(shards)
+        ))
+        if sparse:
+            return (
+                np.concatenate([vectors for vectors, _ in results], axis=0),
+                [weight for _, weights in results for weight in weights],
+            )
+        return np.concatenate(results, axis=0)
+
+    @property
+    def dimension(self) -> int:
+        if self._dimension is None:
+            self._dimension = self.executor.submit(_worker_dimension).result()
+        return self._dimension
+
+    def close(self):
+        """Shut down worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,302 @@
+"""
+Index Artifact for Construct 3 RAG
+Export all collections to one portable file and restore it without re-embedding
+
+Artifact layout (tar.gz):
+    manifest.json                 format, model, dimension, per-collection point counts
+    index_manifest.json           content-hash manifest (so --incremental keeps working)
+    <collection>/vectors.f32      float32 matrix, row-major (points x dimension)
+    <collection>/payload.jsonl    one {"id": ..., "payload": {...}} per row
+    <collection>/sparse.jsonl     sparse lexical vectors, one per row (if indexed; empty row if a point has none)
+
+用法:
+  python -m src.data_processing.index_artifact export data/c3_index.tar.gz
+  python -m src.data_processing.index_artifact import data/c3_index.tar.gz
+"""
+import json
+import time
+import tarfile
+import tempfile
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+try:
+    from qdrant_client import QdrantClient
+except ImportError:
+    print("Warning: qdrant-client not installed. Run: pip install qdrant-client")
+
+
+FORMAT_VERSION = 1
+MANIFEST_FILENAME = "manifest.json"
+INDEX_MANIFEST_FILENAME = "index_manifest.json"
+VECTORS_FILENAME = "vectors.f32"
+PAYLOAD_FILENAME = "payload.jsonl"
+SPARSE_FILENAME = "sparse.jsonl"
+
+
+def _export_collection(client: "QdrantClient", collection: str, out_dir: Path, batch: int = 1000) -> Dict[str, Any]:
+    """Stream one collection to vectors.f32 + payload.jsonl (+ sparse.jsonl)"""
+    from src.data_processing.sparse_encoder import SPARSE_VECTOR_NAME
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    count = 0
+    dimension = None
+    # 以集合配置为准: 个别点可能没有 sparse 向量，此时写入空行，保持与 vectors.f32 行对齐
+    sparse_vectors = client.get_collection(collection).config.params.sparse_vectors or {}
+    sf = open(out_dir / SPARSE_FILENAME, "w", encoding="utf-8") if SPARSE_VECTOR_NAME in sparse_vectors else None
+
+    try:
+        with open(out_dir / VECTORS_FILENAME, "wb") as vf, \
+                open(out_dir / PAYLOAD_FILENAME, "w", encoding="utf-8") as pf:
+            offset = None
+            while True:
+                points, offset = client.scroll(
+                    collection_name=collection,
+                    limit=batch,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=True,
+                )
+                if points:
+                    # 含 sparse 向量时 vector 为 {"": dense, "sparse": SparseVector}
+                    dense = [p.vector[""] if isinstance(p.vector, dict) else p.vector for p in points]
+                    vectors = np.asarray(dense, dtype=np.float32)
+                    dimension = vectors.shape[1]
+                    vf.write(vectors.tobytes())
+                    for p in points:
+                        pf.write(json.dumps({"id": p.id, "payload": p.payload}, ensure_ascii=False) + "\n")
+                    if sf is not None:
+                        for p in points:
+                            sparse = p.vector.get(SPARSE_VECTOR_NAME) if isinstance(p.vector, dict) else None
+                            row = {"indices": sparse.indices if sparse else [], "values": sparse.values if sparse else []}
+                            sf.write(json.dumps(row) + "\n")
+                    count += len(points)
+                if offset is None:
+                    break
+    finally:
+        if sf is not None:
+            sf.close()
+    return {"points": count, "dimension": dimension, "sparse": sf is not None}
+
+
+def _with_sparse(dense: np.ndarray, sparse_path: Path):
+    """Yield {"": dense, "sparse": SparseVector} per row for upload_collection"""
+    from qdrant_client.http import models
+    from src.data_processing.sparse_encoder import SPARSE_VECTOR_NAME
+
+    with open(sparse_path, encoding="utf-8") as f:
+        for vector, line in zip(dense, f):
+            row = json.loads(line)
+            if not row["indices"]:
+                yield {"": vector.tolist()}  # 该点没有 sparse 向量
+                continue
+            yield {
+                "": vector.tolist(),
+                SPARSE_VECTOR_NAME: models.SparseVector(indices=row["indices"], values=row["values"]),
+            }
+
+
+def export_index(
+    output_path: Path,
+    collections: Optional[List[str]] = None,
+    client: Optional["QdrantClient"] = None
+) -> Dict[str, Any]:
+    """
+    Export collections into a compressed artifact.
+
+    Args:
+        output_path: Artifact path (.tar.gz)
+        collections: Collections to export (default: ALL_COLLECTIONS that exist)
+        client: Qdrant client (default: from config)
+
+    Returns:
+        The artifact manifest
+    """
+    from src.config import QDRANT_HOST, QDRANT_PORT, EMBEDDING_MODEL, EMBEDDING_BACKEND, INDEX_STATE_DIR
+    from src.collections import ALL_COLLECTIONS
+    from src.data_processing.indexer import embedding_model_id
+    from src.data_processing.index_state import IndexManifest
+
+    client = client or QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT, timeout=120)
+    existing = {c.name for c in client.get_collections().collections}
+    existing |= {a.alias_name for a in client.get_aliases().aliases}
+
+    manifest: Dict[str, Any] = {
+        "format_version": FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "model": embedding_model_id(EMBEDDING_MODEL, EMBEDDING_BACKEND),
+        "dimension": None,
+        "collections": {},
+    }
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        for collection in collections or ALL_COLLECTIONS:
+            if collection not in existing:
+                print(f"  Skipping {collection} (not found)")
+                continue
+            info = _export_collection(client, collection, tmp_dir / collection)
+            print(f"  Exported {collection}: {info['points']} points")
+            if info["dimension"] is not None:
+                if manifest["dimension"] not in (None, info["dimension"]):
+                    raise ValueError(f"Dimension mismatch in {collection}: {info['dimension']}")
+                manifest["dimension"] = info["dimension"]
+            manifest["collections"][collection] = {"points": info["points"], "sparse": info["sparse"]}
+
+        (tmp_dir / MANIFEST_FILENAME).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+        index_manifest = IndexManifest.load(INDEX_STATE_DIR / IndexManifest.FILENAME)
+        exported = {c: index_manifest.collections[c] for c in manifest["collections"] if c in index_manifest.collections}
+        (tmp_dir / INDEX_MANIFEST_FILENAME).write_text(
+            json.dumps({"version": IndexManifest.VERSION, "collections": exported}, ensure_ascii=False),
+            encoding="utf-8"
+        )
+
+        with tarfile.open(output_path, "w:gz") as tar:
+            for path in sorted(tmp_dir.rglob("*")):
+                if path.is_file():
+                    tar.add(path, arcname=path.relative_to(tmp_dir).as_posix())
+
+    size_mb = output_path.stat().st_size / 1024 ** 2
+    print(f"Artifact written: {output_path} ({size_mb:.1f} MB, {time.perf_counter() - t0:.1f}s)")
+    return manifest
+
+
+def import_index(
+    artifact_path: Path,
+    parallel: int = 4,
+    batch_size: int = 256,
+    force: bool = False,
+    indexer=None
+) -> Dict[str, Any]:
+    """
+    Bulk-load an artifact into Qdrant (never loads the embedding model).
+
+    Each collection is uploaded to a new versioned collection and its alias
+    is switched after the point count is validated, like `--rebuild`.
+
+    Args:
+        artifact_path: Artifact written by `export_index`
+        parallel: Parallel upload workers
+        batch_size: Points per upload request
+        force: Import even if the artifact was built with another embedding model
+        indexer: Indexer to use (default: from config)
+
+    Raises:
+        ValueError: On unsupported format or embedding model mismatch
+    """
+    from src.config import (
+        QDRANT_HOST, QDRANT_PORT, EMBEDDING_MODEL, EMBEDDING_BACKEND,
+        COLLECTION_RETENTION, INDEX_STATE_DIR,
+    )
+    from src.data_processing.indexer import Indexer, embedding_model_id
+    from src.data_processing.index_state import IndexManifest
+    from src.data_processing.bm25 import build_collection_index
+
+    if indexer is None:
+        indexer = Indexer(qdrant_host=QDRANT_HOST, qdrant_port=QDRANT_PORT, embedding_model=EMBEDDING_MODEL)
+    t0 = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        with tarfile.open(artifact_path, "r:gz") as tar:
+            if hasattr(tarfile, "data_filter"):
+                tar.extractall(tmp_dir, filter="data")
+            else:
+                tar.extractall(tmp_dir)
+
+        manifest = json.loads((tmp_dir / MANIFEST_FILENAME).read_text(encoding="utf-8"))
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported artifact format: {manifest.get('format_version')}")
+
+        model_id = embedding_model_id(EMBEDDING_MODEL, EMBEDDING_BACKEND)
+        if manifest["model"] != model_id and not force:
+            raise ValueError(
+                f"Artifact was built with {manifest['model']}, but queries use {model_id}. "
+                f"Use --force to import anyway."
+            )
+
+        dimension = manifest["dimension"]
+        collections = manifest["collections"]
+        version = indexer.next_version(list(collections))
+        print(f"Importing {len(collections)} collections as version v{version} "
+              f"(model {manifest['model']}, built {manifest['created_at']})")
+
+        for collection, info in collections.items():
+            target = indexer.versioned_name(collection, version)
+            sparse = info.get("sparse", False)
+            indexer.create_collection(
+                target, recreate=True, dimension=dimension, sparse=sparse, points=info["points"]
+            )
+
+            if info["points"]:
+                vectors = np.memmap(
+                    tmp_dir / collection / VECTORS_FILENAME, dtype=np.float32, mode="r",
+                    shape=(info["points"], dimension)
+                )
+                ids, payloads = [], []
+                with open(tmp_dir / collection / PAYLOAD_FILENAME, encoding="utf-8") as f:
+                    for line in f:
+                        row = json.loads(line)
+                        ids.append(row["id"])
+                        payloads.append(row["payload"])
+                if sparse:
+                    vectors = _with_sparse(vectors, tmp_dir / collection / SPARSE_FILENAME)
+
+                indexer.client.upload_collection(
+                    collection_name=target,
+                    vectors=vectors,
+                    payload=payloads,
+                    ids=ids,
+                    batch_size=batch_size,
+                    parallel=parallel,
+                    wait=True,
+                )
+                build_collection_index(collection, [p.get("text", "") for p in payloads], ids)
+            indexer.publish_version(collection, target, info["points"], COLLECTION_RETENTION)
+
+        # 导入后的集合与 artifact 内的 manifest 一致，后续可直接 --incremental
+        index_manifest_path = tmp_dir / INDEX_MANIFEST_FILENAME
+        if index_manifest_path.exists():
+            imported = json.loads(index_manifest_path.read_text(encoding="utf-8"))
+            local = IndexManifest.load(INDEX_STATE_DIR / IndexManifest.FILENAME)
+            for collection in collections:
+                local.drop(collection)
+            local.collections.update(imported.get("collections", {}))
+            local.save()
+
+    print(f"Import complete in {time.perf_counter() - t0:.1f}s")
+    return manifest
+
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+    from src.config import DATA_DIR
+
+    parser = argparse.ArgumentParser(description="Export / import a prebuilt Construct 3 index")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = sub.add_parser("export", help="Write all collections to an artifact")
+    export_parser.add_argument("path", nargs="?", default=str(DATA_DIR / "c3_index.tar.gz"))
+    export_parser.add_argument("--collections", nargs="+", help="Only these collections")
+
+    import_parser = sub.add_parser("import", help="Bulk-load an artifact into Qdrant")
+    import_parser.add_argument("path", nargs="?", default=str(DATA_DIR / "c3_index.tar.gz"))
+    import_parser.add_argument("--parallel", type=int, default=4, help="Parallel upload workers")
+    import_parser.add_argument("--batch-size", type=int, default=256)
+    import_parser.add_argument("--force", action="store_true", help="Ignore embedding model mismatch")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export_index(Path(args.path), args.collections)
+    else:
+        import_index(Path(args.path), parallel=args.parallel, batch_size=args.batch_size, force=args.force)
@@ -0,0 +1,322 @@
+"""
+Index State for Construct 3 RAG
+Local bookkeeping that lives next to the Qdrant index
+
+Features:
+- Content-hash manifest of every indexed chunk (incremental reindexing)
+- Run checkpoint (per collection batch offset) for resuming interrupted runs
+- Index generation, bumped whenever searchable points change (result cache invalidation)
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
+
+
+def content_hash(doc: Dict[str, Any]) -> str:
+    """
+    Hash the indexed content of a document (text + payload metadata).
+
+    Metadata is part of the hash so that payload-only changes (e.g. a new
+    subcategory mapping) are also pushed to Qdrant.
+    """
+    content = json.dumps(
+        {"text": doc["text"], "metadata": doc.get("metadata", {})},
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+class IndexManifest:
+    """
+    Manifest of (collection, chunk key, content hash, embedding model).
+
+    Stored as JSON in INDEX_STATE_DIR. Used by incremental indexing to
+    embed only new/changed chunks and delete chunks that disappeared.
+
+    Example:
+        >>> manifest = IndexManifest.load()
+        >>> changed, removed = manifest.diff("c3_plugins", docs, "BAAI/bge-m3")
+        >>> manifest.update("c3_plugins", docs, "BAAI/bge-m3")
+        >>> manifest.save()
+    """
+
+    VERSION = 1
+    FILENAME = "manifest.json"
+
+    def __init__(self, path: Path, collections: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.path = Path(path)
+        # collection -> {"model": str, "chunks": {chunk_key: content_hash}}
+        self.collections: Dict[str, Dict[str, Any]] = collections or {}
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "IndexManifest":
+        """Load manifest from disk (empty manifest if missing or unreadable)"""
+        if path is None:
+            from src.config import INDEX_STATE_DIR
+            path = INDEX_STATE_DIR / cls.FILENAME
+        path = Path(path)
+
+        if not path.exists():
+            return cls(path)
+
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            print(f"  Warning: Failed to read index manifest {path}: {e}")
+            return cls(path)
+
+        if data.get("version") != cls.VERSION:
+            print(f"  Warning: Index manifest version mismatch, ignoring {path}")
+            return cls(path)
+
+        return cls(path, data.get("collections", {}))
+
+    def save(self):
+        """Write manifest atomically"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"version": self.VERSION, "collections": self.collections}
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(self.path)
+
+    def get_chunks(self, collection: str, model: str) -> Dict[str, str]:
+        """Get {chunk_key: content_hash} for a collection, empty if built with another model"""
+        entry = self.collections.get(collection)
+        if not entry or entry.get("model") != model:
+            return {}
+        return entry.get("chunks", {})
+
+    def diff(
+        self,
+        collection: str,
+        docs: List[Dict[str, Any]],
+        model: str
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Compare documents with the manifest.
+
+        Returns:
+            Tuple of (new or changed documents, chunk keys that disappeared)
+        """
+        indexed = self.get_chunks(collection, model)
+        changed = [doc for doc in docs if indexed.get(doc["id"]) != content_hash(doc)]
+        current_keys = {doc["id"] for doc in docs}
+        removed = [key for key in indexed if key not in current_keys]
+        return changed, removed
+
+    def update(self, collection: str, docs: List[Dict[str, Any]], model: str):
+        """Record the full set of documents now indexed in a collection"""
+        self.collections[collection] = {
+            "model": model,
+            "chunks": {doc["id"]: content_hash(doc) for doc in docs},
+        }
+
+    def apply(self, collection: str, docs: List[Dict[str, Any]], removed: List[str], model: str):
+        """Record a partial update: `docs` upserted, `removed` chunk keys deleted"""
+        entry = self.collections.setdefault(collection, {"model": model, "chunks": {}})
+        chunks = entry["chunks"]
+        for key in removed:
+            chunks.pop(key, None)
+        chunks.update({doc["id"]: content_hash(doc) for doc in docs})
+
+    def drop(self, collection: str):
+        """Forget a collection (e.g. after it was deleted)"""
+        self.collections.pop(collection, None)
+
+
+class IndexGeneration:
+    """
+    Counter bumped by the indexer and the watcher whenever searchable
+    points change (alias switch, in-place update).
+
+    Readers (the retriever's result cache) call `current()` per query; it
+    only re-reads the file when its mtime changes. The id includes the
+    bump time, so two writers racing to the same counter value still
+    produce a new id.
+
+    The file lives in INDEX_STATE_DIR: retrievers on other hosts only see
+    bumps if that directory is shared with the indexer (RESULT_CACHE_TTL
+    bounds staleness otherwise).
+
+    Example:
+        >>> IndexGeneration().bump("rebuild v42")
+        >>> generation = IndexGeneration().current()   # e.g. "17:1760000000000000000"
+    """
+
+    FILENAME = "generation.json"
+
+    def __init__(self, path: Optional[Path] = None):
+        if path is None:
+            from src.config import INDEX_STATE_DIR
+            path = INDEX_STATE_DIR / self.FILENAME
+        self.path = Path(path)
+        self._mtime: Optional[int] = None
+        self._current = "0"
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def current(self) -> str:
+        """Current generation id ("0" before the first bump)"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return "0"
+        if mtime != self._mtime:
+            data = self._read()
+            self._current = f"{data.get('generation', 0)}:{data.get('updated_ns', mtime)}"
+            self._mtime = mtime
+        return self._current
+
+    def bump(self, reason: str = "") -> int:
+        """Increment the generation (atomic replace); returns the new counter"""
+        generation = self._read().get("generation", 0) + 1
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({
+            "generation": generation,
+            "updated_ns": time.time_ns(),
+            "reason": reason,
+        }), encoding="utf-8")
+        tmp_path.replace(self.path)
+        return generation
+
+
+def documents_fingerprint(docs: List[Dict[str, Any]]) -> str:
+    """Hash of an ordered document list (chunk keys + content hashes)"""
+    digest = hashlib.sha1()
+    for doc in docs:
+        digest.update(doc["id"].encode("utf-8"))
+        digest.update(content_hash(doc).encode("ascii"))
+    return digest.hexdigest()
+
+
+class IndexCheckpoint:
+    """
+    Progress of the current indexing run, saved after every committed batch.
+
+    A resumed run only continues a collection if it would embed exactly
+    the same documents in the same order (same fingerprint); otherwise
+    that collection starts again from offset 0.
+
+    Example:
+        >>> checkpoint = IndexCheckpoint.load()
+        >>> checkpoint.start({"mode": "rebuild", "index_version": 3, "model": "BAAI/bge-m3"})
+        >>> checkpoint.begin("c3_plugins", "c3_plugins__v3", docs)
+        >>> checkpoint.advance("c3_plugins", 200)
+        >>> checkpoint.finish("c3_plugins")
+        >>> checkpoint.clear()   # run completed
+    """
+
+    VERSION = 1
+    FILENAME = "checkpoint.json"
+
+    def __init__(
+        self,
+        path: Path,
+        run: Optional[Dict[str, Any]] = None,
+        collections: Optional[Dict[str, Dict[str, Any]]] = None
+    ):
+        self.path = Path(path)
+        self.run: Dict[str, Any] = run or {}
+        # collection -> {"target", "fingerprint", "total", "offset", "done"}
+        self.collections: Dict[str, Dict[str, Any]] = collections or {}
+        # 流水线模式下 parse / upload 线程都会写入
+        self._lock = threading.RLock()
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "IndexCheckpoint":
+        """Load checkpoint from disk (empty if missing or unreadable)"""
+        if path is None:
+            from src.config import INDEX_STATE_DIR
+            path = INDEX_STATE_DIR / cls.FILENAME
+        path = Path(path)
+
+        if not path.exists():
+            return cls(path)
+
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            print(f"  Warning: Failed to read index checkpoint {path}: {e}")
+            return cls(path)
+
+        if data.get("version") != cls.VERSION:
+            return cls(path)
+
+        return cls(path, data.get("run", {}), data.get("collections", {}))
+
+    def save(self):
+        """Write checkpoint atomically"""
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            data = {"version": self.VERSION, "run": self.run, "collections": self.collections}
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            tmp_path.replace(self.path)
+
+    def clear(self):
+        """Delete the checkpoint (run completed)"""
+        self.run = {}
+        self.collections = {}
+        if self.path.exists():
+            self.path.unlink()
+
+    def matches(self, run: Dict[str, Any]) -> bool:
+        """Whether the saved run was started with the same settings"""
+        return bool(self.run) and all(self.run.get(k) == v for k, v in run.items() if k != "index_version")
+
+    def start(self, run: Dict[str, Any]):
+        """Start a new run, discarding any previous progress"""
+        self.run = dict(run)
+        self.collections = {}
+        self.save()
+
+    def is_done(self, collection: str) -> bool:
+        return self.collections.get(collection, {}).get("done", False)
+
+    def resume_offset(self, collection: str, target: str, docs: List[Dict[str, Any]]) -> int:
+        """Committed offset to continue from, 0 if the collection's work changed"""
+        entry = self.collections.get(collection)
+        if not entry or entry.get("target") != target:
+            return 0
+        if entry.get("fingerprint") != documents_fingerprint(docs):
+            print(f"  Checkpoint for {collection} is stale (documents changed), starting over")
+            return 0
+        return min(entry.get("offset", 0), len(docs))
+
+    def begin(self, collection: str, target: str, docs: List[Dict[str, Any]], offset: int = 0):
+        """Record the documents a collection is about to embed"""
+        fingerprint = documents_fingerprint(docs)
+        with self._lock:
+            self.collections[collection] = {
+                "target": target,
+                "fingerprint": fingerprint,
+                "total": len(docs),
+                "offset": offset,
+                "done": False,
+            }
+            self.save()
+
+    def advance(self, collection: str, offset: int):
+        """Record that the first `offset` documents are durably upserted"""
+        with self._lock:
+            entry = self.collections[collection]
+            if offset > entry["offset"]:
+                entry["offset"] = offset
+                self.save()
+
+    def finish(self, collection: str):
+        """Mark a collection as published / recorded in the manifest"""
+        with self._lock:
+            self.collections[collection]["done"] = True
+            self.save()
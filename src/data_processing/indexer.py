@@ -3,10 +3,15 @@ Vector Database Indexer for Construct 3 RAG
 Indexes all processed data into Qdrant vector database
 """
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from dataclasses import dataclass
 import json
 import hashlib
+from contextlib import nullcontext
+
+from src.data_processing.index_state import IndexManifest, IndexCheckpoint, IndexGeneration
+from src.data_processing.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from src.data_processing.sparse_encoder import SPARSE_VECTOR_NAME
 
 try:
     from qdrant_client import QdrantClient
@@ -15,40 +20,415 @@ try:
 except ImportError:
     print("Warning: qdrant-client not installed. Run: pip install qdrant-client")
 
+import numpy as np
+from tqdm import tqdm
+
 try:
     from sentence_transformers import SentenceTransformer
 except ImportError:
     print("Warning: sentence-transformers not installed. Run: pip install sentence-transformers")
 
 
+def plan_token_batches(lengths: List[int], token_budget: int, max_batch_size: int = 128) -> List[List[int]]:
+    """
+    Group inputs into batches by padded token cost.
+
+    Inputs are sorted by length (longest first) and packed greedily while
+    `longest length in batch x batch size <= token_budget`. A single input
+    longer than the budget gets a batch of its own.
+
+    Args:
+        lengths: Token length of each input
+        token_budget: Max padded tokens per batch
+        max_batch_size: Max items per batch
+
+    Returns:
+        List of batches, each a list of indices into `lengths`
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+
+    batches: List[List[int]] = []
+    current: List[int] = []
+    for i in order:
+        # 已按降序排列，批次内第一个元素决定填充长度
+        padded_len = lengths[current[0]] if current else lengths[i]
+        if current and (padded_len * (len(current) + 1) > token_budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def base_collection_name(collection_name: str) -> str:
+    """Strip the blue/green version suffix: c3_plugins__v42 -> c3_plugins"""
+    return collection_name.split("__v")[0]
+
+
+def collection_quantization(collection_name: str) -> Optional[str]:
+    """Quantization kind for a collection ("int8", "binary" or None)"""
+    from src.config import VECTOR_QUANTIZATION
+    from src.collections import COLLECTION_QUANTIZATION
+
+    base = base_collection_name(collection_name)
+    return COLLECTION_QUANTIZATION.get(base, VECTOR_QUANTIZATION) or None
+
+
+def quantization_config(kind: Optional[str]):
+    """
+    Build Qdrant quantization config. Quantized vectors are kept in RAM
+    (always_ram) while the float32 originals stay on disk for rescoring.
+    """
+    if not kind:
+        return None
+    if kind == "int8":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True
+            )
+        )
+    if kind == "binary":
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True)
+        )
+    raise ValueError(f"Unknown quantization: {kind} (expected 'int8' or 'binary')")
+
+
+def collection_hnsw_profile(collection_name: str, points: Optional[int] = None) -> Dict[str, Any]:
+    """
+    HNSW parameters for a collection (see collections.HNSW_PROFILES).
+
+    With "auto" the profile is picked from HNSW_AUTO_PROFILES by point
+    count ("default" while the count is unknown). A dict in COLLECTION_HNSW
+    overrides individual keys of the "default" profile.
+
+    Returns:
+        Dict with name, m, ef_construct, full_scan_threshold, hnsw_ef, exact
+    """
+    from src.config import HNSW_PROFILE
+    from src.collections import HNSW_PROFILES, HNSW_AUTO_PROFILES, COLLECTION_HNSW
+
+    profile = COLLECTION_HNSW.get(base_collection_name(collection_name), HNSW_PROFILE)
+    if isinstance(profile, dict):
+        return {**HNSW_PROFILES["default"], **profile, "name": "custom"}
+    if profile == "auto":
+        profile = "default" if points is None else next(
+            name for limit, name in HNSW_AUTO_PROFILES if limit is None or points <= limit
+        )
+    if profile not in HNSW_PROFILES:
+        raise ValueError(f"Unknown HNSW profile: {profile} (expected 'auto' or one of {list(HNSW_PROFILES)})")
+    return {**HNSW_PROFILES[profile], "name": profile}
+
+
+def hnsw_config(profile: Dict[str, Any]):
+    """Build the index-time Qdrant HNSW config from a profile"""
+    return models.HnswConfigDiff(
+        m=profile["m"],
+        ef_construct=profile["ef_construct"],
+        full_scan_threshold=profile["full_scan_threshold"],
+    )
+
+
+def storage_profile(name: Optional[str] = None) -> Dict[str, Any]:
+    """Storage settings for collections (see collections.STORAGE_PROFILES, default: STORAGE_PROFILE)"""
+    from src.config import STORAGE_PROFILE
+    from src.collections import STORAGE_PROFILES
+
+    name = name or STORAGE_PROFILE
+    if name not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile: {name} (expected one of {list(STORAGE_PROFILES)})")
+    return {**STORAGE_PROFILES[name], "name": name}
+
+
+def embedding_model_id(model_name: str, backend: str = "torch") -> str:
+    """Identifier for vectors produced by a model/backend pair (cache + manifest key)"""
+    return model_name if backend == "torch" else f"{model_name}+{backend}"
+
+
+def unified_point_id(collection_name: str, point_id: int) -> int:
+    """Point ID in UNIFIED_COLLECTION of a point from a source collection"""
+    # 不同集合的 chunk key 可能相同，ID 加上集合名
+    return int(hashlib.md5(f"{collection_name}:{point_id}".encode()).hexdigest()[:15], 16)
+
+
 class EmbeddingModel:
     """Wrapper for embedding model"""
 
-    def __init__(self, model_name: str = "BAAI/bge-m3", device: str = "cpu"):
+    def __init__(
+        self,
+        model_name: str = "BAAI/bge-m3",
+        device: str = "cpu",
+        cache: Optional[EmbeddingCache] = None,
+        num_workers: int = 0,
+        threads_per_worker: Optional[int] = None,
+        token_budget: Optional[int] = None,
+        max_batch_size: int = 128,
+        backend: str = "torch",
+        num_threads: Optional[int] = None,
+        query_cache: Optional[QueryEmbeddingCache] = None,
+        sparse: bool = False
+    ):
+        """
+        Args:
+            model_name: SentenceTransformer model name
+            device: Device for the in-process model
+            cache: Optional on-disk vector cache
+            num_workers: >0 shards large encode() calls across worker processes
+            threads_per_worker: torch threads per worker (default: cores / workers)
+            token_budget: If set, batch by padded token count (longest text x
+                batch size) instead of a fixed item count
+            max_batch_size: Upper bound on items per token-budget batch
+            backend: "torch" (SentenceTransformer) or "onnx" (int8 ONNX Runtime, CPU only)
+            num_threads: Intra-op threads for the onnx backend (default: all cores)
+            query_cache: Optional in-memory LRU cache for `encode_queries` /
+                `encode_single` (retrieval)
+            sparse: Load bge-m3 through FlagEmbedding (BGEM3Encoder) so
+                `encode_with_sparse` returns dense and sparse lexical vectors
+                of one forward pass (torch backend only)
+        """
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"Unknown embedding backend: {backend!r} (expected 'torch' or 'onnx')")
+        if sparse and backend != "torch":
+            raise ValueError("Sparse vectors need the torch backend (the ONNX export has no sparse head)")
         self.model_name = model_name
         self.device = device
+        self.backend = backend
+        self.num_threads = num_threads
+        self.cache = cache  # 可选: 磁盘向量缓存
+        self.query_cache = query_cache  # 可选: 查询向量内存缓存
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+        self.sparse = sparse
         self._model = None
+        self._tokenizer = None
+        self._pool = None
+        self.profiler = None  # 可选: RunProfiler (记录 tokenize / forward 耗时与 token 长度)
+        if num_workers > 0:
+            from src.data_processing.embedding_pool import EmbeddingWorkerPool
+            self._pool = EmbeddingWorkerPool(
+                model_name, num_workers, threads_per_worker=threads_per_worker, device=device,
+                token_budget=token_budget, max_batch_size=max_batch_size, backend=backend, sparse=sparse
+            )
 
     @property
     def model(self):
         if self._model is None:
-            print(f"Loading embedding model: {self.model_name} (device: {self.device})")
-            self._model = SentenceTransformer(self.model_name, device=self.device)
+            if self.backend == "onnx":
+                from src.data_processing.onnx_backend import OnnxEncoder
+                print(f"Loading embedding model: {self.model_name} (backend: onnx int8)")
+                self._model = OnnxEncoder(self.model_name, num_threads=self.num_threads)
+            elif self.sparse:
+                from src.data_processing.sparse_encoder import BGEM3Encoder
+                print(f"Loading embedding model: {self.model_name} (device: {self.device}, dense + sparse)")
+                self._model = BGEM3Encoder(self.model_name, device=self.device)
+            else:
+                print(f"Loading embedding model: {self.model_name} (device: {self.device})")
+                self._model = SentenceTransformer(self.model_name, device=self.device)
         return self._model
 
+    @property
+    def model_id(self) -> str:
+        return embedding_model_id(self.model_name, self.backend)
+
+    @property
+    def tokenizer(self):
+        """Tokenizer of the model (loaded on its own when the model lives in worker processes)"""
+        if self._model is None and self._pool is not None:
+            if self._tokenizer is None:
+                from transformers import AutoTokenizer
+                self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            return self._tokenizer
+        return self.model.tokenizer
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        """Tokenized lengths (incl. special tokens, capped at the model's max length)"""
+        if self._model is None and self._pool is not None:
+            max_length = min(self.tokenizer.model_max_length, 8192)
+        else:
+            max_length = self.model.max_seq_length
+        encoded = self.tokenizer(
+            texts,
+            add_special_tokens=True,
+            truncation=True,
+            max_length=max_length,
+        )
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def _tokenize(self, texts: List[str]) -> List[int]:
+        """Token lengths for batch planning, recorded by the profiler if attached"""
+        with self._stage("tokenize"):
+            lengths = self.token_lengths(texts)
+        if self.profiler is not None:
+            self.profiler.record_token_lengths(lengths)
+        return lengths
+
+    def _stage(self, name: str):
+        return self.profiler.stage(name) if self.profiler is not None else nullcontext()
+
+    def _forward(self, texts: List[str], batch_size: int, show_progress_bar: bool, sparse: bool):
+        """One model call: (dense matrix, sparse vectors or None)"""
+        if sparse:
+            return self.model.encode_with_sparse(texts, batch_size=batch_size)
+        return self.model.encode(texts, show_progress_bar=show_progress_bar, batch_size=batch_size), None
+
+    def _encode_local(
+        self,
+        texts: List[str],
+        batch_size: int = 8,
+        show_progress_bar: bool = True,
+        sparse: bool = False
+    ):
+        """
+        Encode texts with the in-process model.
+
+        Returns:
+            np.ndarray, or (np.ndarray, [SparseVector]) with `sparse=True`
+        """
+        if not self.token_budget or len(texts) <= 1:
+            if self.profiler is not None:
+                # 仅为统计 token 长度分词 (不分桶时模型内部还会再分词一次)
+                self._tokenize(texts)
+            with self._stage("forward"):
+                vectors, weights = self._forward(texts, batch_size, show_progress_bar, sparse)
+            return (vectors, weights) if sparse else vectors
+
+        # 按 token 长度分桶: 短文本不再被填充到同批次长文本的长度
+        lengths = self._tokenize(texts)
+        batches = plan_token_batches(lengths, self.token_budget, self.max_batch_size)
+        if show_progress_bar:
+            batches = tqdm(batches, desc="Batches")
+
+        vectors = None
+        weights = [None] * len(texts) if sparse else None
+        with self._stage("forward"):
+            for batch in batches:
+                batch_vectors, batch_weights = self._forward(
+                    [texts[i] for i in batch], len(batch), False, sparse
+                )
+                if vectors is None:
+                    vectors = np.zeros((len(texts), batch_vectors.shape[1]), dtype=batch_vectors.dtype)
+                # 恢复原始顺序
+                vectors[batch] = batch_vectors
+                if sparse:
+                    for i, weight in zip(batch, batch_weights):
+                        weights[i] = weight
+        return (vectors, weights) if sparse else vectors
+
+    def _compute(self, texts: List[str], batch_size: int = 8, sparse: bool = False):
+        """Encode texts, sharding across worker processes when configured"""
+        if self._pool is not None and self._pool.should_parallelize(len(texts)):
+            if self.profiler is not None:
+                # worker 进程没有 profiler，token 长度在主进程统计
+                self._tokenize(texts)
+            # 分桶分词与前向都在 worker 进程内，整体计入 forward
+            with self._stage("forward"):
+                return self._pool.encode(texts, batch_size, sparse=sparse)
+        return self._encode_local(texts, batch_size, sparse=sparse)
+
     def encode(self, texts: List[str], batch_size: int = 8) -> List[List[float]]:
-        """Encode texts to vectors"""
-        return self.model.encode(texts, show_progress_bar=True, batch_size=batch_size).tolist()
+        """Encode texts to vectors (reusing cached vectors when a cache is attached)"""
+        if self.cache is None:
+            return self._compute(texts, batch_size).tolist()
+
+        vectors = self.cache.get_many(texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            computed = self._compute(missing_texts, batch_size)
+            self.cache.put_many(missing_texts, computed)
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+        return [vector.tolist() for vector in vectors]
+
+    def encode_with_sparse(
+        self,
+        texts: List[str],
+        batch_size: int = 8
+    ) -> Tuple[List[List[float]], List["models.SparseVector"]]:
+        """
+        Encode texts to dense and sparse vectors in one forward pass (needs `sparse=True`).
+
+        With a cache attached the sparse weights are cached next to the
+        dense vectors; a text is encoded again unless both are cached.
+        """
+        if not self.sparse:
+            raise ValueError("encode_with_sparse needs EmbeddingModel(sparse=True)")
+        if self.cache is None:
+            vectors, weights = self._compute(texts, batch_size, sparse=True)
+            return vectors.tolist(), weights
+
+        vectors = self.cache.get_many(texts)
+        weights = [
+            None if cached is None else models.SparseVector(indices=cached[0].tolist(), values=cached[1].tolist())
+            for cached in self.cache.get_sparse_many(texts)
+        ]
+        missing = [i for i in range(len(texts)) if vectors[i] is None or weights[i] is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            computed, computed_weights = self._compute(missing_texts, batch_size, sparse=True)
+            self.cache.put_many(missing_texts, computed)
+            self.cache.put_sparse_many(missing_texts, [(w.indices, w.values) for w in computed_weights])
+            for i, vector, weight in zip(missing, computed, computed_weights):
+                vectors[i] = vector
+                weights[i] = weight
+        return [np.asarray(vector).tolist() for vector in vectors], weights
+
+    def encode_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Encode queries, skipping the forward pass for cached ones.
+
+        Misses are encoded in one batch and added to `query_cache`.
+        """
+        if self.query_cache is None:
+            vectors = list(self.model.encode(texts, show_progress_bar=False, batch_size=max(1, len(texts))))
+        else:
+            model_id = self.model_id
+            vectors = [self.query_cache.get(model_id, text) for text in texts]
+            missing = [i for i, v in enumerate(vectors) if v is None]
+            if missing:
+                computed = self.model.encode(
+                    [texts[i] for i in missing], show_progress_bar=False, batch_size=len(missing)
+                )
+                for i, vector in zip(missing, computed):
+                    self.query_cache.put(model_id, texts[i], vector)
+                    vectors[i] = vector
+        return [np.asarray(vector).tolist() for vector in vectors]
 
     def encode_single(self, text: str) -> List[float]:
         """Encode single text to vector"""
-        return self.model.encode([text])[0].tolist()
+        return self.encode_queries([text])[0]
+
+    def encode_queries_with_sparse(self, texts: List[str]) -> Tuple[List[List[float]], List["models.SparseVector"]]:
+        """
+        Dense and sparse query vectors of one forward pass (needs `sparse=True`).
+
+        Sparse query vectors are not cached; the dense half is added to
+        `query_cache`, so a later `encode_queries` of the same text is a hit.
+        """
+        if not self.sparse:
+            raise ValueError("encode_queries_with_sparse needs EmbeddingModel(sparse=True)")
+        vectors, weights = self.model.encode_with_sparse(texts, batch_size=max(1, len(texts)))
+        if self.query_cache is not None:
+            for text, vector in zip(texts, vectors):
+                self.query_cache.put(self.model_id, text, vector)
+        return [np.asarray(vector).tolist() for vector in vectors], weights
 
     @property
     def dimension(self) -> int:
         """Get embedding dimension"""
+        if self._pool is not None and self._model is None:
+            # 多进程模式下不在主进程加载模型
+            return self._pool.dimension
         return self.model.get_sentence_embedding_dimension()
 
+    def close(self):
+        """Release worker processes (if any)"""
+        if self._pool is not None:
+            self._pool.close()
+
 
 class Indexer:
     """Index documents into Qdrant vector database"""
@@ -57,18 +437,241 @@ class Indexer:
         self,
         qdrant_host: str = "localhost",
         qdrant_port: int = 6333,
-        embedding_model: str = "BAAI/bge-m3"
+        embedding_model: str = "BAAI/bge-m3",
+        embedding_cache: Optional[EmbeddingCache] = None,
+        embedding_workers: int = 0,
+        threads_per_worker: Optional[int] = None,
+        token_budget: Optional[int] = None,
+        embedding_backend: str = "torch",
+        sparse_vectors: bool = False,
+        storage: Optional[str] = None
     ):
+        """
+        Args:
+            sparse_vectors: Also index bge-m3 sparse lexical vectors (named
+                "sparse") for hybrid search; collections must be created
+                with sparse support (--rebuild)
+            storage: Storage profile for new collections, e.g. "low-memory"
+                (default: STORAGE_PROFILE)
+        """
         self.client = QdrantClient(host=qdrant_host, port=qdrant_port)
-        self.embedder = EmbeddingModel(embedding_model, device="cpu")
+        self.embedder = EmbeddingModel(
+            embedding_model,
+            device="cpu",
+            cache=embedding_cache,
+            num_workers=embedding_workers,
+            threads_per_worker=threads_per_worker,
+            token_budget=token_budget,
+            backend=embedding_backend,
+            sparse=sparse_vectors
+        )
+        self.sparse_vectors = sparse_vectors
+        self.storage = storage_profile(storage)
+        self.profiler = None  # 可选: RunProfiler (记录 upsert 耗时)
 
     def _generate_id(self, text: str) -> str:
         """Generate stable ID from text"""
         return hashlib.md5(text.encode()).hexdigest()
 
-    def create_collection(self, collection_name: str, recreate: bool = False):
-        """Create or recreate a collection"""
+    def _point_id(self, doc_id) -> int:
+        """Convert document ID (chunk key) to Qdrant point ID"""
+        if isinstance(doc_id, str):
+            return int(hashlib.md5(doc_id.encode()).hexdigest()[:15], 16)
+        return doc_id
+
+    def collection_exists(self, collection_name: str) -> bool:
+        """Check whether a collection (or an alias pointing to one) exists"""
+        collections = [c.name for c in self.client.get_collections().collections]
+        return collection_name in collections or collection_name in self.get_aliases()
+
+    # ------------------------------------------------------------------
+    # Blue/green versions: c3_plugins (alias) -> c3_plugins__v42 (collection)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def versioned_name(alias: str, version: int) -> str:
+        """Physical collection name for a version, e.g. c3_plugins__v42"""
+        return f"{alias}__v{version}"
+
+    def get_aliases(self) -> Dict[str, str]:
+        """Get {alias: collection} for all aliases"""
+        return {a.alias_name: a.collection_name for a in self.client.get_aliases().aliases}
+
+    def list_versions(self, alias: str) -> List[int]:
+        """List existing versions of a collection alias, oldest first"""
+        prefix = f"{alias}__v"
+        versions = []
+        for c in self.client.get_collections().collections:
+            suffix = c.name[len(prefix):] if c.name.startswith(prefix) else ""
+            if suffix.isdigit():
+                versions.append(int(suffix))
+        return sorted(versions)
+
+    def next_version(self, aliases: List[str]) -> int:
+        """Next version number shared by all collections of a rebuild"""
+        return max((max(self.list_versions(a), default=0) for a in aliases), default=0) + 1
+
+    def publish_version(self, alias: str, collection_name: str, expected_count: int, retention: int = 2):
+        """
+        Validate a freshly built collection and atomically point the alias at it.
+
+        Args:
+            alias: Public collection name queried by the retriever (e.g. c3_plugins)
+            collection_name: Versioned collection that was just built
+            expected_count: Number of documents that should have been indexed
+            retention: Number of most recent versions to keep (incl. the live one)
+
+        Raises:
+            RuntimeError: If the point count does not match (alias is not switched)
+        """
+        count = self.client.count(collection_name=collection_name, exact=True).count
+        if count != expected_count:
+            raise RuntimeError(
+                f"Validation failed for {collection_name}: {count} points, expected {expected_count}. "
+                f"Alias {alias} still points to the previous version."
+            )
+
+        # 旧布局: 同名实体 collection 需先删除才能创建 alias (仅首次迁移)
         collections = [c.name for c in self.client.get_collections().collections]
+        if alias in collections:
+            print(f"  Migrating legacy collection {alias} to alias (brief downtime)")
+            self.client.delete_collection(alias)
+
+        operations = []
+        if alias in self.get_aliases():
+            operations.append(models.DeleteAliasOperation(
+                delete_alias=models.DeleteAlias(alias_name=alias)
+            ))
+        operations.append(models.CreateAliasOperation(
+            create_alias=models.CreateAlias(collection_name=collection_name, alias_name=alias)
+        ))
+        # 同一请求内删除+创建，切换是原子的
+        self.client.update_collection_aliases(change_aliases_operations=operations)
+        print(f"  Alias {alias} -> {collection_name} ({count} points)")
+        IndexGeneration().bump(f"{alias} -> {collection_name}")
+
+        self.garbage_collect_versions(alias, retention)
+
+    def garbage_collect_versions(self, alias: str, retention: int = 2):
+        """Delete old versions of a collection, keeping the `retention` newest and the live one"""
+        live = self.get_aliases().get(alias)
+        versions = self.list_versions(alias)
+        keep = set(versions[-retention:]) if retention > 0 else set()
+        for version in versions:
+            name = self.versioned_name(alias, version)
+            if version not in keep and name != live:
+                print(f"  Deleting old version: {name}")
+                self.client.delete_collection(name)
+
+    # ------------------------------------------------------------------
+    # Unified collection: every c3_* collection in one, tagged by payload
+    # ------------------------------------------------------------------
+
+    def build_unified_collection(
+        self,
+        collections: Optional[List[str]] = None,
+        retention: int = 2,
+        batch_size: int = 512
+    ) -> str:
+        """
+        Copy the per-collection points into UNIFIED_COLLECTION (no re-embedding).
+
+        Each point keeps its vectors and payload plus a `collection` payload
+        field (indexed), so the retriever can answer all collections with one
+        ANN query and still restrict to one with a filter. The copy is built
+        as a new version and its alias switched like `--rebuild`.
+
+        Args:
+            collections: Source collections (default: ALL_COLLECTIONS that exist)
+            retention: Versions of the unified collection to keep
+            batch_size: Points per scroll/upsert request
+
+        Returns:
+            The versioned collection that was published
+        """
+        from src.collections import ALL_COLLECTIONS, UNIFIED_COLLECTION
+
+        sources = [c for c in collections or ALL_COLLECTIONS if self.collection_exists(c)]
+        if not sources:
+            raise RuntimeError("No collections to merge, index them first")
+
+        infos = {c: self.client.get_collection(c) for c in sources}
+        vectors = infos[sources[0]].config.params.vectors
+        dimension = vectors.size if isinstance(vectors, VectorParams) else vectors[""].size
+        sparse = any(SPARSE_VECTOR_NAME in (i.config.params.sparse_vectors or {}) for i in infos.values())
+        expected = sum(i.points_count or 0 for i in infos.values())
+
+        target = self.versioned_name(UNIFIED_COLLECTION, self.next_version([UNIFIED_COLLECTION]))
+        print(f"\n=== Building {UNIFIED_COLLECTION} from {len(sources)} collections ({expected} points) ===")
+        self.create_collection(target, recreate=True, dimension=dimension, sparse=sparse, points=expected)
+
+        for collection in sources:
+            offset = None
+            while True:
+                records, offset = self.client.scroll(
+                    collection_name=collection,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=True,
+                )
+                if records:
+                    self.client.upsert(
+                        collection_name=target,
+                        points=[
+                            PointStruct(
+                                id=unified_point_id(collection, r.id),
+                                vector=r.vector,
+                                payload={**r.payload, "collection": collection},
+                            )
+                            for r in records
+                        ]
+                    )
+                if offset is None:
+                    break
+            print(f"  Merged {collection}: {infos[collection].points_count} points")
+
+        self.publish_version(UNIFIED_COLLECTION, target, expected, retention)
+        return target
+
+    def has_sparse_vectors(self, collection_name: str) -> bool:
+        """Whether a collection (or alias) has the sparse lexical vector"""
+        info = self.client.get_collection(collection_name)
+        return SPARSE_VECTOR_NAME in (info.config.params.sparse_vectors or {})
+
+    def _check_existing(self, collection_name: str):
+        """Reuse an existing collection (payload indexes, sparse vector check)"""
+        if self.sparse_vectors and not self.has_sparse_vectors(collection_name):
+            raise RuntimeError(
+                f"{collection_name} was created without sparse vectors. "
+                f"Run with --rebuild to enable SPARSE_VECTORS."
+            )
+        self.create_payload_indexes(collection_name)
+
+    def create_collection(
+        self,
+        collection_name: str,
+        recreate: bool = False,
+        dimension: Optional[int] = None,
+        sparse: Optional[bool] = None,
+        points: Optional[int] = None
+    ):
+        """
+        Create or recreate a collection
+
+        Args:
+            collection_name: Collection to create
+            recreate: Delete and recreate if it already exists
+            dimension: Vector size (default: embedding model dimension, loads the model)
+            sparse: Add the sparse lexical vector (default: whether this indexer writes sparse vectors)
+            points: Expected point count, used to pick the "auto" HNSW profile
+        """
+        collections = [c.name for c in self.client.get_collections().collections]
+
+        if collection_name in self.get_aliases() and not recreate:
+            print(f"Collection already exists: {collection_name} (alias)")
+            self._check_existing(collection_name)
+            return
 
         if collection_name in collections:
             if recreate:
@@ -76,63 +679,213 @@ class Indexer:
                 self.client.delete_collection(collection_name)
             else:
                 print(f"Collection already exists: {collection_name}")
+                self._check_existing(collection_name)
                 return
 
-        print(f"Creating collection: {collection_name}")
+        if sparse is None:
+            sparse = self.sparse_vectors
+
+        quantization = quantization_config(collection_quantization(collection_name))
+        hnsw = collection_hnsw_profile(collection_name, points)
+        storage = self.storage
+        print(f"Creating collection: {collection_name} (hnsw: {hnsw['name']}, storage: {storage['name']})"
+              + (f" (quantization: {collection_quantization(collection_name)})" if quantization else "")
+              + (" (+ sparse)" if sparse else ""))
+        sparse_config = None
+        if sparse:
+            sparse_config = {SPARSE_VECTOR_NAME: models.SparseVectorParams(
+                index=models.SparseIndexParams(on_disk=storage["sparse_index_on_disk"])
+            )}
         self.client.create_collection(
             collection_name=collection_name,
             vectors_config=VectorParams(
-                size=self.embedder.dimension,
-                distance=Distance.COSINE
-            )
+                size=dimension or self.embedder.dimension,
+                distance=Distance.COSINE,
+                # 量化时原始向量放磁盘，仅量化向量常驻内存 (用于 rescore)
+                on_disk=quantization is not None or storage["vectors_on_disk"]
+            ),
+            on_disk_payload=storage["payload_on_disk"],
+            optimizers_config=(
+                models.OptimizersConfigDiff(memmap_threshold=storage["memmap_threshold"])
+                if storage["memmap_threshold"] is not None else None
+            ),
+            quantization_config=quantization,
+            hnsw_config=hnsw_config(hnsw),
+            sparse_vectors_config=sparse_config
         )
+        self.create_payload_indexes(collection_name)
+
+    def create_payload_indexes(self, collection_name: str):
+        """Create payload indexes for filterable metadata fields (idempotent)"""
+        from src.collections import PAYLOAD_INDEXES
+
+        on_disk = self.storage["payload_index_on_disk"]
+        for field_name, field_schema in PAYLOAD_INDEXES.items():
+            if on_disk and field_schema == "keyword":
+                field_schema = models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, on_disk=True)
+            self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=field_schema
+            )
+
+    def build_points(
+        self,
+        documents: List[Dict[str, Any]],
+        vectors: List[List[float]],
+        sparse_vectors: Optional[List["models.SparseVector"]] = None
+    ) -> List["PointStruct"]:
+        """Create Qdrant points from documents and their (dense, optional sparse) vectors"""
+        points = []
+        for i, (doc, vector) in enumerate(zip(documents, vectors)):
+            point_id = doc.get("id", self._generate_id(doc["text"]))
+            if sparse_vectors is not None:
+                # 未命名 dense 向量 + 命名 sparse 向量
+                vector = {"": vector, SPARSE_VECTOR_NAME: sparse_vectors[i]}
+            points.append(PointStruct(
+                id=self._point_id(point_id),
+                vector=vector,
+                payload={
+                    "text": doc["text"],
+                    **doc.get("metadata", {})
+                }
+            ))
+        return points
+
+    def embed_points(self, documents: List[Dict[str, Any]]) -> List["PointStruct"]:
+        """Embed documents (dense + sparse from one pass if enabled) and build their points"""
+        texts = [doc["text"] for doc in documents]
+        if self.sparse_vectors:
+            return self.build_points(documents, *self.embedder.encode_with_sparse(texts))
+        return self.build_points(documents, self.embedder.encode(texts))
 
     def index_documents(
         self,
         collection_name: str,
         documents: List[Dict[str, Any]],
-        batch_size: int = 100
+        batch_size: int = 100,
+        on_commit: Optional[Callable[[int], None]] = None
     ):
-        """Index documents into collection"""
+        """
+        Index documents into collection
+
+        Args:
+            collection_name: Target collection
+            documents: Documents to embed and upsert
+            batch_size: Documents per batch
+            on_commit: Called with the number of documents durably upserted
+                after each batch (checkpointing)
+        """
         print(f"Indexing {len(documents)} documents to {collection_name}")
 
         # Process in batches
         for i in range(0, len(documents), batch_size):
             batch = documents[i:i + batch_size]
 
-            # Extract texts for embedding
-            texts = [doc["text"] for doc in batch]
-            vectors = self.embedder.encode(texts)
-
-            # Create points
-            points = []
-            for j, (doc, vector) in enumerate(zip(batch, vectors)):
-                point_id = doc.get("id", self._generate_id(doc["text"]))
-                # Convert string ID to integer if needed
-                if isinstance(point_id, str):
-                    point_id = int(hashlib.md5(point_id.encode()).hexdigest()[:15], 16)
-
-                point = PointStruct(
-                    id=point_id,
-                    vector=vector,
-                    payload={
-                        "text": doc["text"],
-                        **doc.get("metadata", {})
-                    }
-                )
-                points.append(point)
+            points = self.embed_points(batch)
 
             # Upsert batch
-            self.client.upsert(
-                collection_name=collection_name,
-                points=points
-            )
+            with self.profiler.stage("upsert") if self.profiler is not None else nullcontext():
+                self.client.upsert(
+                    collection_name=collection_name,
+                    points=points
+                )
+            if on_commit is not None:
+                on_commit(i + len(batch))
 
             if (i + batch_size) % 500 == 0:
                 print(f"  Indexed {i + batch_size}/{len(documents)}")
 
         print(f"  Completed indexing {len(documents)} documents")
 
+    def delete_documents(self, collection_name: str, doc_ids: List[str]):
+        """Delete documents by their document IDs (chunk keys)"""
+        if not doc_ids:
+            return
+        self.client.delete(
+            collection_name=collection_name,
+            points_selector=models.PointIdsList(
+                points=[self._point_id(doc_id) for doc_id in doc_ids]
+            )
+        )
+        print(f"  Deleted {len(doc_ids)} stale documents from {collection_name}")
+
+    def sync_documents(
+        self,
+        collection_name: str,
+        documents: List[Dict[str, Any]],
+        manifest: "IndexManifest"
+    ):
+        """
+        Incrementally sync a collection with the manifest.
+
+        Only new or changed documents are embedded and upserted; documents
+        whose chunk keys disappeared are deleted. The manifest is updated
+        in memory, callers are responsible for saving it.
+        """
+        target, changed = self.prepare_collection(collection_name, documents, manifest, incremental=True)
+        if changed:
+            self.index_documents(target, changed)
+        if target != collection_name:
+            from src.config import COLLECTION_RETENTION
+            self.publish_version(collection_name, target, len(documents), COLLECTION_RETENTION)
+        manifest.update(collection_name, documents, self.embedder.model_id)
+
+    def prepare_collection(
+        self,
+        collection_name: str,
+        documents: List[Dict[str, Any]],
+        manifest: "IndexManifest",
+        rebuild: bool = False,
+        incremental: bool = False,
+        version: Optional[int] = None,
+        resume: bool = False
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Create the collection and work out which documents need embedding.
+
+        With `rebuild`, a new versioned shadow collection is created (the
+        live alias keeps serving until `publish_version`). In incremental
+        mode, documents whose chunk keys disappeared are deleted here, and
+        only new/changed documents are returned; an existing collection
+        without a manifest entry is rebuilt into a new version instead.
+        With `resume`, an existing shadow collection from an interrupted
+        rebuild is kept.
+
+        Returns:
+            Tuple of (collection to write to, documents to embed and upsert)
+        """
+        if rebuild:
+            if version is None:
+                version = self.next_version([collection_name])
+            target = self.versioned_name(collection_name, version)
+            self.create_collection(
+                target, recreate=not (resume and self.collection_exists(target)), points=len(documents)
+            )
+            return target, documents
+
+        if not incremental:
+            self.create_collection(collection_name, points=len(documents))
+            return collection_name, documents
+
+        if not self.collection_exists(collection_name):
+            manifest.drop(collection_name)
+            self.create_collection(collection_name, points=len(documents))
+        elif collection_name not in manifest.collections:
+            # 没有 manifest 记录 (如旧版按位置编号的 ID): 无法确定哪些点已过期，
+            # 改为重建到新版本，避免同一分块以新旧两个 ID 重复出现
+            print(f"  No manifest entry for {collection_name}, rebuilding it instead")
+            target = self.versioned_name(collection_name, self.next_version([collection_name]))
+            self.create_collection(target, recreate=True, points=len(documents))
+            return target, documents
+
+        changed, removed = manifest.diff(collection_name, documents, self.embedder.model_id)
+        print(f"  {len(changed)} new/changed, {len(removed)} removed, "
+              f"{len(documents) - len(changed)} unchanged")
+
+        self.delete_documents(collection_name, removed)
+        return collection_name, changed
+
     def search(
         self,
         collection_name: str,
@@ -142,11 +895,12 @@ class Indexer:
         """Search for similar documents"""
         query_vector = self.embedder.encode_single(query)
 
-        results = self.client.search(
+        results = self.client.query_points(
             collection_name=collection_name,
-            query_vector=query_vector,
-            limit=top_k
-        )
+            query=query_vector,
+            limit=top_k,
+            with_payload=True
+        ).points
 
         return [
             {
@@ -306,8 +1060,8 @@ def index_ace_reference(indexer: "Indexer", collection: str, rebuild: bool = Fal
         indexer.index_documents(collection, docs)
 
 
-def index_ace_schema(indexer: "Indexer", collection: str, rebuild: bool = False):
-    """Index ACE schema from Construct3-Schema (使用 Schema 数据)"""
+def build_ace_schema_docs() -> List[Dict[str, Any]]:
+    """Build ACE schema documents from Construct3-Schema (使用 Schema 数据)"""
     from src.data_processing.schema_parser import SchemaParser
 
     print(f"  Parsing ACE schema from Construct3-Schema...")
@@ -316,7 +1070,7 @@ def index_ace_schema(indexer: "Indexer", collection: str, rebuild: bool = False)
 
     if not entries:
         print("  No ACE entries found, skipping...")
-        return
+        return []
 
     stats = parser.get_stats(entries)
     print(f"  Found {stats['total_aces']} ACE entries:")
@@ -325,12 +1079,18 @@ def index_ace_schema(indexer: "Indexer", collection: str, rebuild: bool = False)
     print(f"    - Expressions: {stats['by_type']['expression']}")
     print(f"    - Plugins: {stats['plugins']}, Behaviors: {stats['behaviors']}")
 
-    docs = parser.export_ace_for_vectordb(entries)
-    indexer.index_documents(collection, docs)
+    return parser.export_ace_for_vectordb(entries)
 
 
-def index_effects_schema(indexer: "Indexer", collection: str, rebuild: bool = False):
-    """Index effects schema from Construct3-Schema (使用 Schema 数据)"""
+def index_ace_schema(indexer: "Indexer", collection: str, rebuild: bool = False):
+    """Index ACE schema from Construct3-Schema (使用 Schema 数据)"""
+    docs = build_ace_schema_docs()
+    if docs:
+        indexer.index_documents(collection, docs)
+
+
+def build_effects_schema_docs() -> List[Dict[str, Any]]:
+    """Build effects schema documents from Construct3-Schema (使用 Schema 数据)"""
     from src.data_processing.schema_parser import SchemaParser
 
     print(f"  Parsing Effects schema from Construct3-Schema...")
@@ -339,7 +1099,7 @@ def index_effects_schema(indexer: "Indexer", collection: str, rebuild: bool = Fa
 
     if not entries:
         print("  No effect entries found, skipping...")
-        return
+        return []
 
     # 按分类统计
     by_category = {}
@@ -351,30 +1111,75 @@ def index_effects_schema(indexer: "Indexer", collection: str, rebuild: bool = Fa
     for cat, count in sorted(by_category.items()):
         print(f"    - {cat}: {count}")
 
-    docs = parser.export_effects_for_vectordb(entries)
-    indexer.index_documents(collection, docs)
+    return parser.export_effects_for_vectordb(entries)
 
 
-def index_all_data(rebuild: bool = False):
-    """Index all Construct 3 data into Qdrant"""
-    from src.config import (
-        QDRANT_HOST, QDRANT_PORT, EMBEDDING_MODEL,
-        SOURCE_DIR, TRANSLATION_CSV,
-    )
-    from src.collections import DOC_COLLECTIONS, ALL_COLLECTIONS, COLLECTIONS
-    from src.data_processing.markdown_parser import MarkdownParser
+def index_effects_schema(indexer: "Indexer", collection: str, rebuild: bool = False):
+    """Index effects schema from Construct3-Schema (使用 Schema 数据)"""
+    docs = build_effects_schema_docs()
+    if docs:
+        indexer.index_documents(collection, docs)
+
+
+def _unique_ids(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Make document IDs unique within a collection (suffix repeated keys)"""
+    seen: Dict[str, int] = {}
+    for doc in docs:
+        doc_id = doc["id"]
+        if doc_id in seen:
+            seen[doc_id] += 1
+            doc["id"] = f"{doc_id}~{seen[doc_id]}"
+        else:
+            seen[doc_id] = 1
+    return docs
+
+
+def _chunk_key(metadata: Dict[str, Any]) -> str:
+    """Stable key of a markdown chunk: source#H2 (+ part index for split sections)"""
+    if "parent_section_id" in metadata:
+        return f"{metadata['parent_section_id']}#p{metadata['part_index']}"
+    return f"{metadata.get('source', '')}#{metadata.get('h2_heading', '')}"
+
+
+def markdown_documents(chunks) -> List[Dict[str, Any]]:
+    """Markdown chunks -> documents keyed by their stable chunk key"""
+    return [
+        {
+            "id": _chunk_key(chunk.metadata),
+            "text": chunk.text,
+            "metadata": chunk.metadata
+        }
+        for chunk in chunks
+    ]
+
+
+def iter_collection_documents():
+    """
+    Parse all Construct 3 data sources and yield documents per collection.
+
+    Document IDs are stable chunk keys (derived from source path, heading,
+    term key, ACE id...), not positions, so that re-parsing after a docs
+    update maps unchanged chunks to the same Qdrant points.
+
+    Manual sections and example events repeat a lot (shared sections,
+    "On start of layout" boilerplate); exact duplicates (near-duplicates
+    with DEDUP_THRESHOLD < 1.0) are collapsed into one document whose
+    payload lists all sources.
+
+    Yields:
+        Tuple of (collection name, list of documents)
+    """
+    from src.config import SOURCE_DIR, TRANSLATION_CSV, DEDUP_THRESHOLD, EMBEDDING_MODEL
+    from src.collections import DOC_COLLECTIONS, COLLECTIONS
+    from src.data_processing.dedup import deduplicate_documents
+    from src.data_processing.markdown_parser import MarkdownParser, load_token_counter
     from src.data_processing.csv_parser import CSVParser
     from src.data_processing.project_parser import process_example_projects
 
-    indexer = Indexer(
-        qdrant_host=QDRANT_HOST,
-        qdrant_port=QDRANT_PORT,
-        embedding_model=EMBEDDING_MODEL
-    )
-
     # Parse all markdown files once
     print("\n=== Parsing Markdown Documentation ===")
-    md_parser = MarkdownParser()
+    # 超长段落按 Embedding tokenizer 的 token 数切分
+    md_parser = MarkdownParser(token_counter=load_token_counter(EMBEDDING_MODEL))
     all_chunks = md_parser.parse_directory()
 
     # Group chunks by collection
@@ -384,32 +1189,21 @@ def index_all_data(rebuild: bool = False):
         if collection in chunks_by_collection:
             chunks_by_collection[collection].append(chunk)
 
-    # Index each document collection
     for collection in DOC_COLLECTIONS:
-        chunks = chunks_by_collection[collection]
-        print(f"\n=== Indexing {collection} ({len(chunks)} chunks) ===")
-        indexer.create_collection(collection, recreate=rebuild)
-        if chunks:
-            docs = [
-                {
-                    "id": f"{collection}_{i}",
-                    "text": chunk.text,
-                    "metadata": chunk.metadata
-                }
-                for i, chunk in enumerate(chunks)
-            ]
-            indexer.index_documents(collection, docs)
-
-    # Index translation terms
-    print("\n=== Indexing Translation Terms ===")
-    indexer.create_collection(COLLECTIONS["terms"], recreate=rebuild)
-    csv_parser = CSVParser()
+        docs = markdown_documents(chunks_by_collection[collection])
+        if DEDUP_THRESHOLD > 0:
+            docs = deduplicate_documents(docs, ("source",), DEDUP_THRESHOLD, collection)
+        yield collection, _unique_ids(docs)
+
+    # Translation terms
+    print("\n=== Parsing Translation Terms ===")
+    docs = []
     csv_path = SOURCE_DIR / TRANSLATION_CSV
     if csv_path.exists():
-        entries = csv_parser.parse_file(csv_path)
+        entries = CSVParser().parse_file(csv_path)
         docs = [
             {
-                "id": f"term_{i}",
+                "id": f"term_{entry.term_key}",
                 "text": entry.full_text,
                 "metadata": {
                     "term_key": entry.term_key,
@@ -419,30 +1213,222 @@ def index_all_data(rebuild: bool = False):
                     "en": entry.en
                 }
             }
-            for i, entry in enumerate(entries)
+            for entry in entries
         ]
-        indexer.index_documents(COLLECTIONS["terms"], docs)
+    yield COLLECTIONS["terms"], _unique_ids(docs)
 
-    # Index example projects
-    print("\n=== Indexing Example Projects ===")
-    indexer.create_collection(COLLECTIONS["examples"], recreate=rebuild)
+    # Example projects
+    print("\n=== Parsing Example Projects ===")
+    docs = []
     project_parser = process_example_projects()
     if project_parser:
         docs = project_parser.export_for_vectordb()
-        indexer.index_documents(COLLECTIONS["examples"], docs)
+    if DEDUP_THRESHOLD > 0:
+        docs = deduplicate_documents(
+            docs, ("project", "event_sheet"), DEDUP_THRESHOLD, COLLECTIONS["examples"]
+        )
+    yield COLLECTIONS["examples"], _unique_ids(docs)
+
+    # ACE Schema (from Construct3-Schema - 完整双语数据)
+    print("\n=== Parsing ACE Schema (from Construct3-Schema) ===")
+    yield COLLECTIONS["ace"], _unique_ids(build_ace_schema_docs())
+
+    # Effects Schema (from Construct3-Schema)
+    print("\n=== Parsing Effects Schema (from Construct3-Schema) ===")
+    yield COLLECTIONS["effects"], _unique_ids(build_effects_schema_docs())
+
+
+def index_all_data(
+    rebuild: bool = False,
+    incremental: bool = False,
+    use_cache: bool = True,
+    pipelined: bool = False,
+    workers: Optional[int] = None,
+    resume: bool = False,
+    report: bool = True,
+    storage: Optional[str] = None,
+    unified: Optional[bool] = None
+):
+    """
+    Index all Construct 3 data into Qdrant
+
+    Args:
+        rebuild: Build every collection from scratch into a new versioned
+            collection, then switch its alias (zero downtime)
+        incremental: Only embed new/changed chunks and delete removed ones,
+            based on the content-hash manifest in INDEX_STATE_DIR
+        use_cache: Reuse vectors from the on-disk embedding cache
+        pipelined: Overlap parsing, embedding and upserts (see pipeline.py)
+        workers: Embedding worker processes (default: EMBEDDING_WORKERS, 0 = in-process)
+        resume: Continue an interrupted run from its checkpoint: finished
+            collections are skipped, the in-progress one continues after
+            its last committed batch
+        report: Profile the run and write a JSON run report to
+            INDEX_STATE_DIR/reports (per-stage timings, throughput, memory)
+        storage: Storage profile for created collections (default: STORAGE_PROFILE)
+        unified: Afterwards merge all collections into UNIFIED_COLLECTION for
+            single-query retrieval (default: UNIFIED_COLLECTION_MODE)
+    """
+    from src.config import (
+        QDRANT_HOST, QDRANT_PORT, EMBEDDING_MODEL,
+        EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_MAX_ENTRIES,
+        EMBEDDING_WORKERS, EMBEDDING_THREADS_PER_WORKER, EMBEDDING_TOKEN_BUDGET,
+        COLLECTION_RETENTION, EMBEDDING_BACKEND, SPARSE_VECTORS, UNIFIED_COLLECTION_MODE,
+    )
+    from src.collections import ALL_COLLECTIONS
+    from src.data_processing.bm25 import build_collection_index
+
+    # 不同后端的向量有细微差异，缓存和 manifest 按 (模型, 后端) 区分
+    model_id = embedding_model_id(EMBEDDING_MODEL, EMBEDDING_BACKEND)
 
-    # Index ACE Schema (from Construct3-Schema - 完整双语数据)
-    print("\n=== Indexing ACE Schema (from Construct3-Schema) ===")
-    indexer.create_collection(COLLECTIONS["ace"], recreate=rebuild)
-    index_ace_schema(indexer, COLLECTIONS["ace"], rebuild)
+    cache = None
+    if use_cache:
+        cache = EmbeddingCache(EMBEDDING_CACHE_DIR, model_id, EMBEDDING_CACHE_MAX_ENTRIES)
 
-    # Index Effects Schema (from Construct3-Schema)
-    print("\n=== Indexing Effects Schema (from Construct3-Schema) ===")
-    indexer.create_collection(COLLECTIONS["effects"], recreate=rebuild)
-    index_effects_schema(indexer, COLLECTIONS["effects"], rebuild)
+    if workers is None:
+        workers = EMBEDDING_WORKERS
+    # 多进程时加大批次，保证每个 worker 分到足够的文本
+    batch_size = 100 * max(1, workers)
 
+    indexer = Indexer(
+        qdrant_host=QDRANT_HOST,
+        qdrant_port=QDRANT_PORT,
+        embedding_model=EMBEDDING_MODEL,
+        embedding_cache=cache,
+        embedding_workers=workers,
+        threads_per_worker=EMBEDDING_THREADS_PER_WORKER or None,
+        token_budget=EMBEDDING_TOKEN_BUDGET or None,
+        embedding_backend=EMBEDDING_BACKEND,
+        sparse_vectors=SPARSE_VECTORS,
+        storage=storage
+    )
+    manifest = IndexManifest.load()
+
+    if incremental and rebuild:
+        print("Warning: --rebuild recreates all collections, ignoring --incremental")
+        incremental = False
+
+    # 断点续跑: 只有参数相同的上一次运行才能继续
+    checkpoint = IndexCheckpoint.load()
+    run = {
+        "mode": "rebuild" if rebuild else "incremental" if incremental else "full",
+        "model": model_id,
+    }
+    if resume and not checkpoint.matches(run):
+        print("No matching checkpoint to resume, starting a new run")
+        resume = False
+
+    if resume:
+        version = checkpoint.run.get("index_version")
+        done = [c for c in checkpoint.collections if checkpoint.is_done(c)]
+        print(f"Resuming interrupted run ({len(done)} collections already done)")
+    else:
+        version = indexer.next_version(ALL_COLLECTIONS) if rebuild else None
+        checkpoint.start({**run, "index_version": version})
+    if rebuild:
+        print(f"Building index version v{version} (live collections keep serving)")
+
+    profiler = None
+    if report:
+        from src.data_processing.run_report import RunProfiler
+        profiler = RunProfiler({
+            **run, "index_version": version, "resume": resume, "pipelined": pipelined,
+            "workers": workers, "backend": EMBEDDING_BACKEND, "token_budget": EMBEDDING_TOKEN_BUDGET,
+        })
+        indexer.profiler = profiler
+        indexer.embedder.profiler = profiler
+
+    def prepare(collection: str, docs: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]], int]:
+        """Create the target collection and skip work committed by an earlier attempt"""
+        target, to_index = indexer.prepare_collection(
+            collection, docs, manifest, rebuild=rebuild, incremental=incremental,
+            version=version, resume=resume
+        )
+        offset = checkpoint.resume_offset(collection, target, to_index) if resume else 0
+        if offset:
+            print(f"  Resuming {collection} at {offset}/{len(to_index)}")
+        elif resume and rebuild and collection in checkpoint.collections:
+            # 检查点失效时从空集合重新开始
+            indexer.create_collection(target, recreate=True)
+        checkpoint.begin(collection, target, to_index, offset)
+        if profiler is not None:
+            profiler.record_documents(collection, docs, len(to_index) - offset)
+        return target, to_index[offset:], offset
+
+    def finalize(collection: str, target: str, docs: List[Dict[str, Any]]):
+        # BM25 先于 alias 切换写入: generation 变化后检索端读到的是新索引
+        build_collection_index(collection, [d["text"] for d in docs], [indexer._point_id(d["id"]) for d in docs])
+        if target != collection:
+            indexer.publish_version(collection, target, len(docs), COLLECTION_RETENTION)
+        else:
+            # 原地更新 (增量 / 全量覆盖)，alias 未变
+            IndexGeneration().bump(f"{collection} updated")
+        manifest.update(collection, docs, model_id)
+        manifest.save()
+        checkpoint.finish(collection)
+
+    def pending_collections():
+        jobs = iter_collection_documents()
+        if profiler is not None:
+            jobs = profiler.timed_iter(jobs)
+        for collection, docs in jobs:
+            if resume and checkpoint.is_done(collection):
+                print(f"\n=== Skipping {collection} (done before interruption) ===")
+                continue
+            yield collection, docs
+
+    if pipelined:
+        from src.data_processing.pipeline import PipelinedIndexer
+
+        indexed = []
+        targets: Dict[str, Tuple[str, int]] = {}  # target -> (collection, resumed offset)
+
+        def prepare_queued(collection: str, docs: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
+            print(f"\n=== Queueing {collection} ({len(docs)} documents) ===")
+            target, to_index, offset = prepare(collection, docs)
+            indexed.append((collection, target, docs))
+            targets[target] = (collection, offset)
+            return target, to_index
+
+        def on_commit(target: str, applied: int):
+            collection, offset = targets[target]
+            checkpoint.advance(collection, offset + applied)
+
+        pipeline = PipelinedIndexer(indexer, batch_size=batch_size, on_commit=on_commit)
+        pipeline.run(pending_collections(), prepare_queued)
+        pipeline.print_report()
+        if profiler is not None:
+            profiler.run_info["pipeline"] = pipeline.report()
+
+        # 所有 upsert 已通过 barrier 确认后才切换 alias / 更新 manifest
+        for collection, target, docs in indexed:
+            finalize(collection, target, docs)
+    else:
+        for collection, docs in pending_collections():
+            print(f"\n=== Indexing {collection} ({len(docs)} documents) ===")
+            target, to_index, offset = prepare(collection, docs)
+            if to_index:
+                with profiler.collection(collection) if profiler is not None else nullcontext():
+                    indexer.index_documents(
+                        target, to_index, batch_size=batch_size,
+                        on_commit=lambda n, c=collection, o=offset: checkpoint.advance(c, o + n)
+                    )
+            finalize(collection, target, docs)
+
+    checkpoint.clear()
+
+    if UNIFIED_COLLECTION_MODE if unified is None else unified:
+        indexer.build_unified_collection(retention=COLLECTION_RETENTION)
+
+    indexer.embedder.close()
     print("\n=== Indexing Complete ===")
 
+    if cache is not None:
+        cache.flush()
+        stats = cache.stats()
+        print(f"  Embedding cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.0%} hit rate), {stats['entries']} entries")
+
     # Print collection stats
     for collection in ALL_COLLECTIONS:
         try:
@@ -451,12 +1437,44 @@ def index_all_data(rebuild: bool = False):
         except Exception:
             pass
 
+    if profiler is not None:
+        profiler.finish()
+        profiler.print_summary()
+        print(f"  Run report: {profiler.write()}")
+
 
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="Index Construct 3 data into Qdrant")
-    parser.add_argument("--rebuild", action="store_true", help="Recreate collections")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Rebuild into new versioned collections and switch aliases")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only embed new/changed chunks, delete removed ones")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Do not use the on-disk embedding cache")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Overlap parsing, embedding and upserts in a pipeline")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Embedding worker processes (default: EMBEDDING_WORKERS, 0 = in-process)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run from its last committed batch")
+    parser.add_argument("--no-report", action="store_true",
+                        help="Do not write a JSON run report")
+    parser.add_argument("--unified", action="store_true", default=None,
+                        help="Also merge all collections into the unified collection (default: UNIFIED_COLLECTION_MODE)")
+    parser.add_argument("--storage", choices=["default", "low-memory"], default=None,
+                        help="Storage profile for created collections (default: STORAGE_PROFILE)")
     args = parser.parse_args()
 
-    index_all_data(rebuild=args.rebuild)
+    index_all_data(
+        rebuild=args.rebuild,
+        incremental=args.incremental,
+        use_cache=not args.no_cache,
+        pipelined=args.pipeline,
+        workers=args.workers,
+        resume=args.resume,
+        report=not args.no_report,
+        storage=args.storage,
+        unified=args.unified
+    )
@@ -1,13 +1,33 @@
 """
 Markdown Parser for Construct 3 Manual
 Parses markdown files with H2-level semantic chunking
+
+Oversized H2 sections are split at H3 / paragraph / table-row boundaries
+under a token budget. Every piece keeps the "# H1 / ## H2" prefix and
+records its parent section, so pieces can be reassembled at query time.
 """
 import re
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from dataclasses import dataclass, field
 
 
+def load_token_counter(model_name: str) -> Optional[Callable[[str], int]]:
+    """
+    Token counter using the embedding model's tokenizer (tokenizer only, no weights).
+
+    Returns:
+        Function text -> token count, or None if the tokenizer is unavailable
+    """
+    try:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+    except Exception as e:
+        print(f"  Warning: Tokenizer for {model_name} unavailable ({e}), splitting by characters")
+        return None
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+
+
 @dataclass
 class MarkdownChunk:
     """Represents a semantically chunked markdown section"""
@@ -27,19 +47,34 @@ class MarkdownParser:
         'scripting': 'scripting',
     }
 
-    def __init__(self, base_dir: Optional[Path] = None):
+    def __init__(
+        self,
+        base_dir: Optional[Path] = None,
+        token_counter: Optional[Callable[[str], int]] = None,
+        max_tokens: Optional[int] = None
+    ):
         """
         Initialize the parser.
 
         Args:
             base_dir: Base directory for markdown files. If None, uses config.
+            token_counter: Counts tokens of a text (see `load_token_counter`).
+                If None, sections are measured in characters.
+            max_tokens: Split budget per chunk. Defaults to MAX_CHUNK_TOKENS
+                with a token counter, MAX_CHUNK_SIZE characters without.
         """
+        from src.config import BASE_DIR, MANUAL_REPO, MAX_CHUNK_SIZE, MAX_CHUNK_TOKENS
+
         if base_dir is None:
-            from src.config import BASE_DIR, MANUAL_REPO
             self.base_dir = BASE_DIR.parent / MANUAL_REPO / "Construct3-Manual"
         else:
             self.base_dir = Path(base_dir)
 
+        self.count_tokens = token_counter or len
+        if max_tokens is None:
+            max_tokens = MAX_CHUNK_TOKENS if token_counter else MAX_CHUNK_SIZE
+        self.max_tokens = max_tokens
+
         # Load mappings from collections
         from src.collections import DIR_TO_COLLECTION, COLLECTIONS, SUBCATEGORY_MAPPING
         self.dir_to_collection = DIR_TO_COLLECTION
@@ -210,10 +245,126 @@ class MarkdownParser:
         pattern = r'## On this page\s*\n(?:- \[.*?\]\(.*?\)\s*\n)*\s*---\s*\n?'
         return re.sub(pattern, '', content, flags=re.IGNORECASE)
 
+    # ------------------------------------------------------------------
+    # Oversized section splitting
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _split_blocks(text: str) -> List[str]:
+        """Split text into paragraphs; a markdown table stays one block"""
+        blocks: List[str] = []
+        current: List[str] = []
+        in_table = False
+        for line in text.split('\n'):
+            is_table_row = line.lstrip().startswith('|')
+            if not line.strip() or is_table_row != in_table:
+                if current:
+                    blocks.append('\n'.join(current))
+                current = []
+            in_table = is_table_row
+            if line.strip():
+                current.append(line)
+        if current:
+            blocks.append('\n'.join(current))
+        return blocks
+
+    def _split_oversized(self, block: str, budget: int) -> List[str]:
+        """Split a single block larger than the budget (table rows, then lines)"""
+        lines = block.split('\n')
+        header: List[str] = []
+        if len(lines) > 2 and lines[0].lstrip().startswith('|') and set(lines[1].replace('|', '').strip()) <= set('-: '):
+            # 表格: 每个分片重复表头
+            header, lines = lines[:2], lines[2:]
+
+        pieces: List[str] = []
+        current: List[str] = []
+        used = self.count_tokens('\n'.join(header))
+        base = used
+        for line in lines:
+            cost = self.count_tokens(line) + 1
+            if current and used + cost > budget:
+                pieces.append('\n'.join(header + current))
+                current, used = [], base
+            if cost > budget - base:
+                # 单行超出预算: 按字符硬切分 (极少见)
+                step = max(1, len(line) * (budget - base) // cost)
+                pieces.extend('\n'.join(header + [line[i:i + step]]) for i in range(0, len(line), step))
+                continue
+            current.append(line)
+            used += cost
+        if current:
+            pieces.append('\n'.join(header + current))
+        return pieces
+
+    def _pack(self, units: List[str], budget: int, heading: str = '') -> List[str]:
+        """Greedily pack units into pieces; continuation pieces repeat `heading`"""
+        pieces: List[str] = []
+        current: List[str] = []
+        used = 0
+        heading_cost = self.count_tokens(heading) + 2 if heading else 0
+        for unit in units:
+            cost = self.count_tokens(unit) + 2  # + 段落分隔符
+            if current and used + cost > budget:
+                pieces.append('\n\n'.join(current))
+                current = [heading] if heading else []
+                used = heading_cost
+            if cost > budget - used:
+                if current and current != [heading]:
+                    pieces.append('\n\n'.join(current))
+                for part in self._split_oversized(unit, budget - heading_cost):
+                    pieces.append(f"{heading}\n\n{part}" if heading else part)
+                current = [heading] if heading else []
+                used = heading_cost
+                continue
+            current.append(unit)
+            used += cost
+        if current and current != [heading]:
+            pieces.append('\n\n'.join(current))
+        return pieces
+
+    def split_section(self, prefix: str, body: str) -> List[str]:
+        """
+        Split an H2 section body so that `prefix + piece` fits the budget.
+
+        Boundaries in order of preference: H3 headings, paragraphs /
+        tables, table rows (header repeated), lines.
+
+        Args:
+            prefix: Breadcrumb kept on every piece ("# H1\n\n## H2")
+            body: Section content after the H2 heading line
+
+        Returns:
+            Full chunk texts (prefix included)
+        """
+        budget = self.max_tokens - self.count_tokens(prefix) - 2
+        if budget <= 0:
+            return [f"{prefix}\n\n{body}"]
+
+        # 先按 H3 分块，能整体放入的 H3 小节合并到同一分片
+        h3_blocks = [b.strip() for b in re.split(r'(?m)^(?=###\s)', body) if b.strip()]
+        units: List[str] = []
+        for block in h3_blocks:
+            if self.count_tokens(block) + 2 <= budget:
+                units.append(block)
+                continue
+            # H3 小节本身过大: 按段落/表格再分，续片保留 H3 标题
+            first_line, _, rest = block.partition('\n')
+            heading = first_line if first_line.startswith('###') else ''
+            sub_units = self._split_blocks(rest if heading else block)
+            if heading:
+                sub_units = [heading] + sub_units
+            units.extend(self._pack(sub_units, budget, heading))
+
+        return [f"{prefix}\n\n{piece}" for piece in self._pack(units, budget)]
+
     def split_by_h2(self, content: str, base_metadata: Dict[str, Any]) -> List[MarkdownChunk]:
         """
         Split content into chunks at H2 boundaries.
 
+        Sections over the token budget are further split (see
+        `split_section`); their pieces carry `parent_section_id`,
+        `part_index` and `part_count` metadata.
+
         Args:
             content: Markdown content (without frontmatter)
             base_metadata: Base metadata to include in each chunk
@@ -255,6 +406,7 @@ class MarkdownParser:
         # Get content before first H2 (intro section with H1)
         intro_end = h2_matches[0].start()
         intro_content = content[:intro_end].strip()
+        seen_sections: Dict[str, int] = {}
 
         # Process each H2 section
         for i, match in enumerate(h2_matches):
@@ -278,16 +430,36 @@ class MarkdownParser:
 
             # Detect section type
             section_type = self.detect_section_type(h2_heading)
+            metadata = {
+                **base_metadata,
+                'h1_heading': h1_title,  # 统一用 heading
+                'h2_heading': h2_heading,
+                'section_type': section_type,
+            }
+
+            if self.count_tokens(chunk_text) <= self.max_tokens:
+                chunks.append(MarkdownChunk(text=chunk_text, metadata=metadata))
+                continue
+
+            # 超长段落: 分片，每片保留 H1/H2 前缀
+            section_id = f"{base_metadata.get('source', '')}#{h2_heading}"
+            seen_sections[section_id] = seen_sections.get(section_id, 0) + 1
+            if seen_sections[section_id] > 1:
+                section_id = f"{section_id}~{seen_sections[section_id]}"
 
-            chunks.append(MarkdownChunk(
-                text=chunk_text,
-                metadata={
-                    **base_metadata,
-                    'h1_heading': h1_title,  # 统一用 heading
-                    'h2_heading': h2_heading,
-                    'section_type': section_type,
-                }
-            ))
+            h2_line, _, body = section_content.partition('\n')
+            prefix = f"# {h1_title}\n\n{h2_line}" if intro_content else h2_line
+            pieces = self.split_section(prefix, body.strip())
+            for part_index, piece in enumerate(pieces):
+                chunks.append(MarkdownChunk(
+                    text=piece,
+                    metadata={
+                        **metadata,
+                        'parent_section_id': section_id,
+                        'part_index': part_index,
+                        'part_count': len(pieces),
+                    }
+                ))
 
         return chunks
 
@@ -346,7 +518,7 @@ class MarkdownParser:
             dir_path = Path(dir_path)
 
         all_chunks = []
-        md_files = list(dir_path.rglob('*.md'))
+        md_files = sorted(dir_path.rglob('*.md'))
 
         print(f"Found {len(md_files)} markdown files in {dir_path}")
 
@@ -0,0 +1,221 @@
+"""
+ONNX Runtime Embedding Backend for Construct 3 RAG
+Runs the embedding model as a dynamically int8-quantized ONNX graph on CPU
+
+The model is exported once with optimum, quantized with onnxruntime's
+dynamic quantization (int8 weights, activations quantized at runtime) and
+cached under ONNX_MODEL_DIR. Inference only needs onnxruntime + the
+tokenizer, so query-time processes do not load torch.
+
+用法:
+  python -m src.data_processing.onnx_backend --export
+  python -m src.data_processing.onnx_backend --check        # 与 PyTorch 向量对比
+"""
+import os
+import json
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+try:
+    import onnxruntime as ort
+    from transformers import AutoTokenizer
+except ImportError:
+    ort = None
+
+
+ONNX_FILENAME = "model.onnx"
+QUANTIZED_FILENAME = "model_int8.onnx"
+
+
+def onnx_model_dir(model_name: str, base_dir: Optional[Path] = None) -> Path:
+    """Directory holding the exported ONNX files for a model"""
+    if base_dir is None:
+        from src.config import ONNX_MODEL_DIR
+        base_dir = ONNX_MODEL_DIR
+    return Path(base_dir) / model_name.replace("/", "__")
+
+
+def export_onnx(model_name: str, output_dir: Optional[Path] = None, quantize: bool = True) -> Path:
+    """
+    Export a Hugging Face model to ONNX and (optionally) quantize it to int8.
+
+    Requires `optimum[onnxruntime]` (only needed for the export step).
+
+    Returns:
+        Path to the model file to load (quantized if `quantize`)
+    """
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    output_dir = Path(output_dir) if output_dir else onnx_model_dir(model_name)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"Exporting {model_name} to ONNX: {output_dir}")
+    model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+    model.save_pretrained(output_dir)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(output_dir)
+
+    if not quantize:
+        return output_dir / ONNX_FILENAME
+
+    print("Quantizing weights to int8 (dynamic quantization)")
+    quantize_dynamic(
+        model_input=str(output_dir / ONNX_FILENAME),
+        model_output=str(output_dir / QUANTIZED_FILENAME),
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+    return output_dir / QUANTIZED_FILENAME
+
+
+class OnnxEncoder:
+    """
+    SentenceTransformer-compatible encoder backed by ONNX Runtime.
+
+    Exposes the subset of the SentenceTransformer API that EmbeddingModel
+    uses (`encode`, `tokenizer`, `max_seq_length`,
+    `get_sentence_embedding_dimension`).
+
+    Example:
+        >>> encoder = OnnxEncoder("BAAI/bge-m3")
+        >>> vectors = encoder.encode(["创建精灵"])   # np.ndarray, L2-normalized
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        model_dir: Optional[Path] = None,
+        quantized: bool = True,
+        pooling: str = "cls",
+        max_seq_length: int = 8192,
+        num_threads: Optional[int] = None
+    ):
+        """
+        Args:
+            model_name: Hugging Face model name (used to locate/export the ONNX files)
+            model_dir: Directory with the exported model (default: ONNX_MODEL_DIR/<model>)
+            quantized: Load the int8 graph instead of the float32 one
+            pooling: "cls" (BGE models) or "mean"
+            max_seq_length: Truncation length for the tokenizer
+            num_threads: ONNX Runtime intra-op threads (default: all cores)
+        """
+        if ort is None:
+            raise ImportError("onnxruntime not installed. Run: pip install onnxruntime transformers")
+
+        self.model_name = model_name
+        self.model_dir = Path(model_dir) if model_dir else onnx_model_dir(model_name)
+        self.pooling = pooling
+
+        filename = QUANTIZED_FILENAME if quantized else ONNX_FILENAME
+        model_path = self.model_dir / filename
+        if not model_path.exists():
+            # 首次使用时自动导出
+            model_path = export_onnx(model_name, self.model_dir, quantize=quantized)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            str(model_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+        self.max_seq_length = min(max_seq_length, self.tokenizer.model_max_length)
+        self._dimension: Optional[int] = None
+
+    def _pool(self, hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        if self.pooling == "cls":
+            return hidden[:, 0]
+        mask = attention_mask[..., None].astype(hidden.dtype)
+        return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(self, texts: List[str], batch_size: int = 8, show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        """Encode texts to L2-normalized float32 vectors"""
+        outputs = []
+        for i in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[i:i + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feeds = {k: v.astype(np.int64) for k, v in encoded.items() if k in self._input_names}
+            hidden = self.session.run(None, feeds)[0]
+            outputs.append(self._pool(hidden, encoded["attention_mask"]))
+
+        if not outputs:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        vectors = np.concatenate(outputs, axis=0).astype(np.float32)
+        return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self._dimension is None:
+            self._dimension = int(self.encode(["dimension probe"]).shape[1])
+        return self._dimension
+
+
+def check_parity(
+    model_name: str,
+    texts: List[str],
+    quantized: bool = True,
+    min_cosine: float = 0.98
+) -> Dict[str, Any]:
+    """
+    Compare ONNX vectors against the PyTorch SentenceTransformer vectors.
+
+    Both backends produce normalized vectors, so the cosine is a dot product.
+
+    Returns:
+        Dict with min / mean / p05 cosine and whether every text passed `min_cosine`
+    """
+    from sentence_transformers import SentenceTransformer
+
+    reference = SentenceTransformer(model_name, device="cpu").encode(
+        texts, batch_size=8, normalize_embeddings=True, show_progress_bar=False
+    )
+    candidate = OnnxEncoder(model_name, quantized=quantized).encode(texts)
+
+    cosines = np.sum(reference * candidate, axis=1)
+    return {
+        "model": model_name,
+        "quantized": quantized,
+        "texts": len(texts),
+        "min_cosine": float(cosines.min()),
+        "mean_cosine": float(cosines.mean()),
+        "p05_cosine": float(np.percentile(cosines, 5)),
+        "passed": bool(cosines.min() >= min_cosine),
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+    from src.config import EMBEDDING_MODEL
+
+    parser = argparse.ArgumentParser(description="Export / verify the ONNX embedding backend")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--export", action="store_true", help="Export and quantize the model")
+    parser.add_argument("--check", action="store_true", help="Cosine parity check against PyTorch")
+    parser.add_argument("--no-quantize", action="store_true", help="Use the float32 ONNX graph")
+    parser.add_argument("--docs", type=int, default=200, help="Texts used by --check")
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    args = parser.parse_args()
+
+    if args.export:
+        path = export_onnx(args.model, quantize=not args.no_quantize)
+        print(f"Model ready: {path} ({os.path.getsize(path) / 1024 ** 2:.0f} MB)")
+
+    if args.check:
+        sys.path.insert(0, str(Path(__file__).parent.parent.parent / "scripts" / "benchmarks"))
+        from common import load_sample_texts
+
+        result = check_parity(args.model, load_sample_texts(args.docs), not args.no_quantize, args.min_cosine)
+        print(json.dumps(result, indent=2))
+        sys.exit(0 if result["passed"] else 1)
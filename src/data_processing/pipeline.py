@@ -0,0 +1,279 @@
+"""
+Pipelined Indexer for Construct 3 RAG
+Overlaps parsing, embedding and Qdrant upserts with bounded queues
+
+    parse ──(embed queue)──> embed ──(upload queue)──> upload
+
+- Bounded queues give backpressure: a slow stage blocks the one before it
+  instead of buffering the whole corpus in memory.
+- Upserts are sent with wait=False; a final barrier makes sure every
+  collection has applied all of its writes before run() returns. With an
+  `on_commit` callback, every `commit_every`-th batch waits instead, so
+  progress can be checkpointed.
+- Each stage records busy / starved / blocked time so the report shows
+  where the wall time goes.
+"""
+import time
+import queue
+import threading
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import List, Dict, Any, Callable, Iterable, Tuple, Optional
+
+
+@dataclass
+class StageStats:
+    """Timing for one pipeline stage"""
+    name: str
+    busy_seconds: float = 0.0  # 实际工作时间
+    starved_seconds: float = 0.0  # 等待上游输入
+    blocked_seconds: float = 0.0  # 等待下游队列空位 (backpressure)
+    items: int = 0
+
+    def utilization(self, wall_seconds: float) -> float:
+        return self.busy_seconds / wall_seconds if wall_seconds > 0 else 0.0
+
+
+class _Stopped(Exception):
+    """Raised inside a stage when another stage failed"""
+
+
+_END = object()  # 队列结束标记
+
+
+class PipelinedIndexer:
+    """
+    Three-stage indexing pipeline on top of an `Indexer`.
+
+    Example:
+        >>> pipeline = PipelinedIndexer(indexer)
+        >>> pipeline.run(iter_collection_documents(), prepare)
+        >>> pipeline.print_report()
+    """
+
+    def __init__(
+        self,
+        indexer,
+        batch_size: int = 100,
+        queue_size: int = 4,
+        on_commit: Optional[Callable[[str, int], None]] = None,
+        commit_every: int = 5
+    ):
+        """
+        Args:
+            indexer: Indexer providing the Qdrant client and embedder
+            batch_size: Documents per embedding/upsert batch
+            queue_size: Max batches buffered between two stages
+            on_commit: Called with (collection, points applied so far) once
+                writes are confirmed by Qdrant
+            commit_every: Confirm every N-th batch when `on_commit` is set
+        """
+        self.indexer = indexer
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.on_commit = on_commit
+        self.commit_every = commit_every
+        self.stats: Dict[str, StageStats] = {}
+        self.wall_seconds = 0.0
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    # ------------------------------------------------------------------
+    # Queue helpers
+    # ------------------------------------------------------------------
+
+    def _put(self, q: queue.Queue, item, stats: StageStats):
+        t0 = time.perf_counter()
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            try:
+                q.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        stats.blocked_seconds += time.perf_counter() - t0
+
+    def _get(self, q: queue.Queue, stats: StageStats):
+        t0 = time.perf_counter()
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            try:
+                item = q.get(timeout=0.1)
+                break
+            except queue.Empty:
+                continue
+        stats.starved_seconds += time.perf_counter() - t0
+        return item
+
+    def _profile(self, collection: str, stage: Optional[str] = None):
+        """Attribute work to a collection (and stage) in the indexer's RunProfiler"""
+        profiler = getattr(self.indexer, "profiler", None)
+        if profiler is None:
+            return nullcontext()
+        from src.data_processing.indexer import base_collection_name
+        if stage is None:
+            return profiler.collection(base_collection_name(collection))
+        return profiler.stage(stage, base_collection_name(collection))
+
+    def _run_stage(self, fn: Callable, *args):
+        """Thread target: run a stage and stop the pipeline on failure"""
+        try:
+            fn(*args)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            if self._error is None:
+                self._error = e
+            self._stop.set()
+
+    # ------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------
+
+    def _parse_stage(self, jobs: Iterable, prepare: Callable, out_q: queue.Queue):
+        stats = self.stats["parse"]
+        iterator = iter(jobs)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                collection, docs = next(iterator)
+            except StopIteration:
+                stats.busy_seconds += time.perf_counter() - t0
+                break
+            target, docs = prepare(collection, docs)
+            stats.busy_seconds += time.perf_counter() - t0
+
+            for i in range(0, len(docs), self.batch_size):
+                self._put(out_q, (target, docs[i:i + self.batch_size]), stats)
+                stats.items += 1
+
+        self._put(out_q, _END, stats)
+
+    def _embed_stage(self, in_q: queue.Queue, out_q: queue.Queue):
+        stats = self.stats["embed"]
+        while True:
+            item = self._get(in_q, stats)
+            if item is _END:
+                break
+            collection, docs = item
+
+            t0 = time.perf_counter()
+            with self._profile(collection):
+                points = self.indexer.embed_points(docs)
+            stats.busy_seconds += time.perf_counter() - t0
+            stats.items += 1
+
+            self._put(out_q, (collection, points), stats)
+
+        self._put(out_q, _END, stats)
+
+    def _upload_stage(self, in_q: queue.Queue):
+        stats = self.stats["upload"]
+        last_batch: Dict[str, list] = {}
+        uploaded: Dict[str, int] = {}
+
+        while True:
+            item = self._get(in_q, stats)
+            if item is _END:
+                break
+            collection, points = item
+
+            stats.items += 1
+            # 同一 collection 的更新按顺序应用，等待这一批即确认之前所有批次
+            confirm = self.on_commit is not None and stats.items % self.commit_every == 0
+
+            t0 = time.perf_counter()
+            with self._profile(collection, "upsert"):
+                self.indexer.client.upsert(collection_name=collection, points=points, wait=confirm)
+            stats.busy_seconds += time.perf_counter() - t0
+
+            last_batch[collection] = points
+            uploaded[collection] = uploaded.get(collection, 0) + len(points)
+            if confirm:
+                self.on_commit(collection, uploaded[collection])
+            if stats.items % 10 == 0:
+                print(f"  [upload] {collection}: {uploaded[collection]} points sent")
+
+        # Barrier: Qdrant 按顺序应用同一 collection 的更新，
+        # 以 wait=True 重放最后一批 (幂等) 即可确认之前的写入都已生效
+        t0 = time.perf_counter()
+        for collection, points in last_batch.items():
+            self.indexer.client.upsert(collection_name=collection, points=points, wait=True)
+            print(f"  [upload] {collection}: {uploaded[collection]} points applied")
+            if self.on_commit is not None:
+                self.on_commit(collection, uploaded[collection])
+        stats.busy_seconds += time.perf_counter() - t0
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def run(
+        self,
+        jobs: Iterable[Tuple[str, List[Dict[str, Any]]]],
+        prepare: Optional[Callable[[str, List[Dict[str, Any]]], Tuple[str, List[Dict[str, Any]]]]] = None
+    ):
+        """
+        Run the pipeline to completion.
+
+        Args:
+            jobs: Iterable of (collection, documents); parsing happens lazily
+                while iterating, so a generator overlaps parsing with indexing
+            prepare: Optional callback run in the parse stage before a
+                collection is queued (create collection, incremental diff...).
+                Returns (collection to write to, documents to embed).
+        """
+        if prepare is None:
+            prepare = lambda collection, docs: (collection, docs)
+
+        self.stats = {name: StageStats(name) for name in ("parse", "embed", "upload")}
+        self._stop.clear()
+        self._error = None
+
+        embed_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        upload_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        threads = [
+            threading.Thread(target=self._run_stage, args=(self._parse_stage, jobs, prepare, embed_q),
+                             name="index-parse", daemon=True),
+            threading.Thread(target=self._run_stage, args=(self._embed_stage, embed_q, upload_q),
+                             name="index-embed", daemon=True),
+            threading.Thread(target=self._run_stage, args=(self._upload_stage, upload_q),
+                             name="index-upload", daemon=True),
+        ]
+
+        t0 = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.wall_seconds = time.perf_counter() - t0
+
+        if self._error is not None:
+            raise self._error
+
+    def report(self) -> Dict[str, Any]:
+        """Get per-stage utilization as a dict"""
+        return {
+            "wall_seconds": self.wall_seconds,
+            "stages": {
+                name: {
+                    "busy_seconds": s.busy_seconds,
+                    "starved_seconds": s.starved_seconds,
+                    "blocked_seconds": s.blocked_seconds,
+                    "utilization": s.utilization(self.wall_seconds),
+                    "batches": s.items,
+                }
+                for name, s in self.stats.items()
+            },
+        }
+
+    def print_report(self):
+        """Print per-stage utilization table"""
+        print(f"\n=== Pipeline Stages (wall {self.wall_seconds:.1f}s) ===")
+        print(f"  {'stage':<8} {'busy':>9} {'starved':>9} {'blocked':>9} {'util':>6} {'batches':>8}")
+        for s in self.stats.values():
+            print(f"  {s.name:<8} {s.busy_seconds:>8.1f}s {s.starved_seconds:>8.1f}s "
+                  f"{s.blocked_seconds:>8.1f}s {s.utilization(self.wall_seconds):>6.0%} {s.items:>8}")
@@ -3,6 +3,7 @@ Project Parser for Construct 3 Example Projects
 Parses event sheets and converts them to natural language descriptions
 """
 import json
+import hashlib
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass, field
@@ -237,7 +238,7 @@ class EventSheetParser:
         if not event_sheets_dir.exists():
             return blocks
 
-        for json_file in event_sheets_dir.glob("*.json"):
+        for json_file in sorted(event_sheets_dir.glob("*.json")):
             sheet_blocks = self.parse_event_sheet(json_file, project_name)
             blocks.extend(sheet_blocks)
 
@@ -271,12 +272,32 @@ class ProjectParser:
             "plugins_used": list(data.get("usedAddons", [])) if "usedAddons" in data else [],
         }
 
+    def parse_project_dir(self, project_dir: Path) -> Optional[Dict[str, Any]]:
+        """Parse one project folder (None if it has no .c3proj)"""
+        # Find c3proj file
+        c3proj_files = sorted(project_dir.glob("*.c3proj"))
+        if not c3proj_files:
+            return None
+
+        # Parse project metadata
+        metadata = self.parse_c3proj(c3proj_files[0])
+
+        # Parse event sheets
+        events = self.event_parser.parse_project(project_dir)
+
+        return {
+            **metadata,
+            "path": str(project_dir),
+            "event_count": len(events),
+            "events": events
+        }
+
     def parse_all_projects(self, projects_dir: Path) -> List[Dict[str, Any]]:
         """Parse all projects in the example-projects directory"""
         print(f"Scanning projects in: {projects_dir}")
 
         self.projects = []
-        project_dirs = [d for d in projects_dir.iterdir() if d.is_dir()]
+        project_dirs = sorted(d for d in projects_dir.iterdir() if d.is_dir())
 
         print(f"Found {len(project_dirs)} projects")
 
@@ -284,31 +305,28 @@ class ProjectParser:
             if (i + 1) % 50 == 0:
                 print(f"  Processed {i + 1}/{len(project_dirs)} projects...")
 
-            # Find c3proj file
-            c3proj_files = list(project_dir.glob("*.c3proj"))
-            if not c3proj_files:
-                continue
-
-            # Parse project metadata
-            metadata = self.parse_c3proj(c3proj_files[0])
-
-            # Parse event sheets
-            events = self.event_parser.parse_project(project_dir)
-
-            project_data = {
-                **metadata,
-                "path": str(project_dir),
-                "event_count": len(events),
-                "events": events
-            }
-
-            self.projects.append(project_data)
+            project_data = self.parse_project_dir(project_dir)
+            if project_data:
+                self.projects.append(project_data)
 
         print(f"Parsed {len(self.projects)} projects")
         return self.projects
 
+    @staticmethod
+    def event_key(project_name: str, event: EventBlock) -> str:
+        """Stable key of an event: "event_<project>/<event sheet>#<text hash>" """
+        digest = hashlib.sha1(event.natural_text.encode("utf-8")).hexdigest()[:12]
+        return f"event_{project_name}/{event.event_sheet}#{digest}"
+
     def export_for_vectordb(self) -> List[Dict[str, Any]]:
-        """Export parsed data for vector database"""
+        """
+        Export parsed data for vector database.
+
+        Event IDs come from the event sheet and a hash of the event text
+        (see `event_key`), so inserting or removing an event does not
+        shift the keys of the others; identical events of one sheet get
+        a "~<n>" suffix.
+        """
         documents = []
 
         for project in self.projects:
@@ -326,9 +344,12 @@ class ProjectParser:
             documents.append(doc)
 
             # Create event documents
-            for i, event in enumerate(project.get("events", [])):
+            seen: Dict[str, int] = {}
+            for event in project.get("events", []):
+                key = self.event_key(project["name"], event)
+                seen[key] = seen.get(key, 0) + 1
                 event_doc = {
-                    "id": f"event_{project['name']}_{i}",
+                    "id": key if seen[key] == 1 else f"{key}~{seen[key]}",
                     "type": "event",
                     "text": event.natural_text,
                     "metadata": {
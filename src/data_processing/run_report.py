@@ -0,0 +1,241 @@
+"""
+Indexing Run Report for Construct 3 RAG
+Per-stage timers, throughput, chunk-length histogram and peak memory
+
+Stages:
+    parse      markdown/CSV/project/schema parsing (per collection)
+    tokenize   tokenizer pass used for token-budget batching
+    forward    model forward pass (incl. worker processes, wall time only)
+    upsert     Qdrant writes
+
+Wall time is measured with perf_counter, CPU time with thread_time (the
+calling thread only, so pipeline stages running in parallel threads are
+not double counted). CPU spent in embedding worker processes shows up in
+`peak_rss_children_mb` / the forward wall time, not in stage CPU time.
+
+Reports are written as JSON to INDEX_STATE_DIR/reports/ so runs can be
+compared over time.
+"""
+import sys
+import json
+import time
+import threading
+import platform
+from pathlib import Path
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+STAGES = ("parse", "tokenize", "forward", "upsert")
+# 分块长度直方图的桶上界 (token 或字符)
+HISTOGRAM_BOUNDS = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+def _peak_rss_mb(who) -> Optional[float]:
+    if resource is None:
+        return None
+    rss = resource.getrusage(who).ru_maxrss
+    # Linux 单位为 KB, macOS 为 bytes
+    return rss / 1024 ** 2 if sys.platform == "darwin" else rss / 1024
+
+
+def length_histogram(lengths: List[int], bounds=HISTOGRAM_BOUNDS) -> Dict[str, int]:
+    """Bucket lengths into "<=64", "<=128", ..., ">8192" """
+    histogram = {f"<={b}": 0 for b in bounds}
+    histogram[f">{bounds[-1]}"] = 0
+    for length in lengths:
+        for b in bounds:
+            if length <= b:
+                histogram[f"<={b}"] += 1
+                break
+        else:
+            histogram[f">{bounds[-1]}"] += 1
+    return histogram
+
+
+class _Timer:
+    __slots__ = ("wall", "cpu", "calls")
+
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.calls = 0
+
+
+class RunProfiler:
+    """
+    Collects timings for one indexing run (thread-safe).
+
+    Example:
+        >>> profiler = RunProfiler()
+        >>> with profiler.collection("c3_plugins"):
+        ...     with profiler.stage("upsert"):
+        ...         client.upsert(...)
+        >>> profiler.print_summary()
+        >>> profiler.write()
+    """
+
+    def __init__(self, run_info: Optional[Dict[str, Any]] = None):
+        self.run_info = dict(run_info or {})
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.wall_seconds = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # collection -> stage -> timer
+        self._timers: Dict[str, Dict[str, _Timer]] = {}
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._token_lengths: Dict[str, List[int]] = {}
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def collection(self, name: str):
+        """Attribute stages recorded by this thread to a collection"""
+        previous = getattr(self._local, "collection", None)
+        self._local.collection = name
+        try:
+            yield
+        finally:
+            self._local.collection = previous
+
+    @contextmanager
+    def stage(self, name: str, collection: Optional[str] = None):
+        """Time a block as `name` (for the current or given collection)"""
+        collection = collection or getattr(self._local, "collection", None) or "_run"
+        wall0, cpu0 = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall0, time.thread_time() - cpu0
+            with self._lock:
+                timer = self._timers.setdefault(collection, {}).setdefault(name, _Timer())
+                timer.wall += wall
+                timer.cpu += cpu
+                timer.calls += 1
+
+    def record_documents(self, collection: str, docs: List[Dict[str, Any]], embedded: int):
+        """Record the documents of a collection and how many needed embedding"""
+        with self._lock:
+            self._docs[collection] = {
+                "documents": len(docs),
+                "embedded": embedded,
+                "chars": sum(len(doc["text"]) for doc in docs),
+                "char_histogram": length_histogram([len(doc["text"]) for doc in docs]),
+            }
+
+    def record_token_lengths(self, lengths: List[int]):
+        """Record token lengths of embedded texts (current collection)"""
+        collection = getattr(self._local, "collection", None) or "_run"
+        with self._lock:
+            self._token_lengths.setdefault(collection, []).extend(lengths)
+
+    def timed_iter(self, iterable, stage: str = "parse"):
+        """Wrap a (collection, docs) generator, timing each step as `stage`"""
+        iterator = iter(iterable)
+        while True:
+            wall0, cpu0 = time.perf_counter(), time.thread_time()
+            try:
+                collection, docs = next(iterator)
+            except StopIteration:
+                return
+            wall, cpu = time.perf_counter() - wall0, time.thread_time() - cpu0
+            with self._lock:
+                timer = self._timers.setdefault(collection, {}).setdefault(stage, _Timer())
+                timer.wall += wall
+                timer.cpu += cpu
+                timer.calls += 1
+            yield collection, docs
+
+    # ------------------------------------------------------------------
+    # Report
+    # ------------------------------------------------------------------
+
+    def finish(self):
+        self.wall_seconds = time.perf_counter() - self._t0
+
+    def report(self) -> Dict[str, Any]:
+        """Build the JSON-serializable report"""
+        if not self.wall_seconds:
+            self.finish()
+
+        collections = {}
+        totals: Dict[str, _Timer] = {s: _Timer() for s in STAGES}
+        names = [c for c in list(self._docs) + list(self._timers) if c != "_run"]
+        for collection in dict.fromkeys(names):
+            timers = self._timers.get(collection, {})
+            docs = self._docs.get(collection, {})
+            tokens = self._token_lengths.get(collection, [])
+            embed_seconds = sum(timers[s].wall for s in ("tokenize", "forward") if s in timers)
+
+            stages = {}
+            for name, timer in timers.items():
+                stages[name] = {"wall_seconds": timer.wall, "cpu_seconds": timer.cpu, "calls": timer.calls}
+                total = totals.setdefault(name, _Timer())
+                total.wall += timer.wall
+                total.cpu += timer.cpu
+                total.calls += timer.calls
+
+            embedded = docs.get("embedded", 0)
+            collections[collection] = {
+                **{k: v for k, v in docs.items() if k != "char_histogram"},
+                "tokens": sum(tokens) if tokens else None,
+                "docs_per_sec": embedded / embed_seconds if embed_seconds else None,
+                "tokens_per_sec": sum(tokens) / embed_seconds if tokens and embed_seconds else None,
+                "stages": stages,
+                "char_histogram": docs.get("char_histogram"),
+                "token_histogram": length_histogram(tokens) if tokens else None,
+            }
+
+        return {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "wall_seconds": self.wall_seconds,
+            "run": self.run_info,
+            "host": {"platform": platform.platform(), "python": platform.python_version()},
+            "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+            "peak_rss_children_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+            "stages": {
+                name: {"wall_seconds": t.wall, "cpu_seconds": t.cpu, "calls": t.calls}
+                for name, t in totals.items()
+            },
+            "collections": collections,
+        }
+
+    def write(self, path: Optional[Path] = None) -> Path:
+        """Write the report as JSON (default: INDEX_STATE_DIR/reports/run-<timestamp>.json)"""
+        if path is None:
+            from src.config import INDEX_STATE_DIR
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+            path = INDEX_STATE_DIR / "reports" / f"run-{stamp}.json"
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.report(), ensure_ascii=False, indent=2), encoding="utf-8")
+        return path
+
+    def print_summary(self):
+        """Print a short per-collection table"""
+        report = self.report()
+
+        def wall(stages: Dict[str, Any], name: str) -> float:
+            return stages.get(name, {}).get("wall_seconds", 0.0)
+
+        print(f"\n=== Run Report (wall {report['wall_seconds']:.1f}s) ===")
+        print(f"  {'collection':<14} {'docs':>6} {'embed':>6} {'parse':>7} {'token':>7} "
+              f"{'forward':>8} {'upsert':>7} {'docs/s':>7} {'tok/s':>8}")
+        for name, c in report["collections"].items():
+            s = c["stages"]
+            docs_per_sec = f"{c['docs_per_sec']:.1f}" if c["docs_per_sec"] else "-"
+            tokens_per_sec = f"{c['tokens_per_sec']:.0f}" if c["tokens_per_sec"] else "-"
+            print(f"  {name:<14} {c.get('documents', 0):>6} {c.get('embedded', 0):>6} "
+                  f"{wall(s, 'parse'):>6.1f}s {wall(s, 'tokenize'):>6.1f}s {wall(s, 'forward'):>7.1f}s "
+                  f"{wall(s, 'upsert'):>6.1f}s {docs_per_sec:>7} {tokens_per_sec:>8}")
+        if report["peak_rss_mb"] is not None:
+            print(f"  Peak RSS: {report['peak_rss_mb']:.0f} MB"
+                  f" (workers: {report['peak_rss_children_mb']:.0f} MB)")
@@ -78,7 +78,7 @@ class SchemaParser:
         # 解析 plugins
         plugins_dir = self.schema_dir / "plugins"
         if plugins_dir.exists():
-            for json_file in plugins_dir.glob("*.json"):
+            for json_file in sorted(plugins_dir.glob("*.json")):
                 if json_file.name == "index.json":
                     continue
                 plugin_data = self._read_json(json_file)
@@ -87,7 +87,7 @@ class SchemaParser:
         # 解析 behaviors
         behaviors_dir = self.schema_dir / "behaviors"
         if behaviors_dir.exists():
-            for json_file in behaviors_dir.glob("*.json"):
+            for json_file in sorted(behaviors_dir.glob("*.json")):
                 if json_file.name == "index.json":
                     continue
                 behavior_data = self._read_json(json_file)
@@ -172,7 +172,7 @@ class SchemaParser:
         if not effects_dir.exists():
             return entries
 
-        for json_file in effects_dir.glob("*.json"):
+        for json_file in sorted(effects_dir.glob("*.json")):
             if json_file.name == "index.json":
                 continue
             data = self._read_json(json_file)
@@ -198,7 +198,7 @@ class SchemaParser:
             if not type_dir.exists():
                 continue
 
-            for json_file in type_dir.glob("*.json"):
+            for json_file in sorted(type_dir.glob("*.json")):
                 if json_file.name == "index.json":
                     continue
                 data = self._read_json(json_file)
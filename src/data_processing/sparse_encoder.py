@@ -0,0 +1,113 @@
+"""
+Sparse Lexical Encoder for Construct 3 RAG
+bge-m3 dense + lexical weights from a single forward pass
+
+bge-m3 can emit, next to its dense embedding, a weight per input token
+(the "lexical" / sparse output). Indexed as a Qdrant sparse vector it
+acts like a learned BM25: exact identifiers such as `set-instvar-value`
+or `Sprite.AnimationFrame` match on their tokens even when the dense
+vector ranks them low. Collections store it as the named vector
+SPARSE_VECTOR_NAME next to the unnamed dense vector.
+
+BGEM3Encoder loads the model once and returns both outputs of the same
+forward pass. It exposes the SentenceTransformer subset EmbeddingModel
+uses (`encode`, `tokenizer`, `max_seq_length`,
+`get_sentence_embedding_dimension`), so EmbeddingModel(sparse=True)
+loads it in place of SentenceTransformer instead of next to it.
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from FlagEmbedding import BGEM3FlagModel
+except ImportError:
+    BGEM3FlagModel = None
+
+try:
+    from qdrant_client.http import models
+except ImportError:
+    print("Warning: qdrant-client not installed. Run: pip install qdrant-client")
+
+
+SPARSE_VECTOR_NAME = "sparse"
+
+
+def to_sparse_vector(weights) -> "models.SparseVector":
+    """{token_id: weight} -> SparseVector (token ids as indices)"""
+    items = sorted((int(token_id), float(weight)) for token_id, weight in weights.items() if weight > 0)
+    return models.SparseVector(
+        indices=[token_id for token_id, _ in items],
+        values=[weight for _, weight in items]
+    )
+
+
+class BGEM3Encoder:
+    """
+    bge-m3 encoder returning dense and sparse vectors of one forward pass.
+
+    Example:
+        >>> encoder = BGEM3Encoder("BAAI/bge-m3")
+        >>> dense, sparse = encoder.encode_with_sparse(["Sprite.AnimationFrame"])
+        >>> dense.shape, sparse[0]   # (1, 1024), models.SparseVector
+    """
+
+    def __init__(self, model_name: str = "BAAI/bge-m3", device: str = "cpu", batch_size: int = 8):
+        """
+        Args:
+            model_name: bge-m3 compatible model (must have a sparse head)
+            device: Device for the model
+            batch_size: Default encode batch size
+        """
+        if BGEM3FlagModel is None:
+            raise ImportError("FlagEmbedding not installed. Run: pip install FlagEmbedding")
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+        self.model = BGEM3FlagModel(model_name, use_fp16=device != "cpu")
+        self._dimension: Optional[int] = None
+
+    @property
+    def tokenizer(self):
+        return self.model.tokenizer
+
+    @property
+    def max_seq_length(self) -> int:
+        # 与 encode() 的截断长度一致 (bge-m3: 8192)
+        return min(self.model.tokenizer.model_max_length, 8192)
+
+    def _encode(self, texts: List[str], batch_size: Optional[int], sparse: bool):
+        return self.model.encode(
+            texts,
+            batch_size=batch_size or self.batch_size,
+            max_length=self.max_seq_length,
+            return_dense=True,
+            return_sparse=sparse,
+            return_colbert_vecs=False,
+        )
+
+    def encode(
+        self,
+        texts: List[str],
+        show_progress_bar: bool = False,
+        batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        """Dense vectors only (SentenceTransformer-compatible signature)"""
+        return np.asarray(self._encode(texts, batch_size, sparse=False)["dense_vecs"], dtype=np.float32).reshape(len(texts), -1)
+
+    def encode_with_sparse(
+        self,
+        texts: List[str],
+        batch_size: Optional[int] = None
+    ) -> Tuple[np.ndarray, List["models.SparseVector"]]:
+        """Dense matrix and sparse vectors of the same forward pass"""
+        if not texts:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32), []
+        output = self._encode(texts, batch_size, sparse=True)
+        dense = np.asarray(output["dense_vecs"], dtype=np.float32).reshape(len(texts), -1)
+        return dense, [to_sparse_vector(weights) for weights in output["lexical_weights"]]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self._dimension is None:
+            self._dimension = int(self.encode(["dimension probe"]).shape[1])
+        return self._dimension
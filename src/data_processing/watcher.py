@@ -0,0 +1,459 @@
+"""
+Index Watcher for Construct 3 RAG
+Keep the live index in sync with the manual / example project checkouts
+
+A long-running daemon that watches the sibling git checkouts
+(Construct3-Manual, Construct-Example-Projects). Once the tree has been
+quiet for `debounce` seconds (e.g. a `git pull` finished), only the
+markdown files / project folders that changed are reparsed. Their chunks
+are diffed against the content-hash manifest: new or changed chunks are
+embedded and upserted, vanished ones deleted, in place on the live
+collections, so the retriever keeps serving throughout. The BM25 index
+of every touched collection is rebuilt from its live points before the
+index generation is bumped.
+
+Change detection uses watchdog (inotify / FSEvents) when installed and
+falls back to polling mtime + size. The last seen file state is saved in
+INDEX_STATE_DIR, so changes made while the watcher was down are picked
+up when it starts.
+
+Note:
+    Near-duplicate collapsing (DEDUP_THRESHOLD) is only done by full runs.
+    When a file that shared a collapsed chunk changes, the other files of
+    that cluster are reparsed too and indexed as they are; the next
+    `indexer --incremental` collapses them again.
+
+用法:
+  python -m src.data_processing.watcher
+  python -m src.data_processing.watcher --interval 5 --debounce 10
+  python -m src.data_processing.watcher --once     # 处理上次运行以来的变更后退出
+"""
+import re
+import json
+import time
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+try:
+    from qdrant_client.http import models
+except ImportError:
+    print("Warning: qdrant-client not installed. Run: pip install qdrant-client")
+
+
+STATE_FILENAME = "watch_state.json"
+
+# 变更单位: ("md", "plugin-reference/sprite.md") 或 ("project", "platformer")
+Change = Tuple[str, str]
+
+
+def _stat(path: Path) -> List[int]:
+    st = path.stat()
+    return [st.st_mtime_ns, st.st_size]
+
+
+def scan_manual(manual_dir: Path) -> Dict[str, List[int]]:
+    """{relative .md path: [mtime_ns, size]}"""
+    if not manual_dir.exists():
+        return {}
+    return {p.relative_to(manual_dir).as_posix(): _stat(p) for p in sorted(manual_dir.rglob("*.md"))}
+
+
+def scan_projects(projects_dir: Path) -> Dict[str, List[int]]:
+    """{"<project>/<file>": [mtime_ns, size]} for the files ProjectParser reads"""
+    if not projects_dir.exists():
+        return {}
+    files = {}
+    for project_dir in sorted(d for d in projects_dir.iterdir() if d.is_dir()):
+        for path in sorted(project_dir.glob("*.c3proj")) + sorted(project_dir.glob("eventSheets/*.json")):
+            files[path.relative_to(projects_dir).as_posix()] = _stat(path)
+    return files
+
+
+def diff_snapshots(old: Dict[str, Dict[str, List[int]]], new: Dict[str, Dict[str, List[int]]]) -> Set[Change]:
+    """Changed markdown files and project folders between two scans"""
+    changes: Set[Change] = set()
+    for kind in ("md", "project"):
+        before, after = old.get(kind, {}), new.get(kind, {})
+        for key in set(before) | set(after):
+            if before.get(key) != after.get(key):
+                changes.add((kind, key if kind == "md" else key.split("/", 1)[0]))
+    return changes
+
+
+class _WakeupHandler(FileSystemEventHandler):
+    """watchdog handler: any event just wakes the scan loop"""
+
+    def __init__(self, wakeup: threading.Event):
+        super().__init__()
+        self.wakeup = wakeup
+
+    def on_any_event(self, event):
+        if "/.git/" not in event.src_path.replace("\\", "/"):
+            self.wakeup.set()
+
+
+class IndexWatcher:
+    """
+    Reindex changed markdown files / example projects into the live collections.
+
+    Example:
+        >>> watcher = IndexWatcher(indexer)
+        >>> watcher.reindex({("md", "plugin-reference/sprite.md")})
+        >>> watcher.run(interval=2, debounce=5)    # blocks
+    """
+
+    def __init__(
+        self,
+        indexer,
+        manifest=None,
+        manual_dir: Optional[Path] = None,
+        projects_dir: Optional[Path] = None,
+        state_path: Optional[Path] = None,
+        unified: Optional[bool] = None,
+        bm25_dir: Optional[Path] = None
+    ):
+        """
+        Args:
+            indexer: Indexer writing to the live collections
+            manifest: Content-hash manifest (default: IndexManifest.load())
+            manual_dir: Construct3-Manual docs directory (default: MarkdownParser's)
+            projects_dir: Example projects directory (default: EXAMPLE_PROJECTS_DIR)
+            state_path: Saved file state (default: INDEX_STATE_DIR/watch_state.json)
+            unified: Mirror updates into UNIFIED_COLLECTION (default: UNIFIED_COLLECTION_MODE)
+            bm25_dir: BM25 indexes rebuilt after updates (default: BM25_DIR)
+        """
+        from src.config import (
+            EMBEDDING_MODEL, EXAMPLE_PROJECTS_DIR, INDEX_STATE_DIR, UNIFIED_COLLECTION_MODE, BM25_DIR,
+        )
+        from src.data_processing.index_state import IndexManifest
+        from src.data_processing.markdown_parser import MarkdownParser, load_token_counter
+
+        self.indexer = indexer
+        self.manifest = manifest or IndexManifest.load()
+        # 与全量索引相同的切分方式，保证 chunk key 一致
+        self.md_parser = MarkdownParser(base_dir=manual_dir, token_counter=load_token_counter(EMBEDDING_MODEL))
+        self.manual_dir = self.md_parser.base_dir
+        self.projects_dir = Path(projects_dir or EXAMPLE_PROJECTS_DIR)
+        self.state_path = Path(state_path or INDEX_STATE_DIR / STATE_FILENAME)
+        self.unified = UNIFIED_COLLECTION_MODE if unified is None else unified
+        self.bm25_dir = Path(bm25_dir or BM25_DIR)
+        self.model_id = indexer.embedder.model_id
+
+    # ------------------------------------------------------------------
+    # File state
+    # ------------------------------------------------------------------
+
+    def scan(self) -> Dict[str, Dict[str, List[int]]]:
+        return {"md": scan_manual(self.manual_dir), "project": scan_projects(self.projects_dir)}
+
+    def load_state(self) -> Optional[Dict[str, Dict[str, List[int]]]]:
+        if not self.state_path.exists():
+            return None
+        try:
+            return json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None
+
+    def save_state(self, state: Dict[str, Dict[str, List[int]]]):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(state), encoding="utf-8")
+        tmp_path.replace(self.state_path)
+
+    # ------------------------------------------------------------------
+    # Reindexing
+    # ------------------------------------------------------------------
+
+    def _cluster_sources(self, collections: List[str], field: str, value: str) -> Set[str]:
+        """Other sources collapsed into the points of `value` (payload "sources")"""
+        sources: Set[str] = set()
+        for collection in collections:
+            try:
+                points, _ = self.indexer.client.scroll(
+                    collection_name=collection,
+                    scroll_filter=models.Filter(must=[
+                        models.FieldCondition(key=field, match=models.MatchValue(value=value))
+                    ]),
+                    limit=1000,
+                    with_payload=["sources"],
+                )
+            except Exception:
+                continue
+            for point in points:
+                sources.update((point.payload or {}).get("sources", []))
+        return sources
+
+    def _markdown_updates(self, files: Set[str]) -> Dict[str, Tuple[List[Dict[str, Any]], List[str]]]:
+        """{collection: (current docs of the files, manifest keys the files had)}"""
+        from src.collections import DOC_COLLECTIONS
+        from src.data_processing.indexer import markdown_documents, _unique_ids
+
+        files = set(files)
+        for source in list(files):
+            files |= self._cluster_sources(DOC_COLLECTIONS, "source", source)
+
+        updates: Dict[str, Tuple[List[Dict[str, Any]], List[str]]] = {c: ([], []) for c in DOC_COLLECTIONS}
+        for source in sorted(files):
+            path = self.manual_dir / source
+            chunks = self.md_parser.parse_file(path) if path.exists() else []
+            for collection in DOC_COLLECTIONS:
+                docs, old_keys = updates[collection]
+                # chunk key = "<source>#<H2>[#p<n>][~<n>]"
+                prefix = f"{source}#"
+                old_keys.extend(k for k in self.manifest.get_chunks(collection, self.model_id) if k.startswith(prefix))
+                docs.extend(_unique_ids(markdown_documents(
+                    [c for c in chunks if c.metadata.get("collection") == collection]
+                )))
+        return {c: update for c, update in updates.items() if update[0] or update[1]}
+
+    def _project_updates(self, projects: Set[str]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """(current docs of the projects, manifest keys the projects had)"""
+        from src.collections import COLLECTIONS
+        from src.data_processing.indexer import _unique_ids
+        from src.data_processing.project_parser import ProjectParser
+
+        collection = COLLECTIONS["examples"]
+        projects = set(projects)
+        for project in list(projects):
+            # sources: "<project>/<event sheet>"
+            projects |= {s.split("/", 1)[0] for s in self._cluster_sources([collection], "project", project)}
+
+        parser = ProjectParser()
+        indexed = self.manifest.get_chunks(collection, self.model_id)
+        old_keys: List[str] = []
+        for project in sorted(projects):
+            project_dir = self.projects_dir / project
+            data = parser.parse_project_dir(project_dir) if project_dir.is_dir() else None
+            if data:
+                parser.projects.append(data)
+            # project_<name> / event_<name>/<sheet>#<hash>; event_<name>_<i> 为旧版按位置编号的 key
+            name = re.escape(project)
+            pattern = re.compile(rf"(project_{name}|event_{name}/.+#[0-9a-f]{{12}}|event_{name}_\d+)(~\d+)?")
+            old_keys.extend(k for k in indexed if pattern.fullmatch(k))
+        return _unique_ids(parser.export_for_vectordb()), old_keys
+
+    def _apply(self, collection: str, docs: List[Dict[str, Any]], old_keys: List[str], batch_size: int = 100):
+        """Embed/upsert changed docs, delete vanished keys, record both in the manifest"""
+        from src.collections import UNIFIED_COLLECTION
+        from src.data_processing.index_state import content_hash
+
+        entry = self.manifest.collections.get(collection)
+        if entry and entry.get("model") != self.model_id:
+            print(f"  Skipping {collection}: indexed with {entry.get('model')}, run --rebuild first")
+            return 0, 0
+
+        indexed = self.manifest.get_chunks(collection, self.model_id)
+        changed = [doc for doc in docs if indexed.get(doc["id"]) != content_hash(doc)]
+        current = {doc["id"] for doc in docs}
+        removed = sorted({key for key in old_keys if key not in current})
+        if not changed and not removed:
+            return 0, 0
+        unified = self.unified and self.indexer.collection_exists(UNIFIED_COLLECTION)
+
+        for i in range(0, len(changed), batch_size):
+            points = self.indexer.embed_points(changed[i:i + batch_size])
+            self.indexer.client.upsert(collection_name=collection, points=points)
+            if unified:
+                self.indexer.client.upsert(collection_name=UNIFIED_COLLECTION, points=[
+                    models.PointStruct(
+                        id=self.indexer._point_id(f"{collection}:{p.id}"),
+                        vector=p.vector,
+                        payload={**p.payload, "collection": collection},
+                    )
+                    for p in points
+                ])
+        if removed:
+            self.indexer.delete_documents(collection, removed)
+            if unified:
+                self.indexer.client.delete(
+                    collection_name=UNIFIED_COLLECTION,
+                    points_selector=models.PointIdsList(points=[
+                        self.indexer._point_id(f"{collection}:{self.indexer._point_id(key)}") for key in removed
+                    ])
+                )
+
+        self.manifest.apply(collection, changed, removed, self.model_id)
+        print(f"  {collection}: {len(changed)} upserted, {len(removed)} deleted")
+        return len(changed), len(removed)
+
+    def _rebuild_keyword_index(self, collection: str, batch_size: int = 1000):
+        """Rebuild the BM25 index of a collection from the texts of its live points"""
+        from src.data_processing.bm25 import build_collection_index
+
+        texts: List[str] = []
+        point_ids: List[int] = []
+        offset = None
+        while True:
+            points, offset = self.indexer.client.scroll(
+                collection_name=collection,
+                limit=batch_size,
+                offset=offset,
+                with_payload=["text"],
+            )
+            for point in points:
+                texts.append((point.payload or {}).get("text", ""))
+                point_ids.append(point.id)
+            if offset is None:
+                break
+        build_collection_index(collection, texts, point_ids, base_dir=self.bm25_dir)
+
+    def reindex(self, changes: Set[Change]) -> Dict[str, int]:
+        """
+        Reparse changed files / projects and update their points.
+
+        Returns:
+            {"upserted": n, "deleted": n}
+        """
+        from src.collections import COLLECTIONS
+        from src.data_processing.index_state import IndexGeneration
+
+        files = {key for kind, key in changes if kind == "md"}
+        projects = {key for kind, key in changes if kind == "project"}
+        print(f"\n=== Reindexing {len(files)} files, {len(projects)} projects ===")
+
+        updates = self._markdown_updates(files) if files else {}
+        if projects:
+            updates[COLLECTIONS["examples"]] = self._project_updates(projects)
+
+        stats = {"upserted": 0, "deleted": 0}
+        for collection, (docs, old_keys) in updates.items():
+            if not self.indexer.collection_exists(collection):
+                print(f"  Skipping {collection}: not indexed yet")
+                continue
+            upserted, deleted = self._apply(collection, docs, old_keys)
+            if upserted or deleted:
+                # BM25 先于 generation 变化写入，检索端重新加载时读到的是新索引
+                self._rebuild_keyword_index(collection)
+            stats["upserted"] += upserted
+            stats["deleted"] += deleted
+        self.manifest.save()
+        if stats["upserted"] or stats["deleted"]:
+            IndexGeneration().bump(f"watcher: {len(files)} files, {len(projects)} projects")
+        if self.indexer.embedder.cache is not None:
+            self.indexer.embedder.cache.flush()
+        return stats
+
+    # ------------------------------------------------------------------
+    # Daemon loop
+    # ------------------------------------------------------------------
+
+    def wait_until_settled(
+        self,
+        current: Dict[str, Dict[str, List[int]]],
+        interval: float,
+        debounce: float
+    ) -> Dict[str, Dict[str, List[int]]]:
+        """Rescan until the file state has not changed for `debounce` seconds; returns that state"""
+        # 防抖: git pull 会连续写入很多文件，全部写完后再处理
+        settled_at = time.monotonic()
+        while time.monotonic() - settled_at < debounce:
+            time.sleep(min(interval, debounce))
+            latest = self.scan()
+            if latest != current:
+                current, settled_at = latest, time.monotonic()
+        return current
+
+    def run(self, interval: float = 2.0, debounce: float = 5.0, once: bool = False):
+        """
+        Watch and reindex until interrupted.
+
+        Args:
+            interval: Polling interval in seconds (with watchdog: fallback rescan)
+            debounce: Quiet period after the last change before reindexing
+            once: Process changes since the last run, then return
+        """
+        state = self.load_state()
+        current = self.scan()
+        if state is None:
+            # 首次运行: 以当前文件状态为基线 (需先完成一次全量索引)
+            print(f"No watch state yet, using current files as baseline ({len(current['md'])} pages, "
+                  f"{len({k.split('/', 1)[0] for k in current['project']})} projects)")
+            self.save_state(current)
+            state = current
+        if once:
+            changes = diff_snapshots(state, current)
+            if changes:
+                print(self.reindex(changes))
+            self.save_state(current)
+            return
+
+        wakeup = threading.Event()
+        observer = None
+        if Observer is not None:
+            observer = Observer()
+            handler = _WakeupHandler(wakeup)
+            for directory in (self.manual_dir, self.projects_dir):
+                if directory.exists():
+                    observer.schedule(handler, str(directory), recursive=True)
+            observer.start()
+        print(f"Watching {self.manual_dir} and {self.projects_dir} "
+              f"({'watchdog' if observer else f'polling every {interval}s'}, debounce {debounce}s)")
+
+        try:
+            while True:
+                if observer is not None:
+                    wakeup.wait(timeout=max(interval, 60))
+                else:
+                    time.sleep(interval)
+                wakeup.clear()
+
+                current = self.scan()
+                if not diff_snapshots(state, current):
+                    continue
+
+                current = self.wait_until_settled(current, interval, debounce)
+                changes = diff_snapshots(state, current)
+                try:
+                    stats = self.reindex(changes)
+                    print(f"  Done: {stats['upserted']} upserted, {stats['deleted']} deleted")
+                    state = current
+                    self.save_state(state)
+                except Exception as e:
+                    # 保留旧状态，下次扫描重试
+                    print(f"  Reindex failed, will retry: {e}")
+        except KeyboardInterrupt:
+            print("\nWatcher stopped")
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            self.indexer.embedder.close()
+
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+    from src.config import (
+        QDRANT_HOST, QDRANT_PORT, EMBEDDING_MODEL, EMBEDDING_BACKEND, SPARSE_VECTORS,
+        EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_MAX_ENTRIES,
+    )
+    from src.data_processing.indexer import Indexer, embedding_model_id
+    from src.data_processing.embedding_cache import EmbeddingCache
+
+    parser = argparse.ArgumentParser(description="Reindex changed manual pages / example projects")
+    parser.add_argument("--interval", type=float, default=2.0, help="Polling interval in seconds")
+    parser.add_argument("--debounce", type=float, default=5.0, help="Quiet period before reindexing")
+    parser.add_argument("--once", action="store_true", help="Process changes since the last run and exit")
+    args = parser.parse_args()
+
+    indexer = Indexer(
+        qdrant_host=QDRANT_HOST,
+        qdrant_port=QDRANT_PORT,
+        embedding_model=EMBEDDING_MODEL,
+        embedding_cache=EmbeddingCache(
+            EMBEDDING_CACHE_DIR, embedding_model_id(EMBEDDING_MODEL, EMBEDDING_BACKEND), EMBEDDING_CACHE_MAX_ENTRIES
+        ),
+        embedding_backend=EMBEDDING_BACKEND,
+        sparse_vectors=SPARSE_VECTORS
+    )
+    IndexWatcher(indexer).run(interval=args.interval, debounce=args.debounce, once=args.once)
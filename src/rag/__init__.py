@@ -1,3 +1,4 @@
 # RAG system modules
 from .retriever import HybridRetriever
+from .async_retriever import AsyncHybridRetriever
 from .chain import RAGChain
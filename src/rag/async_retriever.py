@@ -0,0 +1,224 @@
+"""
+Async Hybrid Retriever for Construct 3 RAG
+Concurrent collection fan-out on the async Qdrant client
+
+HybridRetriever sends the per-collection query batches one after the
+other, so wall time is the sum of the round trips. AsyncHybridRetriever
+sends them concurrently:
+
+- at most SEARCH_CONCURRENCY collection requests in flight (semaphore)
+- every collection request is bounded by SEARCH_TIMEOUT
+- a collection that times out or fails contributes no results; the
+  others are still reranked (partial results, logged)
+
+Planning, routing, search params and reranking are the ones of
+HybridRetriever; embedding runs in a worker thread so the event loop
+stays responsive. `search_all` / `search_all_with_rerank` keep their
+synchronous signatures as thin wrappers that run the async versions on
+a background event loop, so RAGChain can use this class unchanged.
+
+用法:
+    retriever = AsyncHybridRetriever()
+    results = await retriever.asearch_all_with_rerank("如何让角色跳跃")
+    # 同步代码中 (接口与 HybridRetriever 相同)
+    results = retriever.search_all_with_rerank("如何让角色跳跃")
+"""
+import time
+import asyncio
+import logging
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+from src.rag.retriever import HybridRetriever, SearchRequest, SearchResult
+
+logger = logging.getLogger(__name__)
+
+try:
+    from qdrant_client import AsyncQdrantClient
+except ImportError:
+    AsyncQdrantClient = None
+
+
+class AsyncHybridRetriever(HybridRetriever):
+    """HybridRetriever with concurrent, time-bounded collection searches"""
+
+    def __init__(
+        self,
+        qdrant_host: str = "localhost",
+        qdrant_port: int = 6333,
+        embedding_model_name: str = "BAAI/bge-m3",
+        embedding_backend: Optional[str] = None,
+        unified: Optional[bool] = None,
+        keyword: Optional[bool] = None,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None
+    ):
+        """
+        Args:
+            max_concurrency: Collection requests in flight (default: SEARCH_CONCURRENCY)
+            timeout: Seconds per collection request (default: SEARCH_TIMEOUT)
+        """
+        from src.config import SEARCH_CONCURRENCY, SEARCH_TIMEOUT
+
+        super().__init__(qdrant_host, qdrant_port, embedding_model_name, embedding_backend, unified, keyword)
+        if AsyncQdrantClient is None:
+            raise ImportError("AsyncQdrantClient requires qdrant-client>=1.6")
+        self.qdrant_host = qdrant_host
+        self.qdrant_port = qdrant_port
+        self.max_concurrency = max_concurrency or SEARCH_CONCURRENCY
+        self.timeout = SEARCH_TIMEOUT if timeout is None else timeout
+        self._async_clients: Dict[asyncio.AbstractEventLoop, "AsyncQdrantClient"] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None  # 同步包装使用的后台事件循环
+        self._loop_lock = threading.Lock()
+
+    @property
+    def async_client(self) -> "AsyncQdrantClient":
+        """Async client of the running event loop (its connections are bound to that loop)"""
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_clients:
+            self._async_clients[loop] = AsyncQdrantClient(host=self.qdrant_host, port=self.qdrant_port)
+        return self._async_clients[loop]
+
+    def _run(self, coro):
+        """Run a coroutine on the background loop and wait for its result"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="async-retriever", daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _query_batch(
+        self,
+        semaphore: asyncio.Semaphore,
+        target: str,
+        query_requests: list
+    ) -> Optional[list]:
+        """One collection batch; None on timeout or error"""
+        async with semaphore:
+            t0 = time.perf_counter()
+            try:
+                return await asyncio.wait_for(
+                    self.async_client.query_batch_points(collection_name=target, requests=query_requests),
+                    timeout=self.timeout
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"[检索] {target} 超时 ({self.timeout:.1f}s)，跳过")
+            except Exception as e:
+                logger.warning(f"[检索] {target} 批量查询失败: {e}")
+            finally:
+                logger.debug(f"[检索] {target}: {(time.perf_counter() - t0) * 1000:.0f}ms")
+        return None
+
+    async def execute_plan_async(
+        self,
+        requests: List[SearchRequest],
+        oversampling: Optional[float] = None,
+        rescore: Optional[bool] = None
+    ) -> Tuple[List[List[SearchResult]], List[str]]:
+        """
+        Async `execute_plan`: all collection batches run concurrently.
+
+        Returns:
+            (results per request in request order, collections that timed
+            out or failed and therefore returned nothing)
+        """
+        # 嵌入与集合元数据查询 (同步客户端，已缓存) 放到线程中执行
+        batches = await asyncio.to_thread(self.build_batches, requests, oversampling, rescore)
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        responses = await asyncio.gather(*[
+            self._query_batch(semaphore, target, query_requests)
+            for target, _, query_requests in batches
+        ])
+
+        results: List[List[SearchResult]] = [[] for _ in range(2 * len(requests))]
+        missing: List[str] = []
+        for (target, slots, query_requests), batch_responses in zip(batches, responses):
+            if batch_responses is None:
+                missing.extend(dict.fromkeys(requests[i % len(requests)].collection for i in slots))
+                continue
+            self.collect_batch(requests, results, slots, query_requests, batch_responses)
+        return self.fuse_keyword(requests, results), missing
+
+    async def asearch_all(
+        self,
+        query: str,
+        top_k_per_collection: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, List[SearchResult]]:
+        """Async `search_all` (collections that timed out map to empty lists)"""
+        results, _ = await self.execute_plan_async(self.plan_search_all([query], top_k_per_collection, filters))
+        return dict(zip(self.SEARCH_ALL_KEYS, results))
+
+    async def asearch_all_with_rerank(
+        self,
+        query: str,
+        top_k_per_collection: int = 5,
+        final_top_k: int = 10,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[SearchResult]:
+        """
+        Async `search_all_with_rerank` with concurrent collection searches.
+
+        Collections that exceed the timeout are left out of the reranking
+        instead of delaying the whole query.
+        """
+        key, generation, cached = self.cached_results(query, ("rerank", top_k_per_collection, final_top_k), filters)
+        if cached is not None:
+            logger.info(f"[检索] 命中结果缓存 ({len(cached)} 条)")
+            return cached
+
+        logger.info(f"[检索] 开始并发检索 (每 collection top_k={top_k_per_collection}, 并发 {self.max_concurrency})...")
+        t0 = time.time()
+        plan = self.plan_search_all([query], top_k_per_collection, filters)
+        try:
+            results, missing = await self.execute_plan_async(plan)
+        except Exception as e:
+            logger.warning(f"[检索] 失败: {e}")
+            return []
+
+        all_results: List[SearchResult] = []
+        for coll_name, collection_results in zip(self.SEARCH_ALL_KEYS, results):
+            all_results.extend(collection_results)
+            logger.info(f"[检索] {coll_name}: {len(collection_results)} 条")
+        if missing:
+            logger.warning(f"[检索] 部分结果: {', '.join(missing)} 未返回")
+
+        logger.info(f"[检索] 原始结果共 {len(all_results)} 条 ({time.time()-t0:.1f}s)")
+        final_results = self.rerank(all_results, final_top_k)
+        if not missing:
+            # 部分结果不缓存，下次请求重新检索超时的集合
+            self.cache_results(key, generation, final_results)
+        return final_results
+
+    def search_all(
+        self,
+        query: str,
+        top_k_per_collection: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, List[SearchResult]]:
+        """Synchronous wrapper of `asearch_all`"""
+        return self._run(self.asearch_all(query, top_k_per_collection, filters))
+
+    def search_all_with_rerank(
+        self,
+        query: str,
+        top_k_per_collection: int = 5,
+        final_top_k: int = 10,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[SearchResult]:
+        """Synchronous wrapper of `asearch_all_with_rerank`"""
+        return self._run(self.asearch_all_with_rerank(query, top_k_per_collection, final_top_k, filters))
+
+    async def aclose(self):
+        """Close the async client of the running event loop"""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+
+    def close(self):
+        """Close the background loop used by the synchronous wrappers"""
+        if self._loop is not None:
+            self._run(self.aclose())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
@@ -186,7 +186,13 @@ class RAGChain:
         llm_base_url: str = "http://localhost:11434",
         enable_query_rewrite: bool = True
     ):
-        self.retriever = HybridRetriever(qdrant_host, qdrant_port)
+        from src.config import ASYNC_RETRIEVAL
+
+        if ASYNC_RETRIEVAL:
+            from .async_retriever import AsyncHybridRetriever
+            self.retriever = AsyncHybridRetriever(qdrant_host, qdrant_port)
+        else:
+            self.retriever = HybridRetriever(qdrant_host, qdrant_port)
         self.llm = LLMClient(model=llm_model, base_url=llm_base_url)
         self.enable_query_rewrite = enable_query_rewrite
 
@@ -0,0 +1,173 @@
+"""
+Result Cache for Construct 3 RAG
+Memory-bounded LRU of reranked search results, invalidated by index generation
+
+Keys are (normalized query, search parameters, filters). Every entry
+belongs to the index generation it was computed at (IndexGeneration in
+index_state, bumped by the indexer and the watcher); the first lookup
+after a bump drops the whole cache.
+
+The generation is a file in INDEX_STATE_DIR, so a retriever only sees
+bumps if it shares that directory with the indexer (same host or a
+shared volume, also needed for the BM25 indexes). Entries older than
+`ttl` seconds expire regardless, which bounds staleness otherwise.
+
+用法:
+    cache = ResultCache(max_bytes=64 * 1024 ** 2, ttl=300)
+    key = cache.make_key("如何保存游戏", (5, 10), filters=None)
+    results = cache.get(key, generation)
+    if results is None:
+        results = ...
+        cache.put(key, generation, results)
+    cache.hot(10)   # 命中最多的条目
+"""
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+from src.data_processing.embedding_cache import normalize_text
+from src.rag.retriever import SearchResult
+
+# 每条结果的固定开销估计 (对象、dict、字符串头)
+RESULT_OVERHEAD_BYTES = 400
+
+
+def _copy(results: List[SearchResult]) -> List[SearchResult]:
+    """Shallow copies, so callers can modify results without touching the cache"""
+    return [SearchResult(r.text, r.score, r.source, dict(r.metadata)) for r in results]
+
+
+def estimate_size(results: List[SearchResult]) -> int:
+    """Approximate memory of a result list in bytes"""
+    return sum(
+        RESULT_OVERHEAD_BYTES + len(r.text.encode("utf-8")) + len(json.dumps(r.metadata, default=str))
+        for r in results
+    )
+
+
+class ResultCache:
+    """
+    LRU cache of search results bounded by approximate size in bytes.
+
+    Thread-safe. Per entry it tracks hits and last access for `hot()`.
+    Entries older than `ttl` seconds are treated as misses (None = no expiry).
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 ** 2, ttl: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl or None
+        self.generation: Optional[str] = None
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(query: str, params: Tuple, filters: Optional[Any] = None) -> Tuple:
+        """Cache key of a search: normalized query, parameters, canonical filters"""
+        if filters is None:
+            canonical = None
+        elif hasattr(filters, "model_dump_json"):
+            canonical = filters.model_dump_json()  # models.Filter
+        else:
+            canonical = json.dumps(filters, sort_keys=True, ensure_ascii=False, default=str)
+        return normalize_text(query), params, canonical
+
+    def _check_generation(self, generation: str):
+        if generation != self.generation:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self.generation = generation
+
+    def get(self, key: Tuple, generation: str) -> Optional[List[SearchResult]]:
+        """Cached results for `key` at `generation`, None on miss"""
+        with self._lock:
+            self._check_generation(generation)
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.time() - entry["created"] > self.ttl:
+                del self._entries[key]
+                self._bytes -= entry["size"]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            entry["hits"] += 1
+            entry["last_access"] = time.time()
+            self.hits += 1
+            return _copy(entry["results"])
+
+    def put(self, key: Tuple, generation: str, results: List[SearchResult]):
+        """Store results computed at `generation` (after a `get` miss at the same generation)"""
+        size = estimate_size(results)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            # 计算期间索引已更新 (其他线程的 get 已切换到新 generation)
+            if generation != self.generation:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old["size"]
+            now = time.time()
+            self._entries[key] = {
+                "results": _copy(results), "size": size, "hits": 0, "created": now, "last_access": now,
+            }
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted["size"]
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def hot(self, n: int = 10) -> List[Dict[str, Any]]:
+        """The `n` most hit entries (query, params, filters, hits, size, age)"""
+        now = time.time()
+        with self._lock:
+            entries = sorted(self._entries.items(), key=lambda kv: kv[1]["hits"], reverse=True)[:n]
+            return [
+                {
+                    "query": key[0],
+                    "params": key[1],
+                    "filters": key[2],
+                    "hits": entry["hits"],
+                    "results": len(entry["results"]),
+                    "size_bytes": entry["size"],
+                    "age_seconds": now - entry["created"],
+                }
+                for key, entry in entries
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "expirations": self.expirations,
+        }
@@ -8,6 +8,9 @@ Features:
 - Adaptive score threshold filtering
 - Query decomposition for complex multi-step workflows
 - Reciprocal Rank Fusion (RRF) for multi-query results
+- Query plans: each distinct query embedded once, one batched request per collection
+- Query embedding and result caches (results invalidated by index generation)
+- Optional BM25 keyword retrieval fused with vector results via RRF
 """
 import time
 import logging
@@ -20,6 +23,7 @@ logger = logging.getLogger(__name__)
 
 try:
     from qdrant_client import QdrantClient
+    from qdrant_client.http import models
 except ImportError:
     print("Warning: qdrant-client not installed")
 
@@ -33,6 +37,18 @@ class SearchResult:
     metadata: Dict[str, Any]
 
 
+@dataclass
+class SearchRequest:
+    """One collection search of a query plan (see `HybridRetriever.execute_plan`)"""
+    collection: str
+    query: str
+    top_k: int = 5
+    score_threshold: float = 0.5
+    filters: Optional[Dict[str, Any]] = None
+    hybrid: bool = False
+    keyword: bool = False  # RRF-fuse with the collection's BM25 index (see `fuse_keyword`)
+
+
 class HybridRetriever:
     """
     Hybrid retriever combining:
@@ -56,27 +72,147 @@ class HybridRetriever:
     MIN_SCORE_THRESHOLD = 0.3
     HIGH_RELEVANCE_THRESHOLD = 0.7
 
+    # search_all / search_all_with_rerank 检索的集合，及与默认值不同的阈值
+    SEARCH_ALL_KEYS = ["guide", "interface", "project", "plugins", "behaviors", "scripting", "terms", "examples"]
+    COLLECTION_SCORE_THRESHOLDS = {"terms": 0.3}
+
     def __init__(
         self,
         qdrant_host: str = "localhost",
         qdrant_port: int = 6333,
-        embedding_model_name: str = "BAAI/bge-m3"
+        embedding_model_name: str = "BAAI/bge-m3",
+        embedding_backend: Optional[str] = None,
+        unified: Optional[bool] = None,
+        keyword: Optional[bool] = None
     ):
+        """
+        Args:
+            unified: Query the merged UNIFIED_COLLECTION (filtered by the
+                `collection` payload) instead of one collection per search
+                (default: UNIFIED_COLLECTION_MODE)
+            keyword: Fuse BM25 keyword results into `search_all` /
+                `search_all_with_rerank` (default: BM25_FUSION)
+        """
+        from src.config import (
+            EMBEDDING_BACKEND, UNIFIED_COLLECTION_MODE, RESULT_CACHE_MB, RESULT_CACHE_TTL, BM25_FUSION,
+            SPARSE_VECTORS,
+        )
+        from src.data_processing.index_state import IndexGeneration
+        from src.rag.result_cache import ResultCache
+
         self.client = QdrantClient(host=qdrant_host, port=qdrant_port)
         self.embedding_model_name = embedding_model_name
+        self.embedding_backend = embedding_backend or EMBEDDING_BACKEND
+        self.unified = UNIFIED_COLLECTION_MODE if unified is None else unified
+        self.keyword = BM25_FUSION if keyword is None else keyword
+        # 稀疏查询向量与稠密向量同一次 bge-m3 前向 (仅 torch 后端)
+        self.sparse = SPARSE_VECTORS and self.embedding_backend == "torch"
+        self._sparse_collections: Dict[str, bool] = {}  # collection -> has sparse vector
+        self._sparse_generation: Optional[str] = None
+        self._hnsw_profiles: Dict[str, Dict[str, Any]] = {}  # collection -> HNSW profile
+        self._hnsw_generation: Optional[str] = None
         self._embedder = None
         self._qdrant_available = None  # Cache for health check
+        # 结果缓存: 索引器 / watcher 更新索引后 generation 变化，缓存整体失效
+        self.result_cache = (
+            ResultCache(RESULT_CACHE_MB * 1024 ** 2, RESULT_CACHE_TTL) if RESULT_CACHE_MB > 0 else None
+        )
+        self.index_generation = IndexGeneration()
+        self._bm25: Dict[str, Any] = {}  # collection -> BM25Index (None: not built)
+        self._bm25_generation: Optional[str] = None
 
     @property
     def embedder(self):
         if self._embedder is None:
-            logger.info(f"[加载] Embedding 模型: {self.embedding_model_name} ...")
+            logger.info(f"[加载] Embedding 模型: {self.embedding_model_name} ({self.embedding_backend}) ...")
             t0 = time.time()
+            from src.config import QUERY_CACHE_SIZE, QUERY_CACHE_TTL
             from src.data_processing.indexer import EmbeddingModel
-            self._embedder = EmbeddingModel(self.embedding_model_name, device="cpu")
+            from src.data_processing.embedding_cache import QueryEmbeddingCache
+            self._embedder = EmbeddingModel(
+                self.embedding_model_name, device="cpu", backend=self.embedding_backend, sparse=self.sparse,
+                query_cache=QueryEmbeddingCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL) if QUERY_CACHE_SIZE else None
+            )
             logger.info(f"[加载] Embedding 模型完成 ({time.time()-t0:.1f}s)")
         return self._embedder
 
+    def has_sparse_vectors(self, collection_name: str) -> bool:
+        """
+        Whether hybrid search can run on a collection (cached).
+
+        True if the collection was indexed with sparse lexical vectors and
+        this retriever encodes sparse queries (SPARSE_VECTORS). Cached per
+        index generation: a rebuild that adds or drops sparse vectors (or
+        repoints an alias) is picked up after the next index update.
+        """
+        if not self.sparse:
+            return False
+        generation = self.index_generation.current()
+        if generation != self._sparse_generation:
+            self._sparse_collections = {}
+            self._sparse_generation = generation
+        if collection_name not in self._sparse_collections:
+            from src.data_processing.sparse_encoder import SPARSE_VECTOR_NAME
+            try:
+                info = self.client.get_collection(collection_name)
+                sparse = SPARSE_VECTOR_NAME in (info.config.params.sparse_vectors or {})
+            except Exception:
+                return False
+            self._sparse_collections[collection_name] = sparse
+        return self._sparse_collections[collection_name]
+
+    def hnsw_profile(self, collection_name: str) -> Dict[str, Any]:
+        """
+        Search-time HNSW profile of a collection ("auto" resolved by its point count).
+
+        Cached per index generation, so a collection that grows or shrinks
+        past a profile boundary switches profile after the next index update.
+        """
+        generation = self.index_generation.current()
+        if generation != self._hnsw_generation:
+            self._hnsw_profiles = {}
+            self._hnsw_generation = generation
+        if collection_name not in self._hnsw_profiles:
+            from src.data_processing.indexer import collection_hnsw_profile
+            try:
+                points = self.client.get_collection(collection_name).points_count
+            except Exception:
+                return collection_hnsw_profile(collection_name)
+            self._hnsw_profiles[collection_name] = collection_hnsw_profile(collection_name, points)
+        return self._hnsw_profiles[collection_name]
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of the retrieval caches"""
+        stats: Dict[str, Any] = {}
+        if self._embedder is not None and self._embedder.query_cache is not None:
+            stats["query_embeddings"] = self._embedder.query_cache.stats()
+        if self.result_cache is not None:
+            stats["results"] = self.result_cache.stats()
+        return stats
+
+    def cached_results(
+        self,
+        query: str,
+        params: Tuple,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Optional[Tuple], str, Optional[List[SearchResult]]]:
+        """
+        Look up the result cache.
+
+        Returns:
+            (cache key or None if caching is off, index generation, cached
+            results or None); pass key and generation to `cache_results`
+        """
+        generation = self.index_generation.current()
+        if self.result_cache is None:
+            return None, generation, None
+        key = self.result_cache.make_key(query, (*params, self.unified, self.keyword), filters)
+        return key, generation, self.result_cache.get(key, generation)
+
+    def cache_results(self, key: Optional[Tuple], generation: str, results: List[SearchResult]):
+        if key is not None and results:
+            self.result_cache.put(key, generation, results)
+
     def check_health(self) -> Tuple[bool, str]:
         """
         Check if Qdrant vector database is available.
@@ -99,6 +235,23 @@ class HybridRetriever:
             self._qdrant_available = False
             return False, f"Qdrant connection failed: {str(e)}"
 
+    def get_index_versions(self) -> Dict[str, str]:
+        """
+        Get the versioned collection each c3_* alias currently points to.
+
+        Collection names in src.collections are aliases after a blue/green
+        rebuild (see Indexer.publish_version), so every search below reads
+        the live version without knowing its version number.
+
+        Returns:
+            Dict like {"c3_plugins": "c3_plugins__v42"} (empty for legacy layout)
+        """
+        try:
+            return {a.alias_name: a.collection_name for a in self.client.get_aliases().aliases}
+        except Exception as e:
+            logger.warning(f"[检索] 获取 alias 失败: {e}")
+            return {}
+
     def compute_adaptive_threshold(self, results: List[SearchResult]) -> float:
         """
         Compute adaptive score threshold based on result distribution.
@@ -232,100 +385,697 @@ class HybridRetriever:
 
         return fused_results
 
+    @staticmethod
+    def build_filter(filters: Optional[Dict[str, Any]]) -> Optional["models.Filter"]:
+        """
+        Build a Qdrant filter from {field: value} conditions (all must match).
+
+        A list/tuple/set value matches any of its values. A ready-made
+        `models.Filter` is passed through unchanged.
+
+        Example:
+            >>> HybridRetriever.build_filter({"subcategory": "movements"})
+            >>> HybridRetriever.build_filter({"plugin_name": "Sprite", "ace_type": ["condition"]})
+        """
+        if not filters:
+            return None
+        if isinstance(filters, models.Filter):
+            return filters
+
+        conditions = []
+        for key, value in filters.items():
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                match = models.MatchAny(any=list(value))
+            else:
+                match = models.MatchValue(value=value)
+            conditions.append(models.FieldCondition(key=key, match=match))
+        return models.Filter(must=conditions) if conditions else None
+
+    def _route(
+        self,
+        collection_name: str,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Tuple[str, Optional["models.Filter"]]:
+        """
+        Physical collection + filter for a search.
+
+        In unified mode a c3_* collection becomes UNIFIED_COLLECTION with a
+        `collection` condition added to the caller's filters.
+        """
+        from src.collections import ALL_COLLECTIONS, UNIFIED_COLLECTION
+
+        query_filter = self.build_filter(filters)
+        if not self.unified or collection_name not in ALL_COLLECTIONS:
+            return collection_name, query_filter
+        condition = models.FieldCondition(key="collection", match=models.MatchValue(value=collection_name))
+        must = [condition] if query_filter is None else [condition, query_filter]
+        return UNIFIED_COLLECTION, models.Filter(must=must)
+
+    def _search_params(
+        self,
+        oversampling: Optional[float] = None,
+        rescore: Optional[bool] = None,
+        collection_name: Optional[str] = None,
+        hnsw_ef: Optional[int] = None,
+        exact: Optional[bool] = None
+    ) -> Optional["models.SearchParams"]:
+        """
+        Build search params: HNSW precision + quantization rescoring.
+
+        `hnsw_ef` / `exact` default to the collection's HNSW profile.
+        Qdrant ignores the quantization params on collections without
+        quantization, so they are always safe to send.
+        """
+        from src.config import SEARCH_OVERSAMPLING, SEARCH_RESCORE
+
+        oversampling = SEARCH_OVERSAMPLING if oversampling is None else oversampling
+        rescore = SEARCH_RESCORE if rescore is None else rescore
+        if collection_name is not None:
+            profile = self.hnsw_profile(collection_name)
+            hnsw_ef = profile["hnsw_ef"] if hnsw_ef is None else hnsw_ef
+            exact = profile["exact"] if exact is None else exact
+        return models.SearchParams(
+            hnsw_ef=hnsw_ef,
+            exact=bool(exact),
+            quantization=models.QuantizationSearchParams(
+                ignore=False,
+                rescore=rescore,
+                oversampling=oversampling,
+            )
+        )
+
+    @staticmethod
+    def _to_results(points, source: str) -> List[SearchResult]:
+        return [
+            SearchResult(
+                text=r.payload.get("text", ""),
+                score=r.score,
+                source=source,
+                metadata={k: v for k, v in r.payload.items() if k != "text"}
+            )
+            for r in points
+        ]
+
+    def _hybrid_prefetch(
+        self,
+        dense_vector: List[float],
+        sparse_vector: "models.SparseVector",
+        top_k: int,
+        score_threshold: float,
+        query_filter: Optional["models.Filter"],
+        params: Optional["models.SearchParams"]
+    ) -> List["models.Prefetch"]:
+        """Dense + sparse prefetches fused by `search_hybrid` and hybrid plan requests"""
+        from src.config import HYBRID_PREFETCH
+        from src.data_processing.sparse_encoder import SPARSE_VECTOR_NAME
+
+        candidates = top_k * HYBRID_PREFETCH
+        return [
+            models.Prefetch(
+                query=dense_vector,
+                limit=candidates,
+                score_threshold=score_threshold,
+                filter=query_filter,
+                params=params,
+            ),
+            models.Prefetch(
+                query=sparse_vector,
+                using=SPARSE_VECTOR_NAME,
+                limit=candidates,
+                filter=query_filter,
+            ),
+        ]
+
+    @staticmethod
+    def _fusion(fusion: Optional[str] = None) -> "models.Fusion":
+        from src.config import HYBRID_FUSION
+        return models.Fusion.DBSF if (fusion or HYBRID_FUSION).lower() == "dbsf" else models.Fusion.RRF
+
+    def embed_queries(self, queries: List[str]) -> Dict[str, List[float]]:
+        """Dense vectors of the distinct queries (cache misses encoded in one batch)"""
+        distinct = list(dict.fromkeys(queries))
+        if not distinct:
+            return {}
+        return dict(zip(distinct, self.embedder.encode_queries(distinct)))
+
+    def plan_search_all(
+        self,
+        queries: List[str],
+        top_k_per_collection: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[SearchRequest]:
+        """
+        Requests of `search_all` for each query (same limits and thresholds).
+
+        The plan is the same in both layouts: in unified mode every request
+        is routed to UNIFIED_COLLECTION with its collection filter and keeps
+        its own threshold (terms: 0.3) and keyword fusion.
+        """
+        from src.collections import COLLECTIONS
+        return [
+            SearchRequest(
+                collection=COLLECTIONS[key],
+                query=query,
+                top_k=top_k_per_collection,
+                score_threshold=self.COLLECTION_SCORE_THRESHOLDS.get(key, self.DEFAULT_SCORE_THRESHOLD),
+                filters=filters,
+                keyword=self.keyword,
+            )
+            for query in queries
+            for key in self.SEARCH_ALL_KEYS
+        ]
+
+    def execute_plan(
+        self,
+        requests: List[SearchRequest],
+        oversampling: Optional[float] = None,
+        rescore: Optional[bool] = None
+    ) -> List[List[SearchResult]]:
+        """
+        Run many collection searches with one embedding pass.
+
+        Each distinct query is embedded once (dense, and sparse for hybrid
+        requests). Requests are grouped by physical collection and each
+        group is sent as one `query_batch_points` call; Qdrant batches only
+        within a collection, so this is one HTTP request per collection
+        (a single one in unified mode, where everything hits c3_all).
+
+        Args:
+            requests: Searches to run; limits, thresholds and filters per request
+            oversampling: See `search_collection`
+            rescore: See `search_collection`
+
+        Returns:
+            Results per request, in request order (empty for a failed collection)
+        """
+        results: List[List[SearchResult]] = [[] for _ in range(2 * len(requests))]
+        for target, indexes, query_requests in self.build_batches(requests, oversampling, rescore):
+            try:
+                responses = self.client.query_batch_points(collection_name=target, requests=query_requests)
+            except Exception as e:
+                logger.warning(f"[检索] {target} 批量查询失败: {e}")
+                continue
+            self.collect_batch(requests, results, indexes, query_requests, responses)
+        return self.fuse_keyword(requests, results)
+
+    def build_batches(
+        self,
+        requests: List[SearchRequest],
+        oversampling: Optional[float] = None,
+        rescore: Optional[bool] = None
+    ) -> List[Tuple[str, List[int], List["models.QueryRequest"]]]:
+        """
+        Embed the distinct queries and build one query batch per physical collection.
+
+        Requests with `keyword` add a second query to the same batch: the
+        collection's BM25 hits, restricted by ID and scored by the dense
+        vector with the request's threshold and filters (see `fuse_keyword`).
+
+        Returns:
+            (target collection, result slots, query requests) per batch; slot
+            `i` is the vector search of `requests[i]`, slot `len(requests) + i`
+            its keyword candidates
+        """
+        routes = [self._route(r.collection, r.filters) for r in requests]
+        hybrid = [r.hybrid and self.has_sparse_vectors(target) for r, (target, _) in zip(requests, routes)]
+
+        # 混合检索的查询一次前向得到稠密 + 稀疏向量，稠密部分写入查询缓存
+        sparse_queries = list(dict.fromkeys(r.query for r, h in zip(requests, hybrid) if h))
+        sparse = {}
+        if sparse_queries:
+            dense_vectors, sparse_vectors = self.embedder.encode_queries_with_sparse(sparse_queries)
+            sparse = dict(zip(sparse_queries, sparse_vectors))
+        dense = self.embed_queries([r.query for r in requests if r.query not in sparse])
+        if sparse_queries:
+            dense.update(zip(sparse_queries, dense_vectors))
+
+        targets: Dict[str, List[int]] = {}
+        for i, (target, _) in enumerate(routes):
+            targets.setdefault(target, []).append(i)
+
+        batches = []
+        for target, indexes in targets.items():
+            params = self._search_params(oversampling, rescore, target)
+            query_requests = []
+            for i in indexes:
+                request, (_, query_filter) = requests[i], routes[i]
+                if hybrid[i]:
+                    query_requests.append(models.QueryRequest(
+                        prefetch=self._hybrid_prefetch(
+                            dense[request.query], sparse[request.query], request.top_k,
+                            request.score_threshold, query_filter, params
+                        ),
+                        query=models.FusionQuery(fusion=self._fusion()),
+                        limit=request.top_k,
+                        with_payload=True,
+                    ))
+                else:
+                    query_requests.append(models.QueryRequest(
+                        query=dense[request.query],
+                        limit=request.top_k,
+                        score_threshold=request.score_threshold,
+                        filter=query_filter,
+                        params=params,
+                        with_payload=True,
+                    ))
+            slots = list(indexes)
+            for i in indexes:
+                request, (_, query_filter) = requests[i], routes[i]
+                # 混合检索已包含稀疏词项匹配，且分数不是余弦相似度
+                if not request.keyword or hybrid[i]:
+                    continue
+                ids = self.keyword_candidates(request.collection, request.query, request.top_k)
+                if not ids:
+                    continue
+                must = [models.HasIdCondition(has_id=ids)]
+                if query_filter is not None:
+                    must.append(query_filter)
+                query_requests.append(models.QueryRequest(
+                    query=dense[request.query],
+                    limit=len(ids),
+                    score_threshold=request.score_threshold,
+                    filter=models.Filter(must=must),
+                    params=params,
+                    with_payload=True,
+                ))
+                slots.append(len(requests) + i)
+            batches.append((target, slots, query_requests))
+        return batches
+
+    def collect_batch(
+        self,
+        requests: List[SearchRequest],
+        results: List[List[SearchResult]],
+        slots: List[int],
+        query_requests: List["models.QueryRequest"],
+        responses: list
+    ):
+        """Store the responses of one batch in their result slots (keyword candidates in BM25 order)"""
+        n = len(requests)
+        for i, query_request, response in zip(slots, query_requests, responses):
+            points = response.points
+            if i >= n:
+                rank = {point_id: r for r, point_id in enumerate(query_request.filter.must[0].has_id)}
+                points = sorted(points, key=lambda p: rank[p.id])
+            results[i] = self._to_results(points, requests[i % n].collection)
+
+    def keyword_index(self, collection_name: str):
+        """BM25 index of a collection (memory-mapped, reloaded after index updates; None if not built)"""
+        from src.config import BM25_DIR
+        from src.data_processing.bm25 import BM25Index
+
+        generation = self.index_generation.current()
+        if generation != self._bm25_generation:
+            self._bm25 = {}
+            self._bm25_generation = generation
+        if collection_name not in self._bm25:
+            path = BM25_DIR / collection_name
+            try:
+                self._bm25[collection_name] = BM25Index.load(path) if path.exists() else None
+            except (OSError, ValueError) as e:
+                logger.warning(f"[BM25] 无法加载 {path}: {e}")
+                self._bm25[collection_name] = None
+        return self._bm25[collection_name]
+
+    def keyword_candidates(self, collection_name: str, query: str, top_k: int = 5) -> List[int]:
+        """
+        Point IDs of the BM25 top-k (exact ACE ids, expression names), best first.
+
+        In unified mode the IDs are those of the merged collection.
+        """
+        index = self.keyword_index(collection_name)
+        if index is None:
+            return []
+        ids = [point_id for point_id, _ in index.search(query, top_k)]
+        from src.collections import ALL_COLLECTIONS
+        if self.unified and collection_name in ALL_COLLECTIONS:
+            from src.data_processing.indexer import unified_point_id
+            ids = [unified_point_id(collection_name, point_id) for point_id in ids]
+        return ids
+
+    def fuse_keyword(
+        self,
+        requests: List[SearchRequest],
+        results: List[List[SearchResult]]
+    ) -> List[List[SearchResult]]:
+        """
+        RRF-fuse the keyword candidates into the vector results of each request.
+
+        Candidates went through the same cosine threshold and filters as the
+        vector search, so keyword hits never bring in chunks the dense search
+        would reject. RRF only decides which chunks make the request's top-k;
+        scores stay cosine similarities for `rerank`.
+
+        Args:
+            requests: The plan
+            results: Result slots filled by `collect_batch`
+
+        Returns:
+            Results per request, in request order
+        """
+        n = len(requests)
+        fused = []
+        for i, request in enumerate(requests):
+            dense, keyword = results[i], results[n + i] if len(results) > n else []
+            if keyword:
+                dense = [
+                    SearchResult(r.text, r.metadata["original_score"], r.source,
+                                 {k: v for k, v in r.metadata.items() if k != "original_score"})
+                    for r in self.reciprocal_rank_fusion([dense, keyword])[:request.top_k]
+                ]
+                dense.sort(key=lambda r: r.score, reverse=True)
+            fused.append(dense)
+        return fused
+
     def search_collection(
         self,
         collection_name: str,
         query: str,
         top_k: int = 5,
-        score_threshold: float = 0.5
+        score_threshold: float = 0.5,
+        oversampling: Optional[float] = None,
+        rescore: Optional[bool] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        hybrid: bool = False,
+        hnsw_ef: Optional[int] = None,
+        exact: Optional[bool] = None
     ) -> List[SearchResult]:
-        """Search a single collection"""
+        """
+        Search a single collection
+
+        Args:
+            collection_name: Collection (or alias) to search
+            query: Search query
+            top_k: Number of results
+            score_threshold: Minimum cosine similarity
+            oversampling: For quantized collections, fetch top_k * oversampling
+                candidates with quantized vectors (default: SEARCH_OVERSAMPLING)
+            rescore: Re-rank those candidates with the original vectors
+                (default: SEARCH_RESCORE)
+            filters: Payload conditions applied server-side before the ANN
+                search, e.g. {"subcategory": "movements"} (see `build_filter`)
+            hybrid: Fuse dense and sparse lexical search (see `search_hybrid`);
+                ignored for collections without sparse vectors
+            hnsw_ef: HNSW search candidates, higher = better recall, slower
+                (default: the collection's HNSW profile)
+            exact: Brute-force search instead of HNSW (default: HNSW profile)
+        """
+        target, query_filter = self._route(collection_name, filters)
+        if hybrid and self.has_sparse_vectors(target):
+            return self.search_hybrid(
+                collection_name, query, top_k, score_threshold,
+                oversampling=oversampling, rescore=rescore, filters=filters,
+                hnsw_ef=hnsw_ef, exact=exact
+            )
+
         query_vector = self.embedder.encode_single(query)
 
         try:
-            results = self.client.search(
-                collection_name=collection_name,
-                query_vector=query_vector,
+            results = self.client.query_points(
+                collection_name=target,
+                query=query_vector,
                 limit=top_k,
-                score_threshold=score_threshold
-            )
+                score_threshold=score_threshold,
+                query_filter=query_filter,
+                search_params=self._search_params(oversampling, rescore, target, hnsw_ef, exact),
+                with_payload=True
+            ).points
         except Exception as e:
             print(f"Search error in {collection_name}: {e}")
             return []
 
+        return self._to_results(results, collection_name)
+
+    def search_hybrid(
+        self,
+        collection_name: str,
+        query: str,
+        top_k: int = 5,
+        score_threshold: float = 0.5,
+        oversampling: Optional[float] = None,
+        rescore: Optional[bool] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        fusion: Optional[str] = None,
+        hnsw_ef: Optional[int] = None,
+        exact: Optional[bool] = None
+    ) -> List[SearchResult]:
+        """
+        Dense + sparse lexical search fused server-side in one request.
+
+        Both searches run as prefetches of a single query_points call and
+        are combined with RRF (or DBSF). The sparse side catches exact
+        identifiers (`set-instvar-value`, `Sprite.AnimationFrame`) that the
+        dense vector misses.
+
+        Note:
+            Scores are fusion scores (rank based for RRF), not cosine
+            similarities; `score_threshold` is applied to the dense prefetch.
+
+        Args:
+            collection_name: Collection (or alias) indexed with SPARSE_VECTORS
+                (the retriever must run with SPARSE_VECTORS too)
+            query: Search query
+            top_k: Number of results
+            score_threshold: Minimum cosine similarity for dense candidates
+            oversampling: See `search_collection`
+            rescore: See `search_collection`
+            filters: Payload filters applied to both prefetches
+            fusion: "rrf" or "dbsf" (default: HYBRID_FUSION)
+            hnsw_ef: See `search_collection` (dense prefetch only)
+            exact: See `search_collection` (dense prefetch only)
+        """
+        target, query_filter = self._route(collection_name, filters)
+        dense, sparse = self.embedder.encode_queries_with_sparse([query])
+
+        try:
+            results = self.client.query_points(
+                collection_name=target,
+                prefetch=self._hybrid_prefetch(
+                    dense[0],
+                    sparse[0],
+                    top_k, score_threshold, query_filter,
+                    self._search_params(oversampling, rescore, target, hnsw_ef, exact)
+                ),
+                query=models.FusionQuery(fusion=self._fusion(fusion)),
+                limit=top_k,
+                with_payload=True
+            ).points
+        except Exception as e:
+            print(f"Hybrid search error in {collection_name}: {e}")
+            return []
+
+        return self._to_results(results, collection_name)
+
+    def search_unified(
+        self,
+        query: str,
+        collections: Optional[List[str]] = None,
+        top_k: int = 10,
+        score_threshold: float = 0.5,
+        group_size: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        oversampling: Optional[float] = None,
+        rescore: Optional[bool] = None
+    ) -> List[SearchResult]:
+        """
+        Search several collections with one ANN query on UNIFIED_COLLECTION.
+
+        All points share one vector space and one index, so scores are
+        directly comparable across collections (no per-collection
+        normalization needed). Requires `build_unified_collection`.
+
+        Args:
+            query: Search query
+            collections: Source collections to include (default: all)
+            top_k: Number of results (ignored when grouping)
+            score_threshold: Minimum cosine similarity
+            group_size: If set, return up to `group_size` hits per collection
+                (server-side grouping on the `collection` payload field)
+            filters: Additional payload filters (see `build_filter`)
+            oversampling: See `search_collection`
+            rescore: See `search_collection`
+
+        Returns:
+            Results ordered by score (grouped results: group by group)
+        """
+        from src.collections import ALL_COLLECTIONS, UNIFIED_COLLECTION
+
+        collections = collections or ALL_COLLECTIONS
+        must = [models.FieldCondition(key="collection", match=models.MatchAny(any=list(collections)))]
+        extra = self.build_filter(filters)
+        if extra is not None:
+            must.append(extra)
+        query_filter = models.Filter(must=must)
+        params = self._search_params(oversampling, rescore, UNIFIED_COLLECTION)
+        query_vector = self.embedder.encode_single(query)
+
+        try:
+            if group_size:
+                groups = self.client.query_points_groups(
+                    collection_name=UNIFIED_COLLECTION,
+                    query=query_vector,
+                    group_by="collection",
+                    limit=len(collections),
+                    group_size=group_size,
+                    score_threshold=score_threshold,
+                    query_filter=query_filter,
+                    search_params=params,
+                    with_payload=True
+                ).groups
+                hits = [hit for group in groups for hit in group.hits]
+            else:
+                hits = self.client.query_points(
+                    collection_name=UNIFIED_COLLECTION,
+                    query=query_vector,
+                    limit=top_k,
+                    score_threshold=score_threshold,
+                    query_filter=query_filter,
+                    search_params=params,
+                    with_payload=True
+                ).points
+        except Exception as e:
+            print(f"Search error in {UNIFIED_COLLECTION}: {e}")
+            return []
+
         return [
             SearchResult(
                 text=r.payload.get("text", ""),
                 score=r.score,
-                source=collection_name,
+                source=r.payload.get("collection", UNIFIED_COLLECTION),
                 metadata={k: v for k, v in r.payload.items() if k != "text"}
             )
-            for r in results
+            for r in hits
         ]
 
-    def search_guide(self, query: str, top_k: int = 5) -> List[SearchResult]:
+    def search_guide(
+        self,
+        query: str,
+        top_k: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[SearchResult]:
         """Search guide documentation (getting started, tips, overview)"""
         from src.collections import COLLECTIONS
-        return self.search_collection(COLLECTIONS["guide"], query, top_k)
+        return self.search_collection(COLLECTIONS["guide"], query, top_k, filters=filters)
 
-    def search_interface(self, query: str, top_k: int = 5) -> List[SearchResult]:
+    def search_interface(
+        self,
+        query: str,
+        top_k: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[SearchResult]:
         """Search interface documentation (editor UI, dialogs, debugger)"""
         from src.collections import COLLECTIONS
-        return self.search_collection(COLLECTIONS["interface"], query, top_k)
+        return self.search_collection(COLLECTIONS["interface"], query, top_k, filters=filters)
 
-    def search_project(self, query: str, top_k: int = 5) -> List[SearchResult]:
+    def search_project(
+        self,
+        query: str,
+        top_k: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[SearchResult]:
         """Search project primitives (events, objects, timelines)"""
         from src.collections import COLLECTIONS
-        return self.search_collection(COLLECTIONS["project"], query, top_k)
+        return self.search_collection(COLLECTIONS["project"], query, top_k, filters=filters)
 
-    def search_plugins(self, query: str, top_k: int = 5) -> List[SearchResult]:
+    def search_plugins(
+        self,
+        query: str,
+        top_k: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[SearchResult]:
         """Search plugin reference documentation"""
         from src.collections import COLLECTIONS
-        return self.search_collection(COLLECTIONS["plugins"], query, top_k)
+        return self.search_collection(COLLECTIONS["plugins"], query, top_k, filters=filters)
 
-    def search_behaviors(self, query: str, top_k: int = 5) -> List[SearchResult]:
+    def search_behaviors(
+        self,
+        query: str,
+        top_k: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[SearchResult]:
         """Search behavior reference documentation"""
         from src.collections import COLLECTIONS
-        return self.search_collection(COLLECTIONS["behaviors"], query, top_k)
+        return self.search_collection(COLLECTIONS["behaviors"], query, top_k, filters=filters)
 
-    def search_scripting(self, query: str, top_k: int = 5) -> List[SearchResult]:
+    def search_scripting(
+        self,
+        query: str,
+        top_k: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[SearchResult]:
         """Search scripting API documentation"""
         from src.collections import COLLECTIONS
-        return self.search_collection(COLLECTIONS["scripting"], query, top_k)
+        return self.search_collection(COLLECTIONS["scripting"], query, top_k, filters=filters)
 
-    def search_terms(self, query: str, top_k: int = 10) -> List[SearchResult]:
+    def search_terms(
+        self,
+        query: str,
+        top_k: int = 10,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[SearchResult]:
         """Search translation terms"""
         from src.collections import COLLECTIONS
-        return self.search_collection(COLLECTIONS["terms"], query, top_k, score_threshold=0.3)
+        return self.search_collection(
+            COLLECTIONS["terms"], query, top_k,
+            score_threshold=self.COLLECTION_SCORE_THRESHOLDS["terms"], filters=filters
+        )
 
-    def search_examples(self, query: str, top_k: int = 5) -> List[SearchResult]:
+    def search_examples(
+        self,
+        query: str,
+        top_k: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[SearchResult]:
         """Search example projects"""
         from src.collections import COLLECTIONS
-        return self.search_collection(COLLECTIONS["examples"], query, top_k)
+        return self.search_collection(COLLECTIONS["examples"], query, top_k, filters=filters)
+
+    def search_ace(
+        self,
+        query: str,
+        top_k: int = 5,
+        filters: Optional[Dict[str, Any]] = None,
+        hybrid: bool = False
+    ) -> List[SearchResult]:
+        """
+        Search ACE schema entries (actions/conditions/expressions)
+
+        Example:
+            >>> # Only conditions of Sprite
+            >>> retriever.search_ace("碰撞", filters={"plugin_name": "Sprite", "ace_type": "condition"})
+            >>> # Exact identifiers: add sparse lexical matching
+            >>> retriever.search_ace("set-instvar-value", hybrid=True)
+        """
+        from src.collections import COLLECTIONS
+        return self.search_collection(COLLECTIONS["ace"], query, top_k, filters=filters, hybrid=hybrid)
 
     def search_all(
         self,
         query: str,
-        top_k_per_collection: int = 5
+        top_k_per_collection: int = 5,
+        filters: Optional[Dict[str, Any]] = None
     ) -> Dict[str, List[SearchResult]]:
-        """Search all collections and return organized results"""
-        results = {
-            "guide": self.search_guide(query, top_k_per_collection),
-            "interface": self.search_interface(query, top_k_per_collection),
-            "project": self.search_project(query, top_k_per_collection),
-            "plugins": self.search_plugins(query, top_k_per_collection),
-            "behaviors": self.search_behaviors(query, top_k_per_collection),
-            "scripting": self.search_scripting(query, top_k_per_collection),
-            "terms": self.search_terms(query, top_k_per_collection),
-            "examples": self.search_examples(query, top_k_per_collection)
-        }
-        return results
+        """
+        Search all collections and return organized results
+
+        Args:
+            query: Search query
+            top_k_per_collection: Results per collection
+            filters: Payload filters applied to every collection (see `build_filter`).
+                Collections whose points lack a filtered field return nothing.
+        """
+        # 查询只嵌入一次，每个集合一次批量请求 (统一集合: 全部请求合为一次，各集合阈值不变)
+        results = self.execute_plan(self.plan_search_all([query], top_k_per_collection, filters))
+        return dict(zip(self.SEARCH_ALL_KEYS, results))
 
     def search_all_with_rerank(
         self,
         query: str,
         top_k_per_collection: int = 5,
-        final_top_k: int = 10
+        final_top_k: int = 10,
+        filters: Optional[Dict[str, Any]] = None
     ) -> List[SearchResult]:
         """
         Search all collections with cross-collection reranking.
@@ -334,40 +1084,42 @@ class HybridRetriever:
             query: Search query
             top_k_per_collection: Results per collection before reranking
             final_top_k: Final number of results after reranking
+            filters: Payload filters applied server-side (see `build_filter`)
 
         Returns:
             Reranked list of SearchResults
         """
         import time
+        key, generation, cached = self.cached_results(query, ("rerank", top_k_per_collection, final_top_k), filters)
+        if cached is not None:
+            logger.info(f"[检索] 命中结果缓存 ({len(cached)} 条)")
+            return cached
+
         logger.info(f"[检索] 开始多 collection 检索 (每 collection top_k={top_k_per_collection})...")
         t0 = time.time()
 
         # Collect all results from all collections
         all_results: List[SearchResult] = []
 
-        # Define collection mapping
-        collection_map = {
-            "guide": self.search_guide,
-            "interface": self.search_interface,
-            "project": self.search_project,
-            "plugins": self.search_plugins,
-            "behaviors": self.search_behaviors,
-            "scripting": self.search_scripting,
-            "terms": self.search_terms,
-            "examples": self.search_examples,
-        }
-
-        for coll_name, search_fn in collection_map.items():
-            try:
-                results = search_fn(query, top_k_per_collection)
-                for r in results:
-                    all_results.append(r)
+        # 查询只嵌入一次，每个集合一次批量请求 (统一集合: 全部请求合为一次，各集合阈值不变)
+        plan = self.plan_search_all([query], top_k_per_collection, filters)
+        try:
+            for coll_name, results in zip(self.SEARCH_ALL_KEYS, self.execute_plan(plan)):
+                all_results.extend(results)
                 logger.info(f"[检索] {coll_name}: {len(results)} 条")
-            except Exception as e:
-                logger.warning(f"[检索] {coll_name} 失败: {e}")
+        except Exception as e:
+            logger.warning(f"[检索] 失败: {e}")
 
         logger.info(f"[检索] 原始结果共 {len(all_results)} 条 ({time.time()-t0:.1f}s)")
+        final_results = self.rerank(all_results, final_top_k)
+        self.cache_results(key, generation, final_results)
+        return final_results
 
+    def rerank(self, all_results: List[SearchResult], final_top_k: int = 10) -> List[SearchResult]:
+        """
+        Cross-collection reranking: per-collection min-max normalization,
+        authority boosts and deduplication of split sections.
+        """
         if not all_results:
             return []
 
@@ -386,10 +1138,12 @@ class HybridRetriever:
         seen_texts: Set[str] = set()  # Deduplication
 
         for r in all_results:
-            # Min-max normalization per collection
+            # Min-max normalization per collection (unified scores are already comparable)
             coll_scores = collection_scores[r.source]
             min_s, max_s = min(coll_scores), max(coll_scores)
-            if max_s > min_s:
+            if self.unified:
+                normalized = r.score
+            elif max_s > min_s:
                 normalized = (r.score - min_s) / (max_s - min_s)
             else:
                 normalized = r.score if max_s > 0 else 0
@@ -403,8 +1157,11 @@ class HybridRetriever:
             boost = collection_boost.get(r.source, 1.0)
             final_score = normalized * boost
 
-            # Deduplication by text content
-            text_key = r.text[:100].lower().strip()
+            # Deduplication by text content (split pieces share their H1/H2 prefix)
+            if "parent_section_id" in r.metadata:
+                text_key = f"{r.metadata['parent_section_id']}#{r.metadata.get('part_index')}"
+            else:
+                text_key = r.text[:100].lower().strip()
             if text_key not in seen_texts:
                 seen_texts.add(text_key)
                 reranked.append(SearchResult(
@@ -421,6 +1178,65 @@ class HybridRetriever:
         logger.info(f"[重排] 完成，返回 top-{len(final_results)}")
         return final_results
 
+    @staticmethod
+    def _strip_section_prefix(text: str) -> str:
+        """Remove the repeated "# H1 / ## H2" prefix from a split section piece"""
+        if text.startswith("# "):
+            text = text.split("\n\n", 1)[-1]
+        if text.startswith("## "):
+            text = text.split("\n\n", 1)[-1] if "\n\n" in text else ""
+        return text
+
+    def get_section_text(self, collection_name: str, parent_section_id: str) -> Optional[str]:
+        """
+        Reassemble a split H2 section from all of its pieces.
+
+        Returns:
+            Full section text (prefix once, pieces in order), or None if not found
+        """
+        target, scroll_filter = self._route(collection_name, {"parent_section_id": parent_section_id})
+        try:
+            points, _ = self.client.scroll(
+                collection_name=target,
+                scroll_filter=scroll_filter,
+                limit=256,
+                with_payload=True,
+            )
+        except Exception as e:
+            print(f"Scroll error in {collection_name}: {e}")
+            return None
+        if not points:
+            return None
+
+        pieces = sorted(points, key=lambda p: p.payload.get("part_index", 0))
+        texts = [pieces[0].payload.get("text", "")]
+        texts.extend(self._strip_section_prefix(p.payload.get("text", "")) for p in pieces[1:])
+        return "\n\n".join(t for t in texts if t)
+
+    def reassemble_sections(self, results: List[SearchResult]) -> List[SearchResult]:
+        """
+        Replace pieces of split sections with the whole section.
+
+        Pieces of the same section collapse into one result at the position
+        of the best-ranked piece (keeping its score). Results of unsplit
+        sections pass through unchanged.
+        """
+        merged: List[SearchResult] = []
+        seen: Set[Tuple[str, str]] = set()
+        for r in results:
+            parent = r.metadata.get("parent_section_id")
+            if not parent:
+                merged.append(r)
+                continue
+            if (r.source, parent) in seen:
+                continue
+            seen.add((r.source, parent))
+
+            text = self.get_section_text(r.source, parent) or r.text
+            metadata = {k: v for k, v in r.metadata.items() if k not in ("part_index", "part_count")}
+            merged.append(SearchResult(text=text, score=r.score, source=r.source, metadata=metadata))
+        return merged
+
     def format_context(self, results: Dict[str, List[SearchResult]]) -> str:
         """Format search results as context for LLM"""
         context_parts = []
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for blue/green collection versions: alias publish, validation and
+version garbage collection (in-memory Qdrant)
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+import src.config as config
+
+
+def memory_indexer(tmp_path, monkeypatch):
+    import src.data_processing.indexer as indexer_module
+
+    monkeypatch.setattr(config, "INDEX_STATE_DIR", tmp_path)
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(indexer_module, "QdrantClient", lambda host, port: client)
+    return indexer_module.Indexer()
+
+
+def build_version(indexer, alias: str, points: int) -> str:
+    target = indexer.versioned_name(alias, indexer.next_version([alias]))
+    indexer.create_collection(target, dimension=2)
+    indexer.client.upsert(target, points=[
+        models.PointStruct(id=i, vector=[1.0, float(i)], payload={"text": f"{target} {i}"}) for i in range(points)
+    ])
+    return target
+
+
+def test_publish_switches_alias_and_bumps_generation(tmp_path, monkeypatch):
+    from src.data_processing.index_state import IndexGeneration
+
+    indexer = memory_indexer(tmp_path, monkeypatch)
+    generation = IndexGeneration().current()
+
+    v1 = build_version(indexer, "c3_guide", 3)
+    indexer.publish_version("c3_guide", v1, 3)
+    assert indexer.get_aliases() == {"c3_guide": "c3_guide__v1"}
+    assert indexer.collection_exists("c3_guide")
+    assert IndexGeneration().current() != generation
+
+    # 点数不符时不切换 alias
+    v2 = build_version(indexer, "c3_guide", 2)
+    with pytest.raises(RuntimeError, match="Validation failed"):
+        indexer.publish_version("c3_guide", v2, 5)
+    assert indexer.get_aliases()["c3_guide"] == v1
+
+    indexer.publish_version("c3_guide", v2, 2)
+    assert indexer.get_aliases()["c3_guide"] == v2
+    assert indexer.client.count("c3_guide").count == 2  # 通过 alias 查询新版本
+
+
+def test_legacy_collection_is_migrated_to_alias(tmp_path, monkeypatch):
+    indexer = memory_indexer(tmp_path, monkeypatch)
+    indexer.create_collection("c3_terms", dimension=2)  # 旧布局: 同名实体集合
+
+    v1 = build_version(indexer, "c3_terms", 1)
+    indexer.publish_version("c3_terms", v1, 1)
+    assert indexer.get_aliases() == {"c3_terms": "c3_terms__v1"}
+    assert "c3_terms" not in [c.name for c in indexer.client.get_collections().collections]
+
+
+def test_garbage_collection_keeps_newest_and_live(tmp_path, monkeypatch):
+    indexer = memory_indexer(tmp_path, monkeypatch)
+    for _ in range(4):
+        indexer.publish_version("c3_ace", build_version(indexer, "c3_ace", 1), 1, retention=2)
+    assert indexer.list_versions("c3_ace") == [3, 4]
+
+    # 回滚到 v3 后构建的 v5、v6: 保留最新两个，且不删除正在使用的 v3
+    indexer.publish_version("c3_ace", "c3_ace__v3", 1, retention=2)
+    for _ in range(2):
+        build_version(indexer, "c3_ace", 1)
+    indexer.garbage_collect_versions("c3_ace", retention=2)
+    assert indexer.list_versions("c3_ace") == [3, 5, 6]
+    assert indexer.get_aliases()["c3_ace"] == "c3_ace__v3"
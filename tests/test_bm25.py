@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for the BM25 keyword index (tokenization, early termination, mmap persistence)
+"""
+
+import sys
+import random
+from pathlib import Path
+from collections import Counter
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data_processing.bm25 import BM25Index, tokenize
+
+
+def exhaustive_scores(index: BM25Index, query: str) -> np.ndarray:
+    """Score every document by reading all postings (reference for early termination)"""
+    scores = np.zeros(len(index), dtype=np.float32)
+    for term, weight in Counter(t for t in tokenize(query) if t in index.vocab).items():
+        tid = index.vocab[term]
+        start, end = index.offsets[tid], index.offsets[tid + 1]
+        scores[index.docs[start:end]] += index.impacts[start:end] * weight
+    return scores
+
+
+def random_index(seed: int = 1):
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(200)] + ["碰撞", "检测", "动画", "保存", "游戏"]
+    texts = [" ".join(rng.choice(words) for _ in range(rng.randint(3, 60))) for _ in range(2000)]
+    return BM25Index.build(texts, list(range(1000, 1000 + len(texts)))), words, rng
+
+
+def test_tokenize_mixed_text():
+    tokens = tokenize("Sprite.AnimationFrame 设置动画帧 set-instvar-value")
+    assert tokens[:3] == ["sprite.animationframe", "sprite", "animationframe"]
+    assert ["设置", "置动", "动画", "画帧"] == tokens[3:7]
+    assert "set-instvar-value" in tokens and "instvar" in tokens
+    # 全角字符归一化，单个汉字保留
+    assert tokenize("Ｓｐｒｉｔｅ 的") == ["sprite", "的"]
+
+
+def test_exact_identifier_ranks_first():
+    texts = [
+        "Set instance variable value of an object",
+        "Action set-instvar-value: 设置实例变量",
+        "Sprite 碰撞检测 On collision with another object",
+    ]
+    index = BM25Index.build(texts, [11, 12, 13])
+    assert index.search("set-instvar-value", top_k=1)[0][0] == 12
+    assert index.search("碰撞检测", top_k=1)[0][0] == 13
+    assert index.search("unknown", top_k=3) == []
+
+
+def test_early_termination_matches_exhaustive_scores():
+    index, words, rng = random_index()
+    for _ in range(100):
+        query = " ".join(rng.choice(words) for _ in range(rng.randint(1, 5)))
+        top_k = rng.choice([1, 5, 10])
+        hits = index.search(query, top_k)
+        expected = np.sort(exhaustive_scores(index, query))[::-1][:top_k]
+        expected = expected[expected > 0]
+        assert np.allclose([score for _, score in hits], expected, rtol=1e-5)
+
+
+def test_document_ordered_postings_mirror_impact_order():
+    index, _, _ = random_index(seed=3)
+    for tid in range(0, len(index.vocab), 7):
+        start, end = index.offsets[tid], index.offsets[tid + 1]
+        docs = index.doc_docs[start:end]
+        assert np.all(np.diff(docs) > 0)
+        by_doc = dict(zip(index.docs[start:end].tolist(), index.impacts[start:end].tolist()))
+        assert by_doc == dict(zip(docs.tolist(), index.doc_impacts[start:end].tolist()))
+
+
+def test_save_and_mmap_load(tmp_path):
+    index, _, _ = random_index(seed=2)
+    index.save(tmp_path / "c3_test")
+    index.save(tmp_path / "c3_test")  # 覆盖已有目录
+    loaded = BM25Index.load(tmp_path / "c3_test")
+    assert isinstance(loaded.docs, np.memmap) and isinstance(loaded.doc_docs, np.memmap)
+    assert loaded.search("w1 碰撞 检测", 5) == index.search("w1 碰撞 检测", 5)
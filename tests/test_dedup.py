@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for duplicate chunk collapsing before embedding
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data_processing.dedup import deduplicate_documents, find_duplicate_clusters
+
+TABLE = "\n".join(f"| Sprite.Expr{i} | Returns value number {i} |" for i in range(30))
+
+
+def doc(key: str, text: str, source: str, **metadata):
+    return {"id": key, "text": text, "metadata": {"source": source, **metadata}}
+
+
+def test_exact_duplicates_are_collapsed():
+    docs = [
+        doc("a", "On start of layout\nSet position", "guide/a.md"),
+        doc("b", "Unique text", "guide/b.md"),
+        doc("c", "on start of  layout\nset position", "guide/c.md"),  # 仅大小写 / 空白不同
+    ]
+    kept = deduplicate_documents(docs)
+    assert [d["id"] for d in kept] == ["a", "b"]
+    assert kept[0]["metadata"]["sources"] == ["guide/a.md", "guide/c.md"]
+    assert kept[0]["metadata"]["duplicate_count"] == 2
+    assert "sources" not in kept[1]["metadata"]
+
+
+def test_near_duplicates_are_kept_by_default():
+    docs = [doc("a", TABLE, "v1.md"), doc("b", TABLE + "\n| Sprite.New | Added in r400 |", "v2.md")]
+    assert len(deduplicate_documents(docs)) == 2
+    assert [d["id"] for d in deduplicate_documents(docs, threshold=0.8)] == ["a"]
+    assert find_duplicate_clusters([d["text"] for d in docs], threshold=0.8) == [[0, 1]]
+
+
+def test_split_section_parts_are_never_dropped():
+    part = {"parent_section_id": "sprite.md#Expressions", "part_count": 2}
+    docs = [
+        doc("p0", "Shared boilerplate", "sprite.md", part_index=0, **part),
+        doc("p1", "Expression table", "sprite.md", part_index=1, **part),
+        doc("x", "Shared boilerplate", "text.md"),
+    ]
+    kept = deduplicate_documents(docs)
+    assert [d["id"] for d in kept] == ["p0", "p1"]
+
+    # 分割部分作为重复项时保留，section 仍可完整重组
+    kept = deduplicate_documents([docs[2], docs[0], docs[1]])
+    assert [d["id"] for d in kept] == ["x", "p0", "p1"]
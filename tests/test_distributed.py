@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for the distributed indexing lease table (claim, heartbeat, expiry, release)
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data_processing.distributed import LeaseTable, shard_of
+
+
+def lease_table(tmp_path) -> LeaseTable:
+    table = LeaseTable(tmp_path / "leases.sqlite")
+    table.create({"index_version": 3, "model": "model"}, [
+        {"collection": "c3_guide", "shard": 0, "target": "c3_guide__v3", "path": "c3_guide/0.jsonl", "total": 10},
+        {"collection": "c3_guide", "shard": 1, "target": "c3_guide__v3", "path": "c3_guide/1.jsonl", "total": 30},
+    ])
+    return table
+
+
+def test_claim_largest_then_none(tmp_path):
+    table = lease_table(tmp_path)
+    assert table.run_info() == {"index_version": 3, "model": "model"}
+
+    first = table.claim("w1", lease_seconds=60)
+    second = table.claim("w2", lease_seconds=60)
+    assert (first["shard"], second["shard"]) == (1, 0)  # 剩余文档多的先分配
+    assert table.claim("w3", lease_seconds=60) is None
+
+    assert table.heartbeat("c3_guide", 1, "w1", 12, lease_seconds=60)
+    assert not table.heartbeat("c3_guide", 1, "w2", 20, lease_seconds=60)  # 不是租约持有者
+    assert table.complete("c3_guide", 0, "w2")
+    summary = table.summary()
+    assert (summary["done"], summary["leased"], summary["documents_done"]) == (1, 1, 22)
+    assert summary["workers"] == ["w1"]
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    table = lease_table(tmp_path)
+    table.claim("w1", lease_seconds=60)
+    table.heartbeat("c3_guide", 1, "w1", 8, lease_seconds=-1)  # 租约已过期
+
+    resumed = table.claim("w2", lease_seconds=60)
+    assert (resumed["shard"], resumed["progress"]) == (1, 8)  # 从上次报告的位置继续
+    assert not table.heartbeat("c3_guide", 1, "w1", 9, lease_seconds=60)
+    assert not table.complete("c3_guide", 1, "w1")
+    assert table.complete("c3_guide", 1, "w2")
+    assert [s["attempts"] for s in table.shards()] == [0, 2]
+
+
+def test_release_keeps_progress(tmp_path):
+    table = lease_table(tmp_path)
+    table.claim("w1", lease_seconds=60)
+    table.heartbeat("c3_guide", 1, "w1", 5, lease_seconds=60)
+    table.release("c3_guide", 1, "w1")
+
+    shard = next(s for s in table.shards() if s["shard"] == 1)
+    assert (shard["status"], shard["worker"], shard["progress"]) == ("pending", None, 5)
+    assert table.claim("w2", lease_seconds=60)["shard"] == 1
+
+
+def test_shard_of_is_stable():
+    assert shard_of("plugin-reference/sprite.md#Actions", 16) == shard_of("plugin-reference/sprite.md#Actions", 16)
+    assert {shard_of(f"key{i}", 4) for i in range(100)} == {0, 1, 2, 3}
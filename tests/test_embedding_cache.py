@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Tests for the on-disk embedding cache (lookup, LRU eviction, persistence,
+sparse weights) and the in-memory query vector cache (LRU, TTL)
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data_processing.embedding_cache import EmbeddingCache
+
+
+def vectors(n: int, dimension: int = 8, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(n, dimension)).astype(np.float32)
+
+
+def test_get_and_put(tmp_path):
+    cache = EmbeddingCache(tmp_path, "test/model")
+    assert cache.get_many(["a", "b"]) == [None, None]
+
+    v = vectors(2)
+    cache.put_many(["a", "b"], v)
+    hits = cache.get_many(["b", "c", " a "])  # 查询前归一化空白
+    assert np.allclose(hits[0], v[1], atol=1e-2)
+    assert hits[1] is None
+    assert np.allclose(hits[2], v[0], atol=1e-2)
+    assert cache.stats()["hits"] == 2
+
+
+def test_lru_eviction_reuses_slots(tmp_path):
+    cache = EmbeddingCache(tmp_path, "test/model", max_entries=3)
+    v = vectors(4)
+    cache.put_many(["a", "b", "c"], v[:3])
+    cache.get_many(["a"])  # b 成为最久未使用
+    cache.put_many(["d"], v[3:])
+
+    assert len(cache) == 3
+    assert cache.evictions == 1
+    a, b, d = cache.get_many(["a", "b", "d"])
+    assert b is None
+    assert np.allclose(a, v[0], atol=1e-2)
+    assert np.allclose(d, v[3], atol=1e-2)
+
+
+def test_reopen_after_flush(tmp_path):
+    v = vectors(3)
+    cache = EmbeddingCache(tmp_path, "test/model")
+    cache.put_many(["x", "y", "z"], v)
+    cache.flush()
+
+    reopened = EmbeddingCache(tmp_path, "test/model")
+    assert len(reopened) == 3
+    assert np.allclose(np.stack(reopened.get_many(["x", "y", "z"])), v, atol=1e-2)
+
+    # 其他模型的缓存目录互不影响
+    assert len(EmbeddingCache(tmp_path, "other/model")) == 0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+
+def test_query_cache_lru():
+    from src.data_processing.embedding_cache import QueryEmbeddingCache
+
+    cache = QueryEmbeddingCache(max_entries=2)
+    cache.put("m", "a", [1.0])
+    cache.put("m", "b", [2.0])
+    assert cache.get("m", " a ") is not None  # b 成为最久未使用
+    cache.put("m", "c", [3.0])
+
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "a")[0] == 1.0
+    assert cache.get("other-model", "a") is None
+    assert cache.evictions == 1
+    assert not cache.get("m", "c").flags.writeable
+
+
+def test_query_cache_ttl(monkeypatch):
+    import src.data_processing.embedding_cache as embedding_cache
+
+    clock = FakeClock()
+    monkeypatch.setattr(embedding_cache, "time", clock)
+    cache = embedding_cache.QueryEmbeddingCache(max_entries=10, ttl=60)
+    cache.put("m", "q", [1.0])
+    clock.now = 59
+    assert cache.get("m", "q") is not None
+    clock.now = 61
+    assert cache.get("m", "q") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_encode_queries_embeds_misses_once():
+    from src.data_processing.embedding_cache import QueryEmbeddingCache
+    from src.data_processing.indexer import EmbeddingModel
+
+    class CountingModel:
+        def __init__(self):
+            self.calls = []
+
+        def encode(self, texts, show_progress_bar=False, batch_size=8):
+            self.calls.append(list(texts))
+            return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+    model = EmbeddingModel("test", query_cache=QueryEmbeddingCache(16))
+    model._model = CountingModel()
+    first = model.encode_queries(["a", "bb"])
+    second = model.encode_queries(["bb", "ccc", "a"])
+
+    assert model._model.calls == [["a", "bb"], ["ccc"]]
+    assert second == [first[1], [3.0, 1.0], first[0]]
+
+
+def test_sparse_weights_follow_dense_entries(tmp_path):
+    cache = EmbeddingCache(tmp_path, "test/model", max_entries=2)
+    cache.put_sparse_many(["a"], [([1], [0.5])])  # 没有 dense 槽位的不缓存
+    assert cache.get_sparse_many(["a"]) == [None]
+
+    cache.put_many(["a", "b"], vectors(2))
+    cache.put_sparse_many(["a", "b"], [([3, 7], [0.5, 0.25]), ([2], [1.0])])
+    cache.flush()
+
+    reopened = EmbeddingCache(tmp_path, "test/model", max_entries=2)
+    indices, values = reopened.get_sparse_many([" a "])[0]
+    assert indices.tolist() == [3, 7] and values.tolist() == [0.5, 0.25]
+
+    reopened.get_many(["b"])  # a 成为最久未使用，淘汰时稀疏权重一起删除
+    reopened.put_many(["c"], vectors(1))
+    assert reopened.get_sparse_many(["a", "b"])[0] is None
+    assert reopened.get_sparse_many(["b"])[0][0].tolist() == [2]
+
+
+def test_encode_with_sparse_single_pass_and_cached(tmp_path):
+    from src.data_processing.indexer import EmbeddingModel
+
+    class FakeBGEM3:
+        def __init__(self):
+            self.calls = []
+
+        def encode(self, texts, show_progress_bar=False, batch_size=8):
+            raise AssertionError("dense-only pass")
+
+        def encode_with_sparse(self, texts, batch_size=8):
+            from qdrant_client.http import models
+            self.calls.append(list(texts))
+            dense = np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+            return dense, [models.SparseVector(indices=[len(t)], values=[1.0]) for t in texts]
+
+    model = EmbeddingModel("test", cache=EmbeddingCache(tmp_path, "test"), sparse=True)
+    model._model = FakeBGEM3()
+    dense, sparse = model.encode_with_sparse(["a", "bb"])
+    dense_again, sparse_again = model.encode_with_sparse(["bb", "ccc", "a"])
+
+    assert model._model.calls == [["a", "bb"], ["ccc"]]
+    assert dense_again == [dense[1], [3.0, 1.0], dense[0]]
+    assert [v.indices for v in sparse_again] == [[2], [3], [1]]
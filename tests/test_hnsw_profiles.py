@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for per-collection HNSW profiles (auto selection, overrides,
+index-time config and search-time precision per index generation)
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+import src.config as config
+import src.collections as collections
+from src.data_processing.indexer import collection_hnsw_profile, hnsw_config
+
+
+def test_auto_profile_by_point_count(monkeypatch):
+    monkeypatch.setattr(config, "HNSW_PROFILE", "auto")
+    assert collection_hnsw_profile("c3_guide")["name"] == "default"  # 点数未知
+    assert collection_hnsw_profile("c3_guide", 300)["exact"]
+    assert collection_hnsw_profile("c3_ace__v2", 8000)["name"] == "medium"
+    assert collection_hnsw_profile("c3_ace", 200_000)["m"] == 32
+
+
+def test_overrides_and_unknown_profile(monkeypatch):
+    monkeypatch.setattr(config, "HNSW_PROFILE", "auto")
+    monkeypatch.setitem(collections.COLLECTION_HNSW, "c3_terms", "large")
+    monkeypatch.setitem(collections.COLLECTION_HNSW, "c3_ace", {"ef_construct": 200, "hnsw_ef": 96})
+
+    assert collection_hnsw_profile("c3_terms", 10)["name"] == "large"
+    custom = collection_hnsw_profile("c3_ace")
+    assert (custom["name"], custom["m"], custom["ef_construct"], custom["hnsw_ef"]) == ("custom", 16, 200, 96)
+    assert hnsw_config(custom) == models.HnswConfigDiff(m=16, ef_construct=200, full_scan_threshold=10000)
+
+    monkeypatch.setattr(config, "HNSW_PROFILE", "huge")
+    with pytest.raises(ValueError, match="Unknown HNSW profile"):
+        collection_hnsw_profile("c3_guide")
+
+
+def test_search_profile_follows_index_generation(tmp_path, monkeypatch):
+    import src.rag.retriever as retriever_module
+    from src.data_processing.index_state import IndexGeneration
+
+    monkeypatch.setattr(config, "INDEX_STATE_DIR", tmp_path)
+    monkeypatch.setattr(config, "HNSW_PROFILE", "auto")
+    monkeypatch.setattr(collections, "HNSW_AUTO_PROFILES", [(5, "small"), (None, "large")])
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(retriever_module, "QdrantClient", lambda host, port: client)
+    client.create_collection("c3_ace", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE))
+
+    def add_points(start: int, count: int):
+        client.upsert("c3_ace", points=[
+            models.PointStruct(id=i, vector=[1.0, float(i)]) for i in range(start, start + count)
+        ])
+
+    add_points(0, 3)
+    retriever = retriever_module.HybridRetriever()
+    params = retriever._search_params(collection_name="c3_ace")
+    assert params.exact and params.hnsw_ef is None
+
+    # 集合增长后 profile 保持缓存，索引更新 (generation 变化) 后重新选择
+    add_points(3, 10)
+    assert retriever.hnsw_profile("c3_ace")["name"] == "small"
+    IndexGeneration().bump("test")
+    params = retriever._search_params(collection_name="c3_ace")
+    assert not params.exact and params.hnsw_ef == 128
+    assert retriever._search_params(collection_name="c3_ace", hnsw_ef=32, exact=True).hnsw_ef == 32
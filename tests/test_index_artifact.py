@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests for index artifact export / import (round trip through in-memory Qdrant)
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+import src.config as config
+from src.data_processing.index_artifact import export_index, import_index
+from src.data_processing.index_state import IndexManifest
+from src.data_processing.sparse_encoder import SPARSE_VECTOR_NAME
+
+
+def source_client() -> QdrantClient:
+    """c3_plugins with sparse vectors (one point without), c3_guide dense only"""
+    client = QdrantClient(":memory:")
+    dense = models.VectorParams(size=4, distance=models.Distance.COSINE)
+    client.create_collection(
+        "c3_plugins", vectors_config=dense,
+        sparse_vectors_config={SPARSE_VECTOR_NAME: models.SparseVectorParams()}
+    )
+    client.create_collection("c3_guide", vectors_config=dense)
+    client.upsert("c3_plugins", points=[
+        models.PointStruct(id=1, vector={"": [1, 0, 0, 0], SPARSE_VECTOR_NAME: models.SparseVector(
+            indices=[3, 9], values=[0.5, 0.25])}, payload={"text": "Sprite set-animation-frame"}),
+        models.PointStruct(id=2, vector={"": [0, 1, 0, 0]}, payload={"text": "设置动画帧"}),
+        models.PointStruct(id=3, vector={"": [0, 0, 1, 0], SPARSE_VECTOR_NAME: models.SparseVector(
+            indices=[1], values=[1.0])}, payload={"text": "On collision"}),
+    ])
+    client.upsert("c3_guide", points=[
+        models.PointStruct(id=i, vector=[0.5, 0.5, float(i), 1], payload={"text": f"guide {i}"}) for i in range(5)
+    ])
+    return client
+
+
+def test_export_import_round_trip(tmp_path, monkeypatch):
+    import src.data_processing.indexer as indexer_module
+
+    source_state, target_state = tmp_path / "source", tmp_path / "target"
+    monkeypatch.setattr(config, "INDEX_STATE_DIR", source_state)
+    manifest = IndexManifest.load()
+    manifest.update("c3_plugins", [{"id": "k1", "text": "Sprite set-animation-frame"}], "model")
+    manifest.save()
+
+    source = source_client()
+    artifact = tmp_path / "c3_index.tar.gz"
+    exported = export_index(artifact, collections=["c3_plugins", "c3_guide", "c3_missing"], client=source)
+    assert exported["dimension"] == 4
+    assert exported["collections"] == {
+        "c3_plugins": {"points": 3, "sparse": True}, "c3_guide": {"points": 5, "sparse": False}
+    }
+
+    # 导入到另一台机器: 新的状态目录和空的 Qdrant
+    monkeypatch.setattr(config, "INDEX_STATE_DIR", target_state)
+    monkeypatch.setattr(config, "BM25_DIR", target_state / "bm25")
+    target = QdrantClient(":memory:")
+    monkeypatch.setattr(indexer_module, "QdrantClient", lambda host, port: target)
+    indexer = indexer_module.Indexer()
+    import_index(artifact, parallel=1, indexer=indexer)
+
+    assert indexer.get_aliases() == {"c3_plugins": "c3_plugins__v1", "c3_guide": "c3_guide__v1"}
+    for collection in ("c3_plugins", "c3_guide"):
+        before = {p.id: p for p in source.scroll(collection, limit=10, with_vectors=True)[0]}
+        after = {p.id: p for p in target.scroll(collection, limit=10, with_vectors=True)[0]}
+        assert before.keys() == after.keys()
+        for point_id, point in before.items():
+            assert after[point_id].payload == point.payload
+            old = point.vector if isinstance(point.vector, dict) else {"": point.vector}
+            new = after[point_id].vector if isinstance(after[point_id].vector, dict) else {"": after[point_id].vector}
+            assert np.allclose(new[""], old[""])
+            assert new.get(SPARSE_VECTOR_NAME) == old.get(SPARSE_VECTOR_NAME)
+
+    assert IndexManifest.load().get_chunks("c3_plugins", "model") == manifest.get_chunks("c3_plugins", "model")
+    assert (target_state / "bm25" / "c3_plugins").exists()
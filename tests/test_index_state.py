@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for the index manifest diff (incl. markdown / example event chunk keys)
+and the resumable run checkpoint
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data_processing.index_state import IndexManifest, IndexCheckpoint
+
+
+def doc(key: str, text: str, **metadata):
+    return {"id": key, "text": text, "metadata": metadata}
+
+
+def test_manifest_diff(tmp_path):
+    manifest = IndexManifest(tmp_path / "manifest.json")
+    docs = [doc("a", "alpha"), doc("b", "beta"), doc("c", "gamma")]
+    assert manifest.diff("c3_guide", docs, "model")[0] == docs
+
+    manifest.update("c3_guide", docs, "model")
+    manifest.save()
+    manifest = IndexManifest.load(tmp_path / "manifest.json")
+
+    updated = [doc("a", "alpha"), doc("b", "beta 2"), doc("c", "gamma", category="x"), doc("d", "delta")]
+    changed, removed = manifest.diff("c3_guide", updated, "model")
+    assert [d["id"] for d in changed] == ["b", "c", "d"]  # 文本或 payload 变化
+    assert removed == []
+
+    changed, removed = manifest.diff("c3_guide", docs[:1], "model")
+    assert changed == [] and sorted(removed) == ["b", "c"]
+
+    # 换模型后全部重新嵌入
+    assert len(manifest.diff("c3_guide", docs, "other-model")[0]) == 3
+
+
+def test_manifest_diff_on_chunk_keys(tmp_path):
+    from src.data_processing.indexer import markdown_documents, _unique_ids
+    from src.data_processing.markdown_parser import MarkdownParser
+    from src.data_processing.project_parser import EventBlock, ProjectParser
+
+    page = tmp_path / "manual" / "sprite.md"
+    page.parent.mkdir()
+    page.write_text("# Sprite\n\n## Actions\n\nSet animation\n\n## Conditions\n\nIs playing\n", encoding="utf-8")
+    parser = MarkdownParser(base_dir=page.parent)
+
+    def event(text: str) -> EventBlock:
+        return EventBlock("demo", "Game", "block", [], [], text)
+
+    def export(events):
+        project = ProjectParser()
+        project.projects = [{"name": "demo", "event_count": len(events), "events": events}]
+        return _unique_ids(project.export_for_vectordb())
+
+    manifest = IndexManifest(tmp_path / "manifest.json")
+    manifest.update("c3_plugins", markdown_documents(parser.parse_file(page)), "model")
+    manifest.update("c3_examples", export([event("Every tick"), event("On click")]), "model")
+
+    # 在前面插入章节 / 事件，其余 key 不变，只嵌入新增的部分
+    page.write_text("# Sprite\n\n## Properties\n\nSpeed\n\n## Actions\n\nSet animation\n\n"
+                    "## Conditions\n\nIs playing\n", encoding="utf-8")
+    changed, removed = manifest.diff("c3_plugins", markdown_documents(parser.parse_file(page)), "model")
+    assert [d["id"] for d in changed] == ["sprite.md#Properties"] and removed == []
+
+    docs = export([event("On start"), event("Every tick"), event("On click"), event("On click")])
+    changed, removed = manifest.diff("c3_examples", docs, "model")
+    # project_demo 的 event_count 也变了
+    assert [d["id"] for d in changed] == ["project_demo", docs[1]["id"], docs[4]["id"]] and removed == []
+    assert docs[4]["id"] == docs[3]["id"] + "~2"  # 同一事件表内相同事件
+
+
+def test_checkpoint_resume(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    docs = [doc(str(i), f"text {i}") for i in range(10)]
+    run = {"mode": "rebuild", "model": "model"}
+
+    checkpoint = IndexCheckpoint.load(path)
+    checkpoint.start({**run, "index_version": 3})
+    checkpoint.begin("c3_guide", "c3_guide__v3", docs)
+    checkpoint.advance("c3_guide", 6)
+    checkpoint.advance("c3_guide", 4)  # 乱序提交不回退
+
+    resumed = IndexCheckpoint.load(path)
+    assert resumed.matches(run)
+    assert not resumed.matches({**run, "model": "other"})
+    assert resumed.resume_offset("c3_guide", "c3_guide__v3", docs) == 6
+    assert resumed.resume_offset("c3_guide", "c3_guide__v4", docs) == 0
+    assert resumed.resume_offset("c3_guide", "c3_guide__v3", docs[::-1]) == 0  # 文档变化
+
+    resumed.finish("c3_guide")
+    assert IndexCheckpoint.load(path).is_done("c3_guide")
+    resumed.clear()
+    assert not path.exists()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for token-aware splitting of oversized H2 sections
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data_processing.markdown_parser import MarkdownParser
+
+
+def word_count(text: str) -> int:
+    """Whitespace token counter (stands in for the embedding tokenizer)"""
+    return len(text.split())
+
+
+def make_parser(max_tokens: int) -> MarkdownParser:
+    return MarkdownParser(base_dir=Path("."), token_counter=word_count, max_tokens=max_tokens)
+
+
+def build_doc() -> str:
+    rows = "\n".join(f"| Sprite.Expr{i} | Returns value number {i} |" for i in range(60))
+    paragraphs = "\n\n".join(f"Paragraph {i} " + "word " * 20 for i in range(6))
+    return (
+        "# Sprite\n\nIntro text.\n\n"
+        "## Short\n\nSmall section.\n\n"
+        "## Expressions\n\n"
+        "### Animation\n\n" + paragraphs + "\n\n"
+        "### Table\n\n| Expression | Description |\n| --- | --- |\n" + rows + "\n"
+    )
+
+
+def test_short_sections_are_not_split():
+    chunks = make_parser(1000).split_by_h2(build_doc(), {"source": "plugin-reference/sprite.md"})
+    assert [c.metadata["h2_heading"] for c in chunks] == ["Short", "Expressions"]
+    assert all("parent_section_id" not in c.metadata for c in chunks)
+
+
+def test_oversized_section_is_split_under_budget():
+    parser = make_parser(120)
+    chunks = parser.split_by_h2(build_doc(), {"source": "plugin-reference/sprite.md"})
+    pieces = [c for c in chunks if c.metadata["h2_heading"] == "Expressions"]
+
+    assert len(pieces) > 3
+    for i, piece in enumerate(pieces):
+        assert word_count(piece.text) <= 120
+        # Every piece keeps the H1/H2 breadcrumb
+        assert piece.text.startswith("# Sprite\n\n## Expressions\n\n")
+        assert piece.metadata["parent_section_id"] == "plugin-reference/sprite.md#Expressions"
+        assert piece.metadata["part_index"] == i
+        assert piece.metadata["part_count"] == len(pieces)
+
+
+def test_no_content_is_lost():
+    chunks = make_parser(120).split_by_h2(build_doc(), {"source": "sprite.md"})
+    text = "\n".join(c.text for c in chunks)
+    for i in range(60):
+        assert f"Sprite.Expr{i} |" in text
+    for i in range(6):
+        assert f"Paragraph {i} " in text
+
+
+def test_table_pieces_repeat_header():
+    chunks = make_parser(120).split_by_h2(build_doc(), {"source": "sprite.md"})
+    table_pieces = [c.text for c in chunks if "| Sprite.Expr" in c.text]
+
+    assert len(table_pieces) > 1
+    for text in table_pieces:
+        assert "| Expression | Description |\n| --- | --- |" in text
+
+
+def test_character_budget_without_tokenizer():
+    parser = MarkdownParser(base_dir=Path("."), max_tokens=800)
+    chunks = parser.split_by_h2(build_doc(), {"source": "sprite.md"})
+    assert all(len(c.text) <= 800 for c in chunks)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for the pipelined parse -> embed -> upsert indexer and its checkpoint
+commits (in-memory Qdrant)
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from src.data_processing.pipeline import PipelinedIndexer
+
+
+class MemoryIndexer:
+    """Indexer stand-in: in-memory Qdrant, text-length vectors"""
+
+    def __init__(self, collections=("c3_guide", "c3_plugins")):
+        self.client = QdrantClient(":memory:")
+        for name in collections:
+            self.client.create_collection(
+                name, vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE)
+            )
+        self.embedded = 0
+
+    def embed_points(self, docs):
+        self.embedded += len(docs)
+        return [
+            models.PointStruct(id=doc["n"], vector=[len(doc["text"]), 1.0], payload={"text": doc["text"]})
+            for doc in docs
+        ]
+
+
+def documents(count: int, start: int = 0):
+    return [{"id": f"k{i}", "n": i, "text": "x" * (i + 1)} for i in range(start, start + count)]
+
+
+def test_pipeline_indexes_every_collection():
+    indexer = MemoryIndexer()
+    jobs = [("c3_guide", documents(23)), ("c3_plugins", documents(7, start=100))]
+    prepared = []
+
+    def prepare(collection, docs):
+        prepared.append(collection)
+        return collection, docs[2:]  # 例如增量模式只嵌入变化的文档
+
+    pipeline = PipelinedIndexer(indexer, batch_size=5, queue_size=1)
+    pipeline.run(iter(jobs), prepare)
+
+    assert prepared == ["c3_guide", "c3_plugins"]
+    assert indexer.client.count("c3_guide").count == 21
+    assert indexer.client.count("c3_plugins").count == 5
+    report = pipeline.report()
+    assert report["stages"]["embed"]["batches"] == 5 + 1
+    assert report["stages"]["upload"]["batches"] == 5 + 1
+
+
+def test_stage_error_stops_pipeline():
+    indexer = MemoryIndexer()
+
+    def jobs():
+        yield "c3_guide", documents(10)
+        raise RuntimeError("parse failed")
+
+    with pytest.raises(RuntimeError, match="parse failed"):
+        PipelinedIndexer(indexer, batch_size=5).run(jobs())
+
+
+def test_on_commit_checkpoints_and_resumes(tmp_path):
+    from src.data_processing.index_state import IndexCheckpoint
+
+    indexer = MemoryIndexer()
+    docs = documents(30)
+    checkpoint = IndexCheckpoint.load(tmp_path / "checkpoint.json")
+    checkpoint.start({"mode": "rebuild"})
+    checkpoint.begin("c3_guide", "c3_guide", docs)
+    commits = []
+
+    def on_commit(collection, applied):
+        # 回调时已确认的写入必须已在 Qdrant 中生效
+        assert indexer.client.count(collection).count >= applied
+        commits.append(applied)
+        checkpoint.advance("c3_guide", applied)
+        if applied >= 10 and len(commits) == 1:
+            raise KeyboardInterrupt  # 模拟中途崩溃
+
+    pipeline = PipelinedIndexer(indexer, batch_size=5, queue_size=1, on_commit=on_commit, commit_every=2)
+    with pytest.raises(KeyboardInterrupt):
+        pipeline.run(iter([("c3_guide", docs)]))
+
+    resumed = IndexCheckpoint.load(tmp_path / "checkpoint.json")
+    offset = resumed.resume_offset("c3_guide", "c3_guide", docs)
+    assert offset == 10
+
+    embedded = indexer.embedded
+    pipeline = PipelinedIndexer(
+        indexer, batch_size=5,
+        on_commit=lambda collection, applied: resumed.advance("c3_guide", offset + applied), commit_every=2
+    )
+    pipeline.run(iter([("c3_guide", docs[offset:])]))
+
+    assert indexer.client.count("c3_guide").count == 30
+    assert indexer.embedded - embedded == 20  # 已提交的批次不再嵌入
+    assert IndexCheckpoint.load(tmp_path / "checkpoint.json").resume_offset("c3_guide", "c3_guide", docs) == 30
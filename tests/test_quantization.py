@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for vector quantization settings (config builder, per-collection
+overrides, collection creation, search-time rescoring params)
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+import src.config as config
+import src.collections as collections
+from src.data_processing.indexer import collection_quantization, quantization_config
+
+
+def test_quantization_config_kinds():
+    assert quantization_config("") is None and quantization_config(None) is None
+
+    int8 = quantization_config("int8")
+    assert int8.scalar.type == models.ScalarType.INT8 and int8.scalar.always_ram
+
+    binary = quantization_config("binary")
+    assert isinstance(binary, models.BinaryQuantization) and binary.binary.always_ram
+
+    with pytest.raises(ValueError, match="Unknown quantization"):
+        quantization_config("int4")
+
+
+def test_per_collection_override(monkeypatch):
+    monkeypatch.setattr(config, "VECTOR_QUANTIZATION", "int8")
+    monkeypatch.setitem(collections.COLLECTION_QUANTIZATION, "c3_terms", "binary")
+    monkeypatch.setitem(collections.COLLECTION_QUANTIZATION, "c3_guide", "")
+
+    assert collection_quantization("c3_plugins") == "int8"
+    assert collection_quantization("c3_terms__v7") == "binary"  # 版本化集合按 alias 名匹配
+    assert collection_quantization("c3_guide") is None
+
+
+def test_create_collection_keeps_originals_on_disk(tmp_path, monkeypatch):
+    import src.data_processing.indexer as indexer_module
+
+    client = QdrantClient(":memory:")
+    created = {}
+    create = client.create_collection
+
+    def record(collection_name, **kwargs):
+        created[collection_name] = kwargs
+        return create(collection_name, **kwargs)
+
+    monkeypatch.setattr(client, "create_collection", record)
+    monkeypatch.setattr(indexer_module, "QdrantClient", lambda host, port: client)
+    monkeypatch.setattr(config, "VECTOR_QUANTIZATION", "int8")
+    monkeypatch.setitem(collections.COLLECTION_QUANTIZATION, "c3_guide", "")
+
+    indexer = indexer_module.Indexer()
+    indexer.create_collection("c3_plugins", dimension=4)
+    indexer.create_collection("c3_guide", dimension=4)
+
+    assert created["c3_plugins"]["quantization_config"].scalar.type == models.ScalarType.INT8
+    assert created["c3_plugins"]["vectors_config"].on_disk  # rescore 用的原始向量在磁盘
+    assert created["c3_guide"]["quantization_config"] is None
+    assert not created["c3_guide"]["vectors_config"].on_disk
+
+
+def test_search_params_rescore_with_oversampling(tmp_path, monkeypatch):
+    import src.rag.retriever as retriever_module
+
+    monkeypatch.setattr(config, "INDEX_STATE_DIR", tmp_path)
+    monkeypatch.setattr(retriever_module, "QdrantClient", lambda host, port: QdrantClient(":memory:"))
+    monkeypatch.setattr(config, "SEARCH_OVERSAMPLING", 3.0)
+    monkeypatch.setattr(config, "SEARCH_RESCORE", True)
+    retriever = retriever_module.HybridRetriever()
+
+    params = retriever._search_params()
+    assert params.quantization.rescore and params.quantization.oversampling == 3.0
+
+    params = retriever._search_params(oversampling=1.5, rescore=False)
+    assert not params.quantization.rescore and params.quantization.oversampling == 1.5
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for the reranked result cache and index generation invalidation
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data_processing.index_state import IndexGeneration
+from src.rag.result_cache import ResultCache, estimate_size
+from src.rag.retriever import SearchResult
+
+
+def results(n: int, text: str = "chunk") -> list:
+    return [SearchResult(f"{text} {i}", 1.0 - i / 10, "c3_guide", {"i": i}) for i in range(n)]
+
+
+def test_hit_returns_copies():
+    cache = ResultCache()
+    key = cache.make_key("  如何保存游戏 ", ("rerank", 5, 10), {"b": 1, "a": 2})
+    assert key == cache.make_key("如何保存游戏", ("rerank", 5, 10), {"a": 2, "b": 1})
+
+    assert cache.get(key, "1") is None
+    cache.put(key, "1", results(3))
+    hit = cache.get(key, "1")
+    hit[0].metadata["i"] = 99
+    assert cache.get(key, "1")[0].metadata["i"] == 0
+    assert cache.stats()["hits"] == 2
+
+
+def test_size_bound_evicts_lru():
+    size = estimate_size(results(3))
+    cache = ResultCache(max_bytes=size * 2)
+    keys = [cache.make_key(f"q{i}", ()) for i in range(3)]
+    for key in keys[:2]:
+        cache.get(key, "1")
+        cache.put(key, "1", results(3))
+    cache.get(keys[0], "1")  # q1 成为最久未使用
+    cache.put(keys[2], "1", results(3))
+
+    assert cache.stats()["size_bytes"] <= size * 2
+    assert cache.get(keys[1], "1") is None
+    assert cache.get(keys[0], "1") is not None
+    assert cache.evictions == 1
+
+    # 超过上限的单条结果不缓存
+    small = ResultCache(max_bytes=10)
+    small.get(keys[0], "1")
+    small.put(keys[0], "1", results(3))
+    assert len(small) == 0
+
+
+def test_generation_bump_invalidates(tmp_path):
+    generation = IndexGeneration(tmp_path / "generation.json")
+    assert generation.current() == "0"
+
+    cache = ResultCache()
+    key = cache.make_key("q", ())
+    before = generation.current()
+    cache.get(key, before)
+    cache.put(key, before, results(2))
+
+    IndexGeneration(tmp_path / "generation.json").bump("rebuild")  # 另一个进程 (索引器)
+    after = generation.current()
+    assert after != before
+    assert cache.get(key, after) is None
+    assert cache.invalidations == 1
+
+    # 旧 generation 下算出的结果不再写入
+    cache.put(key, before, results(2))
+    assert len(cache) == 0
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    import src.rag.result_cache as result_cache
+
+    class Clock:
+        now = 1000.0
+
+        def time(self):
+            return self.now
+
+    clock = Clock()
+    monkeypatch.setattr(result_cache, "time", clock)
+    cache = ResultCache(ttl=300)
+    key = cache.make_key("q", ())
+    cache.get(key, "1")
+    cache.put(key, "1", results(2))
+
+    clock.now += 299
+    assert cache.get(key, "1") is not None
+    clock.now += 2
+    assert cache.get(key, "1") is None
+    assert cache.stats()["expirations"] == 1
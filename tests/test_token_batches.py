@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for token-budget batching of embedding inputs and profiler token statistics
+"""
+
+import sys
+import random
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data_processing.indexer import EmbeddingModel, plan_token_batches
+
+
+class WordModel:
+    """Stands in for SentenceTransformer: word count as tokens, length-derived vectors"""
+    max_seq_length = 512
+
+    def __init__(self):
+        self.batches = []
+
+    def tokenizer(self, texts, **kwargs):
+        return {"input_ids": [text.split() for text in texts]}
+
+    def encode(self, texts, show_progress_bar=False, batch_size=8):
+        self.batches.append(len(texts))
+        return np.array([[len(t.split()), len(t)] for t in texts], dtype=np.float32)
+
+
+def test_batches_cover_inputs_within_budget():
+    rng = random.Random(0)
+    lengths = [rng.randint(1, 300) for _ in range(500)]
+    batches = plan_token_batches(lengths, token_budget=1024, max_batch_size=32)
+
+    assert sorted(i for batch in batches for i in batch) == list(range(len(lengths)))
+    for batch in batches:
+        assert len(batch) <= 32
+        assert max(lengths[i] for i in batch) * len(batch) <= 1024
+
+
+def test_oversized_input_gets_own_batch():
+    batches = plan_token_batches([5000, 10, 10], token_budget=100)
+    assert batches[0] == [0]
+    assert sorted(batches[1]) == [1, 2]
+
+
+def test_encode_restores_input_order():
+    texts = [" ".join(["w"] * n) for n in (3, 40, 1, 25, 7, 40, 2)]
+    model = EmbeddingModel("test", token_budget=60, max_batch_size=4)
+    model._model = WordModel()
+
+    vectors = model._encode_local(texts, show_progress_bar=False)
+    assert [int(v[0]) for v in vectors] == [3, 40, 1, 25, 7, 40, 2]
+    assert len(model._model.batches) > 1
+
+
+def test_profiler_records_token_lengths_on_every_path():
+    from src.data_processing.run_report import RunProfiler
+
+    texts = ["a b c", "d", "e f"]
+    for token_budget in (None, 60):
+        profiler = RunProfiler()
+        model = EmbeddingModel("test", token_budget=token_budget)
+        model._model = WordModel()
+        model.profiler = profiler
+        with profiler.collection("c3_test"):
+            model._encode_local(texts, show_progress_bar=False)
+            model._encode_local(["g h i j"], show_progress_bar=False)  # 单条文本不分桶
+
+        report = profiler.report()["collections"]["c3_test"]
+        assert report["tokens"] == 10
+        assert "tokenize" in report["stages"]
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Tests for the index watcher (snapshot diff, affected chunk keys, in-place
+reindexing against in-memory Qdrant)
+"""
+
+import sys
+import json
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from qdrant_client import QdrantClient
+
+import src.config as config
+from src.data_processing.watcher import IndexWatcher, diff_snapshots, scan_manual, scan_projects
+
+
+class LengthModel:
+    """Stands in for SentenceTransformer: text-length vectors"""
+    max_seq_length = 512
+
+    def encode(self, texts, show_progress_bar=False, batch_size=8):
+        return np.array([[len(t) % 7 + 1.0, 1.0, 2.0, 3.0] for t in texts], dtype=np.float32)
+
+    def get_sentence_embedding_dimension(self):
+        return 4
+
+
+def write(path: Path, text: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def indexed_watcher(tmp_path, monkeypatch):
+    """Manual + one example project indexed like a full run, and a watcher on top"""
+    import src.data_processing.indexer as indexer_module
+    import src.data_processing.markdown_parser as markdown_parser
+    from src.data_processing.index_state import IndexManifest
+    from src.data_processing.project_parser import ProjectParser
+
+    monkeypatch.setattr(config, "INDEX_STATE_DIR", tmp_path / "state")
+    monkeypatch.setattr(markdown_parser, "load_token_counter", lambda model_name: None)
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(indexer_module, "QdrantClient", lambda host, port: client)
+
+    manual, projects = tmp_path / "manual", tmp_path / "projects"
+    write(manual / "plugin-reference/sprite.md", "# Sprite\n\n## Actions\n\nSet animation\n\n## Conditions\n\nIs playing\n")
+    write(manual / "plugin-reference/text.md", "# Text\n\n## Actions\n\nSet text\n")
+    write(projects / "demo/demo.c3proj", json.dumps({"project": {"description": "Demo"}}))
+    write(projects / "demo/eventSheets/game.json", json.dumps({"name": "Game", "events": [{
+        "eventType": "block",
+        "conditions": [{"id": "every-tick", "objectClass": "System"}],
+        "actions": [{"id": "destroy", "objectClass": "Sprite"}],
+    }]}))
+
+    indexer = indexer_module.Indexer()
+    indexer.embedder._model = LengthModel()
+    manifest = IndexManifest.load()
+    parser = markdown_parser.MarkdownParser(base_dir=manual)
+    docs = indexer_module._unique_ids(indexer_module.markdown_documents(parser.parse_directory()))
+    project_parser = ProjectParser()
+    project_parser.parse_all_projects(projects)
+    for collection, collection_docs in (("c3_plugins", docs), ("c3_examples", project_parser.export_for_vectordb())):
+        indexer.create_collection(collection)
+        indexer.index_documents(collection, collection_docs)
+        manifest.update(collection, collection_docs, indexer.embedder.model_id)
+    manifest.save()
+
+    watcher = IndexWatcher(
+        indexer, manifest=manifest, manual_dir=manual, projects_dir=projects, unified=False,
+        bm25_dir=tmp_path / "bm25"
+    )
+    return watcher, manual, projects
+
+
+def test_diff_snapshots_groups_project_files():
+    old = {"md": {"a.md": [1, 10], "b.md": [1, 10]}, "project": {"demo/demo.c3proj": [1, 5]}}
+    new = {"md": {"a.md": [2, 10], "c.md": [1, 3]},
+           "project": {"demo/demo.c3proj": [1, 5], "demo/eventSheets/game.json": [1, 9]}}
+    assert diff_snapshots(old, new) == {("md", "a.md"), ("md", "b.md"), ("md", "c.md"), ("project", "demo")}
+    assert diff_snapshots(new, new) == set()
+
+
+def test_markdown_updates_cover_old_and_new_keys(tmp_path, monkeypatch):
+    watcher, manual, _ = indexed_watcher(tmp_path, monkeypatch)
+    write(manual / "plugin-reference/sprite.md", "# Sprite\n\n## Actions\n\nSet animation frame\n\n## Events\n\nOn loop\n")
+
+    updates = watcher._markdown_updates({"plugin-reference/sprite.md"})
+    docs, old_keys = updates["c3_plugins"]
+    assert list(updates) == ["c3_plugins"]
+    assert [d["id"] for d in docs] == ["plugin-reference/sprite.md#Actions", "plugin-reference/sprite.md#Events"]
+    # 只包含该文件的 key，不含同集合其他文件
+    assert sorted(old_keys) == ["plugin-reference/sprite.md#Actions", "plugin-reference/sprite.md#Conditions"]
+
+    (manual / "plugin-reference/text.md").unlink()
+    docs, old_keys = watcher._markdown_updates({"plugin-reference/text.md"})["c3_plugins"]
+    assert docs == [] and old_keys == ["plugin-reference/text.md#Actions"]
+
+
+def test_reindex_updates_points_manifest_and_bm25(tmp_path, monkeypatch):
+    from src.data_processing.bm25 import BM25Index
+    from src.data_processing.index_state import IndexGeneration
+
+    watcher, manual, projects = indexed_watcher(tmp_path, monkeypatch)
+    baseline = {"md": scan_manual(manual), "project": scan_projects(projects)}
+    generation = IndexGeneration().current()
+
+    write(manual / "plugin-reference/sprite.md", "# Sprite\n\n## Actions\n\nSet animation frame\n")
+    write(projects / "demo/eventSheets/game.json", json.dumps({"name": "Game", "events": []}))
+    changes = diff_snapshots(baseline, {"md": scan_manual(manual), "project": scan_projects(projects)})
+    assert changes == {("md", "plugin-reference/sprite.md"), ("project", "demo")}
+
+    assert watcher.reindex(changes) == {"upserted": 2, "deleted": 2}
+    client = watcher.indexer.client
+    assert client.count("c3_plugins").count == 2
+    assert client.count("c3_examples").count == 1
+    assert sorted(watcher.manifest.get_chunks("c3_plugins", watcher.model_id)) == [
+        "plugin-reference/sprite.md#Actions", "plugin-reference/text.md#Actions"
+    ]
+    assert list(watcher.manifest.get_chunks("c3_examples", watcher.model_id)) == ["project_demo"]
+
+    # BM25 在 generation 变化前按当前点重建
+    assert IndexGeneration().current() != generation
+    keyword = BM25Index.load(tmp_path / "bm25" / "c3_plugins")
+    assert len(keyword) == 2 and keyword.search("playing", 3) == []
+    assert keyword.search("frame", 1)[0][0] == watcher.indexer._point_id("plugin-reference/sprite.md#Actions")
+
+    assert watcher.reindex(changes) == {"upserted": 0, "deleted": 0}  # 已是最新
+
+
+def test_run_once_picks_up_changes_since_last_run(tmp_path, monkeypatch):
+    watcher, manual, _ = indexed_watcher(tmp_path, monkeypatch)
+    watcher.run(once=True)  # 首次运行: 记录基线，不重建
+    assert watcher.load_state() == watcher.scan()
+
+    write(manual / "plugin-reference/new.md", "# New\n\n## Actions\n\nBrand new\n")
+    watcher.run(once=True)
+    assert "plugin-reference/new.md#Actions" in watcher.manifest.get_chunks("c3_plugins", watcher.model_id)
+    assert watcher.indexer.client.count("c3_plugins").count == 4
+    assert watcher.load_state() == watcher.scan()
+
+
+def test_debounce_waits_for_quiet_period(tmp_path, monkeypatch):
+    import src.data_processing.watcher as watcher_module
+
+    class Clock:
+        now = 0.0
+
+        def monotonic(self):
+            return self.now
+
+        def sleep(self, seconds):
+            self.now += seconds
+
+    watcher, _, _ = indexed_watcher(tmp_path, monkeypatch)
+    clock = Clock()
+    monkeypatch.setattr(watcher_module, "time", clock)
+    # git pull 仍在写入: t=1、2 时状态变化，之后保持不变
+    states = iter([{"md": {"a.md": [1, 1]}}, {"md": {"a.md": [2, 1]}}])
+    last = {"md": {"a.md": [2, 1]}}
+    watcher.scan = lambda: next(states, last)
+
+    settled = watcher.wait_until_settled({"md": {"a.md": [0, 1]}}, interval=1, debounce=3)
+    assert settled == last
+    assert clock.now == 5  # 最后一次变化 (t=2) 之后静默 3 秒